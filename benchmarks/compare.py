@@ -0,0 +1,116 @@
+"""
+Compare two pytest-benchmark JSON reports, a baseline and a current run, and flag the slowdowns:
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.2
+
+Exits with 1 when a benchmark is slower than the baseline by more than the threshold.
+"""
+import argparse
+import json
+import logging
+import sys
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+STATS = ("min", "max", "mean", "median")
+DEFAULT_THRESHOLD = 0.2
+
+
+class Comparison(NamedTuple):
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        """
+        :return: the relative change of the current time, positive when slower
+        """
+        return self.current / self.baseline - 1 if self.baseline > 0 else 0.
+
+
+class Report(NamedTuple):
+    comparisons: list[Comparison]
+    new: list[str]
+    missing: list[str]
+
+    def regressions(self, threshold: float) -> list[Comparison]:
+        return [c for c in self.comparisons if c.change > threshold]
+
+
+def load_stats(path: str, stat: str = "median") -> dict[str, float]:
+    """
+    :return: benchmark full name: its stat in seconds, from a pytest-benchmark JSON report
+    """
+    with open(path) as f:
+        report = json.load(f)
+    return {b["fullname"]: b["stats"][stat] for b in report["benchmarks"]}
+
+
+def compare(baseline: dict[str, float], current: dict[str, float]) -> Report:
+    comparisons = [Comparison(name, baseline[name], current[name]) for name in baseline if name in current]
+    new = [name for name in current if name not in baseline]
+    missing = [name for name in baseline if name not in current]
+    return Report(comparisons, new, missing)
+
+
+def format_report(report: Report, threshold: float) -> str:
+    lines = []
+    width = max((len(c.name) for c in report.comparisons), default=0)
+    for c in sorted(report.comparisons, key=lambda c: c.change, reverse=True):
+        flag = "SLOWER" if c.change > threshold else "faster" if c.change < -threshold else ""
+        lines.append(f"{c.name:<{width}}  {c.baseline * 1000:12.3f} ms  {c.current * 1000:12.3f} ms"
+                     f"  {c.change:+8.1%}  {flag}")
+    lines.extend(f"new: {name}" for name in report.new)
+    lines.extend(f"missing: {name}" for name in report.missing)
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="compare a pytest-benchmark JSON report to a baseline one, and fail on the benchmarks slower "
+                    "than the baseline by more than a threshold."
+    )
+    parser.add_argument(
+        "baseline",
+        help="the baseline JSON report, from pytest benchmarks --benchmark-json"
+    )
+    parser.add_argument(
+        "current",
+        help="the JSON report to check"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"the tolerated relative slowdown, e.g. 0.2 for 20%%. Default is {DEFAULT_THRESHOLD}."
+    )
+    parser.add_argument(
+        "--stat",
+        choices=STATS,
+        default="median",
+        help="the compared statistic. Default is median."
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default="INFO",
+        help="the log level. Default is INFO. Options are: DEBUG, INFO, WARNING, ERROR, CRITICAL"
+    )
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(getattr(logging, args.log_level.upper()))
+
+    report = compare(load_stats(args.baseline, args.stat), load_stats(args.current, args.stat))
+    print(format_report(report, args.threshold))
+    regressions = report.regressions(args.threshold)
+    if regressions:
+        logger.error(f"{len(regressions)} benchmarks slower than the baseline by more than {args.threshold:.0%}")
+        return 1
+    logger.info(f"No slowdown beyond {args.threshold:.0%} on {len(report.comparisons)} benchmarks")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import pytest
+
+from benchmarks import generators
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+DEFAULT_SIZES = "1k,100k"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-sizes",
+        default=DEFAULT_SIZES,
+        help=f"comma separated data sizes to benchmark, among {', '.join(SIZES)}. Default is {DEFAULT_SIZES}."
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "size" in metafunc.fixturenames:
+        names = [s.strip() for s in metafunc.config.getoption("--bench-sizes").split(",") if s.strip()]
+        unknown = [s for s in names if s not in SIZES]
+        if unknown:
+            raise pytest.UsageError(f"Unknown --bench-sizes {unknown}, expected some of {list(SIZES)}")
+        metafunc.parametrize("size", [SIZES[s] for s in names], ids=names, scope="session")
+
+
+@pytest.fixture
+def run(benchmark, size):
+    """
+    Benchmark a function, with fewer rounds on the large sizes, where a single call lasts seconds
+    """
+    def run_benchmark(function, *args, **kwargs):
+        if size >= 100_000:
+            rounds = 1 if size >= 1_000_000 else 3
+            return benchmark.pedantic(function, args=args, kwargs=kwargs, rounds=rounds, iterations=1)
+        return benchmark(function, *args, **kwargs)
+    return run_benchmark
+
+
+@pytest.fixture(scope="session")
+def survey_db(tmp_path_factory, size) -> str:
+    return generators.survey_db(str(tmp_path_factory.mktemp("survey") / f"survey-{size}.db"), size)
+
+
+@pytest.fixture(scope="session")
+def survey_arrays(size):
+    return generators.survey_arrays(size)
+
+
+@pytest.fixture(scope="session")
+def survey_measures(size):
+    return generators.survey_measures(size)
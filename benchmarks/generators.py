@@ -0,0 +1,86 @@
+"""
+Deterministic synthetic data for the benchmarks: a walk around a point of UTM zone 34N, at 10Hz.
+"""
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from bok_drone_onboard_system.replay.llh import llh_line
+from bok_drone_onboard_system.replay.nmea import gga_sentence, rmc_sentence
+from bok_drone_onboard_system.survey import SurveyMeasure
+from bok_drone_onboard_system.survey.data import SurveyArrays, create_table_if_not_exists, insert_statement, \
+    SCHEMA_V2
+from bok_drone_onboard_system.survey.gps import GPSPoint
+
+T0 = datetime(2025, 8, 24, 10, 59, 13, 800000, tzinfo=timezone.utc)
+T0_MS = int(T0.timestamp() * 1000)
+PERIOD_MS = 100
+SEED = 42
+
+
+def survey_arrays(n: int, seed: int = SEED) -> SurveyArrays:
+    rng = np.random.default_rng(seed)
+    timestamps_ns = (T0_MS + np.arange(n, dtype=np.int64) * PERIOD_MS) * 1_000_000
+    positions = np.column_stack((
+        40.1 + np.cumsum(rng.normal(0, 1e-6, n)),
+        22.3 + np.cumsum(rng.normal(0, 1e-6, n)),
+        30. + rng.normal(0, 0.01, n),
+    ))
+    quaternions = rng.normal(size=(n, 4))
+    quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+    return SurveyArrays(timestamps_ns, quaternions, positions)
+
+
+def survey_measures(n: int, seed: int = SEED) -> list[SurveyMeasure]:
+    arrays = survey_arrays(n, seed)
+    return [
+        SurveyMeasure(GPSPoint(T0 + timedelta(milliseconds=PERIOD_MS * i), *position), tuple(quaternion))
+        for i, (position, quaternion) in enumerate(zip(arrays.positions.tolist(), arrays.quaternions.tolist()))
+    ]
+
+
+def survey_db(path: str, n: int, seed: int = SEED, chunk_size: int = 100_000) -> str:
+    """
+    A survey_records table of n defined records, in the current schema
+    """
+    arrays = survey_arrays(n, seed)
+    conn = sqlite3.connect(path)
+    create_table_if_not_exists(conn, SCHEMA_V2)
+    timestamps_ms = (arrays.timestamps_ns // 1_000_000).tolist()
+    values = np.hstack((arrays.quaternions, arrays.positions)).tolist()
+    for i in range(0, n, chunk_size):
+        conn.executemany(insert_statement(SCHEMA_V2),
+                         ((t, *v) for t, v in zip(timestamps_ms[i:i + chunk_size], values[i:i + chunk_size])))
+    conn.commit()
+    conn.close()
+    return path
+
+
+def llh_lines(n: int, seed: int = SEED) -> list[str]:
+    arrays = survey_arrays(n, seed)
+    return [
+        llh_line(T0 + timedelta(milliseconds=PERIOD_MS * i), latitude, longitude, height, 1, 11,
+                 0.068, 0.11, 0.24, 1.8, 0.)
+        for i, (latitude, longitude, height) in enumerate(arrays.positions.tolist())
+    ]
+
+
+def llh_file(path: str, n: int, seed: int = SEED) -> str:
+    with open(path, "w") as f:
+        f.write("% synthetic LLH log\n")
+        f.writelines(line + "\n" for line in llh_lines(n, seed))
+    return path
+
+
+def nmea_lines(n: int, seed: int = SEED) -> list[str]:
+    """
+    n GGA sentences, each preceded by an RMC one
+    """
+    arrays = survey_arrays(n, seed)
+    lines = []
+    for i, (latitude, longitude, altitude) in enumerate(arrays.positions.tolist()):
+        timestamp = T0 + timedelta(milliseconds=PERIOD_MS * i)
+        lines.append(rmc_sentence(timestamp, latitude, longitude))
+        lines.append(gga_sentence(timestamp, latitude, longitude, altitude))
+    return lines
@@ -0,0 +1,29 @@
+import sqlite3
+
+import pytest
+
+from bok_drone_onboard_system.survey.data import load_data, load_arrays, iter_arrays
+
+
+def iter_all(conn) -> int:
+    return sum(len(chunk) for chunk in iter_arrays(conn))
+
+
+@pytest.mark.benchmark(group="load")
+def test_load_data(run, survey_db, size):
+    conn = sqlite3.connect(survey_db)
+    measures = run(load_data, conn, None, None, True)
+    assert len(measures) == size
+
+
+@pytest.mark.benchmark(group="load")
+def test_load_arrays(run, survey_db, size):
+    conn = sqlite3.connect(survey_db)
+    arrays = run(load_arrays, conn)
+    assert len(arrays) == size
+
+
+@pytest.mark.benchmark(group="load")
+def test_iter_arrays(run, survey_db, size):
+    conn = sqlite3.connect(survey_db)
+    assert run(iter_all, conn) == size
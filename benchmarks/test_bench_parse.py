@@ -0,0 +1,30 @@
+import pytest
+
+from benchmarks import generators
+from bok_drone_onboard_system.survey.emlid_reader import parse_llh, parse_llh_file
+from bok_drone_onboard_system.survey.nmea import parse_sentence
+
+
+def parse_all(parse, lines: list[str]) -> list:
+    return [parse(line) for line in lines]
+
+
+@pytest.mark.benchmark(group="parse")
+def test_parse_llh(run, size):
+    lines = generators.llh_lines(size)
+    entries = run(parse_all, parse_llh, lines)
+    assert len(entries) == size
+
+
+@pytest.mark.benchmark(group="parse")
+def test_parse_llh_file(run, size, tmp_path):
+    path = generators.llh_file(str(tmp_path / "solution.LLH"), size)
+    records = run(parse_llh_file, path)
+    assert len(records) == size
+
+
+@pytest.mark.benchmark(group="parse")
+def test_parse_sentence(run, size):
+    lines = generators.nmea_lines(size)
+    parsed = run(parse_all, parse_sentence, lines)
+    assert all(p is not None for p in parsed)
@@ -0,0 +1,34 @@
+import pytest
+
+from bok_drone_onboard_system.analysis.gps import wgs84_to_utm34n, wgs84_to_utm_array
+from bok_drone_onboard_system.survey_analyse import project_measure, project_arrays
+
+POLE_LENGTH = 2.57
+UTM_34N = 32634
+
+
+def convert_all(gps_points: list) -> list:
+    return [wgs84_to_utm34n(p) for p in gps_points]
+
+
+@pytest.mark.benchmark(group="project")
+def test_project_measure(run, survey_measures, size):
+    projected = run(project_measure, survey_measures, POLE_LENGTH)
+    assert len(projected) == size
+
+
+@pytest.mark.benchmark(group="project")
+def test_project_arrays(run, survey_arrays, size):
+    utm_coords, projections = run(project_arrays, survey_arrays, POLE_LENGTH, UTM_34N)
+    assert projections.shape == (size, 3)
+
+
+@pytest.mark.benchmark(group="project")
+def test_wgs84_to_utm34n(run, survey_measures, size):
+    gps_points = [m.gps_Point for m in survey_measures]
+    assert len(run(convert_all, gps_points)) == size
+
+
+@pytest.mark.benchmark(group="project")
+def test_wgs84_to_utm_array(run, survey_arrays, size):
+    assert run(wgs84_to_utm_array, survey_arrays.positions, UTM_34N).shape == (size, 3)
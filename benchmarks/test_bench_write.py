@@ -0,0 +1,74 @@
+import io
+import itertools
+import sqlite3
+
+import pytest
+
+from bok_drone_onboard_system.storage import BatchWriter
+from bok_drone_onboard_system.survey.data import create_table_if_not_exists, append_measure, insert_statement, \
+    SCHEMA_V2, to_epoch_ms
+from bok_drone_onboard_system.survey_analyse import write_projected, format_tsv_output, \
+    projected_measures_from_arrays, project_arrays
+
+CHUNK_SIZE = 10000
+
+
+def append_all(survey_measures: list) -> sqlite3.Connection:
+    """
+    One transaction per measure, as survey-acquire did, in memory to measure the Python and sqlite overhead only
+    """
+    conn = create_table_if_not_exists(sqlite3.connect(":memory:"))
+    for m in survey_measures:
+        append_measure(m.bno_quaternion, m.gps_Point, conn)
+    return conn
+
+
+def write_batches(path: str, rows: list[tuple]) -> str:
+    create_table_if_not_exists(sqlite3.connect(path)).close()
+    with BatchWriter(path, insert_statement(SCHEMA_V2), batch_size=1000) as writer:
+        for row in rows:
+            writer.put(row)
+    return path
+
+
+def projected_chunks(timestamps_ns, utm_coords, projections):
+    return [(timestamps_ns[i:i + CHUNK_SIZE], utm_coords[i:i + CHUNK_SIZE], projections[i:i + CHUNK_SIZE])
+            for i in range(0, len(timestamps_ns), CHUNK_SIZE)]
+
+
+def write_tsv(chunks) -> int:
+    return write_projected(chunks, io.StringIO())
+
+
+@pytest.mark.benchmark(group="write")
+def test_append_measure(run, survey_measures, size):
+    conn = run(append_all, survey_measures)
+    assert conn.execute("SELECT COUNT(*) FROM survey_records").fetchone()[0] == size
+
+
+@pytest.mark.benchmark(group="write")
+def test_batch_writer(run, survey_measures, size, tmp_path):
+    rows = [(to_epoch_ms(m.gps_Point.timestamp), *m.bno_quaternion, m.gps_Point.latitude, m.gps_Point.longitude,
+             m.gps_Point.altitude) for m in survey_measures]
+    # a new database for each round
+    paths = (str(tmp_path / f"batch-{i}.db") for i in itertools.count())
+    path = run(lambda: write_batches(next(paths), rows))
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM survey_records").fetchone()[0] == size
+    finally:
+        conn.close()
+
+
+@pytest.mark.benchmark(group="write")
+def test_write_projected(run, survey_arrays, size):
+    utm_coords, projections = project_arrays(survey_arrays, 2.57, 32634)
+    chunks = projected_chunks(survey_arrays.timestamps_ns, utm_coords, projections)
+    assert run(write_tsv, chunks) == size
+
+
+@pytest.mark.benchmark(group="write")
+def test_format_tsv_output(run, survey_arrays, size):
+    utm_coords, projections = project_arrays(survey_arrays, 2.57, 32634)
+    projected = projected_measures_from_arrays(survey_arrays.timestamps_ns, utm_coords, projections)
+    assert run(format_tsv_output, projected).count("\n") == size
@@ -1,3 +1,8 @@
-from bok_drone_onboard_system.analysis.gps import wgs84_to_utm34n
+from bok_drone_onboard_system.analysis.gps import (
+    get_transformer, utm_epsg, utm_epsg_for, wgs84_to_utm, wgs84_to_utm_array, wgs84_to_utm34n, wgs84_to_utm34n_array
+)
 
-__all__ = ['wgs84_to_utm34n']
\ No newline at end of file
+__all__ = [
+    'get_transformer', 'utm_epsg', 'utm_epsg_for', 'wgs84_to_utm', 'wgs84_to_utm_array',
+    'wgs84_to_utm34n', 'wgs84_to_utm34n_array',
+]
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+Time alignment of the BNO08x orientation on the GPS epochs.
+
+The BNO08x is sampled at a higher rate than the GPS, on its own clock. For each GPS epoch, the orientation is
+interpolated by SLERP between the two surrounding BNO08x samples, at `gps time + latency offset`.
+    * offline, over whole stored tables: `slerp_quaternions` and `align_survey`, vectorized with scipy Slerp
+    * live, while acquiring: `OrientationBuffer`, holding a bounded lookback of samples
+
+Quaternions are BNO08x ones, as (i, j, k, real), which is the scipy scalar last convention.
+"""
+import bisect
+import logging
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from scipy.spatial.transform import Rotation as R, Slerp
+
+from bok_drone_onboard_system.bno.data.reports import BNOReports
+from bok_drone_onboard_system.survey.data import SurveyArrays
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+NS_PER_SECOND = 1_000_000_000
+
+
+def to_epoch_ns(timestamp: datetime) -> int:
+    """
+    Naive datetimes are considered as UTC.
+    """
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (timestamp - EPOCH) // timedelta(microseconds=1) * 1000
+
+
+def _valid_samples(timestamps_ns: np.ndarray, quaternions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    :return: the samples with a defined quaternion, with strictly increasing timestamps
+    """
+    timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+    quaternions = np.asarray(quaternions, dtype=float).reshape(-1, 4)
+    defined = np.all(np.isfinite(quaternions), axis=1) & (np.linalg.norm(quaternions, axis=1) > 0)
+    timestamps_ns, quaternions = timestamps_ns[defined], quaternions[defined]
+    order = np.argsort(timestamps_ns, kind='stable')
+    timestamps_ns, first = np.unique(timestamps_ns[order], return_index=True)
+    return timestamps_ns, quaternions[order][first]
+
+
+def slerp_quaternions(
+        source_timestamps_ns: np.ndarray,
+        source_quaternions: np.ndarray,
+        target_timestamps_ns: np.ndarray,
+        max_gap: float | None = 0.5,
+) -> np.ndarray:
+    """
+    Interpolate the orientation at each target timestamp, in a single scipy Slerp call.
+
+    :param source_timestamps_ns: (N,) epoch in nanoseconds of the orientation samples
+    :param source_quaternions: (N,4) orientation samples. Undefined ones (NaN) are ignored.
+    :param target_timestamps_ns: (M,) epoch in nanoseconds where the orientation is wanted
+    :param max_gap: maximum time in seconds between the two samples surrounding a target. None for no limit.
+    :return: (M,4) quaternions, NaN for targets outside the samples range or in a gap larger than max_gap
+    """
+    timestamps_ns, quaternions = _valid_samples(source_timestamps_ns, source_quaternions)
+    targets = np.asarray(target_timestamps_ns, dtype=np.int64)
+    result = np.full((len(targets), 4), np.nan)
+    if len(timestamps_ns) < 2 or len(targets) == 0:
+        return result
+
+    # the two surrounding samples are [after - 1] and [after]; a target on the last sample uses the last interval
+    after = np.clip(np.searchsorted(timestamps_ns, targets, side='right'), 1, len(timestamps_ns) - 1)
+    inside = (targets >= timestamps_ns[0]) & (targets <= timestamps_ns[-1])
+    if max_gap is not None:
+        inside &= (timestamps_ns[after] - timestamps_ns[after - 1]) <= max_gap * NS_PER_SECOND
+    if not np.any(inside):
+        return result
+
+    # relative seconds keep the float precision of nanoseconds epochs
+    times = (timestamps_ns - timestamps_ns[0]) / NS_PER_SECOND
+    slerp = Slerp(times, R.from_quat(quaternions))
+    result[inside] = slerp((targets[inside] - timestamps_ns[0]) / NS_PER_SECOND).as_quat()
+    return result
+
+
+def align_survey(
+        survey_arrays: SurveyArrays,
+        bno_reports: BNOReports,
+        latency_offset: float = 0.,
+        max_gap: float | None = 0.5,
+) -> SurveyArrays:
+    """
+    Replace the quaternions stored with the GPS positions by the ones interpolated from the BNO08x reports.
+    Where no interpolation is possible (no surrounding reports), the stored quaternion is kept.
+    Records left without a defined quaternion or position are dropped.
+
+    :param latency_offset: seconds added to the GPS timestamps to get the BNO08x timestamps
+    :param max_gap: see slerp_quaternions
+    """
+    targets = survey_arrays.timestamps_ns + round(latency_offset * NS_PER_SECOND)
+    interpolated = slerp_quaternions(bno_reports.timestamps_us * 1000, bno_reports.quaternion, targets, max_gap)
+    is_interpolated = np.all(np.isfinite(interpolated), axis=1)
+    quaternions = np.where(is_interpolated[:, None], interpolated, survey_arrays.quaternions)
+
+    defined = np.all(np.isfinite(quaternions), axis=1) & np.all(np.isfinite(survey_arrays.positions), axis=1)
+    logger.info(f"Interpolated {np.count_nonzero(is_interpolated)} orientations out of {len(survey_arrays)}, "
+                f"{np.count_nonzero(defined)} defined measures")
+    return SurveyArrays(survey_arrays.timestamps_ns[defined], quaternions[defined], survey_arrays.positions[defined])
+
+
+class OrientationBuffer:
+    """
+    Recent timestamped orientation samples, to interpolate the orientation at a GPS epoch while acquiring.
+    Samples must be pushed in time order. Samples older than `lookback` seconds before the last one are dropped.
+
+    :param lookback: time span of the kept samples, in seconds
+    :param max_gap: maximum time between the two samples surrounding an interpolated timestamp, in seconds
+    """
+
+    def __init__(self, lookback: float = 2., max_gap: float = 0.5):
+        self.lookback_ns = round(lookback * NS_PER_SECOND)
+        self.max_gap_ns = round(max_gap * NS_PER_SECOND)
+        self._timestamps = deque()
+        self._quaternions = deque()
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def push(self, timestamp_ns: int, quaternion: tuple):
+        if self._timestamps and timestamp_ns <= self._timestamps[-1]:
+            return
+        self._timestamps.append(timestamp_ns)
+        self._quaternions.append(quaternion)
+        oldest = timestamp_ns - self.lookback_ns
+        while self._timestamps[0] < oldest:
+            self._timestamps.popleft()
+            self._quaternions.popleft()
+
+    def at(self, timestamp_ns: int) -> tuple | None:
+        """
+        :return: the orientation interpolated at timestamp_ns, or None if it is not surrounded by samples
+        """
+        after = bisect.bisect_left(self._timestamps, timestamp_ns)
+        if after == len(self._timestamps):
+            return None
+        t1 = self._timestamps[after]
+        if t1 == timestamp_ns:
+            return tuple(self._quaternions[after])
+        if after == 0:
+            return None
+        t0 = self._timestamps[after - 1]
+        if t1 - t0 > self.max_gap_ns:
+            return None
+        slerp = Slerp([0., 1.], R.from_quat([self._quaternions[after - 1], self._quaternions[after]]))
+        return tuple(slerp((timestamp_ns - t0) / (t1 - t0)).as_quat().tolist())
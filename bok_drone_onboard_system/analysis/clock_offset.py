@@ -0,0 +1,175 @@
+"""
+Estimation of the clock offset between the GPS timestamps and the BNO08x (host clock) timestamps.
+
+When the pole carrier turns, the GPS heading and the BNO08x yaw change together. The offset is the lag maximizing
+the cross-correlation of the GPS heading rate (from the UTM velocity) and of the BNO08x yaw rate:
+    * both signals are resampled on a common uniform time grid
+    * the cross-correlation over all lags is computed at once with FFTs, and its peak refined to sub-sample
+Rates are taken in absolute value, so that the heading (clockwise) and yaw (counterclockwise) conventions,
+as well as the BNO08x mounting, do not matter.
+
+The offset follows the `latency_offset` convention of analysis.alignment:
+seconds added to the GPS timestamps to get the BNO08x timestamps.
+"""
+import logging
+
+import numpy as np
+from scipy.spatial.transform import Rotation as R
+
+from bok_drone_onboard_system.analysis.alignment import NS_PER_SECOND
+from bok_drone_onboard_system.analysis.gps import wgs84_to_utm_array
+from bok_drone_onboard_system.bno.data.reports import BNOReports
+from bok_drone_onboard_system.survey.data import SurveyArrays
+
+logger = logging.getLogger(__name__)
+
+
+class ClockOffset:
+    """
+    :param offset: seconds added to the GPS timestamps to get the BNO08x timestamps
+    :param confidence: correlation coefficient of the two signals at that offset, between 0 and 1
+    """
+    offset: float
+    confidence: float
+
+    def __init__(self, offset: float, confidence: float):
+        self.offset = offset
+        self.confidence = confidence
+
+    def to_dict(self) -> dict:
+        return {"offset": self.offset, "confidence": self.confidence}
+
+    @staticmethod
+    def from_dict(d: dict) -> "ClockOffset":
+        return ClockOffset(d["offset"], d["confidence"])
+
+    def __repr__(self):
+        return f"offset={self.offset * 1000:.1f}ms confidence={self.confidence:.3f}"
+
+
+def _seconds(timestamps_ns: np.ndarray, reference_ns: int) -> np.ndarray:
+    return (np.asarray(timestamps_ns, dtype=np.int64) - reference_ns) / NS_PER_SECOND
+
+
+def _rate(times: np.ndarray, angles: np.ndarray) -> np.ndarray:
+    """
+    :return: absolute angular rate in rad/s of an angle signal, in radians
+    """
+    if len(times) < 2:
+        return np.zeros(len(times))
+    return np.abs(np.gradient(np.unwrap(angles), times))
+
+
+def gps_heading_rate(timestamps_ns: np.ndarray, positions: np.ndarray, min_speed: float = 0.2) -> np.ndarray:
+    """
+    :param positions: (N,3) WGS84 positions as (latitude, longitude, altitude)
+    :param min_speed: below this horizontal speed in m/s, the heading is noise and the rate is set to 0
+    :return: (N,) absolute heading rate in rad/s
+    """
+    if len(timestamps_ns) < 2:
+        return np.zeros(len(timestamps_ns))
+    times = _seconds(timestamps_ns, timestamps_ns[0])
+    utm = wgs84_to_utm_array(positions)
+    vx = np.gradient(utm[:, 0], times)
+    vy = np.gradient(utm[:, 1], times)
+    rate = _rate(times, np.arctan2(vx, vy))
+    rate[np.hypot(vx, vy) < min_speed] = 0.
+    return rate
+
+
+def imu_yaw_rate(timestamps_ns: np.ndarray, quaternions: np.ndarray) -> np.ndarray:
+    """
+    :param quaternions: (N,4) BNO08x quaternions as (i, j, k, real)
+    :return: (N,) absolute yaw rate in rad/s
+    """
+    if len(timestamps_ns) < 2:
+        return np.zeros(len(timestamps_ns))
+    yaw = R.from_quat(quaternions).as_euler('ZYX')[:, 0]
+    return _rate(_seconds(timestamps_ns, timestamps_ns[0]), yaw)
+
+
+def _standardized_on_grid(grid: np.ndarray, times: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Resample on the grid, with zero mean and unit variance inside the signal time range, and 0 outside
+    :return: the resampled signal, and 1 inside the signal time range, 0 outside
+    """
+    resampled = np.interp(grid, times, values)
+    inside = (grid >= times[0]) & (grid <= times[-1])
+    signal = np.zeros(len(grid))
+    std = resampled[inside].std()
+    if std > 0:
+        signal[inside] = (resampled[inside] - resampled[inside].mean()) / std
+    return signal, inside.astype(float)
+
+
+def _correlate(a: np.ndarray, b: np.ndarray, n_fft: int) -> np.ndarray:
+    """
+    :return: correlation[k] = sum_n a[n] * b[n + k], negative lags k at the end
+    """
+    return np.fft.irfft(np.conj(np.fft.rfft(a, n_fft)) * np.fft.rfft(b, n_fft), n_fft)
+
+
+def cross_correlation_offset(
+        timestamps_a_ns: np.ndarray, signal_a: np.ndarray,
+        timestamps_b_ns: np.ndarray, signal_b: np.ndarray,
+        max_offset: float = 2., resolution: float = 0.01,
+) -> ClockOffset:
+    """
+    Find the offset d, within [-max_offset, max_offset], such that signal_b(t + d) best matches signal_a(t).
+
+    :param timestamps_a_ns: (N,) increasing epoch in nanoseconds of signal_a
+    :param timestamps_b_ns: (M,) increasing epoch in nanoseconds of signal_b
+    :param max_offset: maximum absolute offset searched, in seconds
+    :param resolution: time step of the resampling grid, in seconds. The peak is refined below it.
+    """
+    if len(timestamps_a_ns) < 2 or len(timestamps_b_ns) < 2:
+        raise ValueError("Not enough samples to estimate an offset")
+    reference_ns = int(min(timestamps_a_ns[0], timestamps_b_ns[0]))
+    times_a = _seconds(timestamps_a_ns, reference_ns)
+    times_b = _seconds(timestamps_b_ns, reference_ns)
+    grid = np.arange(0., max(times_a[-1], times_b[-1]) + resolution, resolution)
+    a, inside_a = _standardized_on_grid(grid, times_a, signal_a)
+    b, inside_b = _standardized_on_grid(grid, times_b, signal_b)
+
+    # zero padded so that negative lags do not wrap on positive ones
+    n = len(grid)
+    n_fft = 1 << (2 * n - 1).bit_length()
+    max_lag = min(int(max_offset / resolution), n - 1)
+    lags = np.arange(-max_lag, max_lag + 1)
+    correlation = _correlate(a, b, n_fft)[lags]
+    # each lag is normalized by its number of overlapping samples, to compare lags as correlation coefficients
+    overlap = np.rint(_correlate(inside_a, inside_b, n_fft)[lags])
+    values = correlation / np.maximum(overlap, 1)
+
+    best = int(np.argmax(values))
+    refinement = 0.
+    if 0 < best < len(lags) - 1:
+        previous, peak, following = values[best - 1:best + 2]
+        curvature = previous - 2 * peak + following
+        if curvature < 0:
+            refinement = 0.5 * (previous - following) / curvature
+    return ClockOffset((lags[best] + refinement) * resolution, float(np.clip(values[best], 0., 1.)))
+
+
+def estimate_clock_offset(
+        survey_arrays: SurveyArrays,
+        bno_reports: BNOReports,
+        max_offset: float = 2.,
+        resolution: float = 0.01,
+        min_speed: float = 0.2,
+) -> ClockOffset:
+    """
+    Estimate the offset between the GPS timestamps of the survey records and the BNO08x reports timestamps.
+    """
+    defined = np.all(np.isfinite(survey_arrays.positions), axis=1)
+    gps_ns = survey_arrays.timestamps_ns[defined]
+    gps_rate = gps_heading_rate(gps_ns, survey_arrays.positions[defined], min_speed)
+
+    # the BNO08x reports zero quaternions while it settles
+    defined = np.all(np.isfinite(bno_reports.quaternion), axis=1) & (np.linalg.norm(bno_reports.quaternion, axis=1) > 0)
+    imu_ns = bno_reports.timestamps_us[defined] * 1000
+    imu_rate = imu_yaw_rate(imu_ns, bno_reports.quaternion[defined])
+
+    clock_offset = cross_correlation_offset(gps_ns, gps_rate, imu_ns, imu_rate, max_offset, resolution)
+    logger.info(f"Estimated clock offset on {len(gps_ns)} GPS and {len(imu_ns)} BNO08x samples: {clock_offset}")
+    return clock_offset
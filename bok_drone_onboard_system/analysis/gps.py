@@ -1,31 +1,111 @@
 """
 GPS coordinate conversion utilities.
+
+Building CRS and transformers with pyproj costs milliseconds, so transformers are kept in a registry,
+and both per point and array conversions pay that cost once per process and (source, target) pair.
 """
+from functools import lru_cache
 from typing import Tuple
+
+import numpy as np
 import pyproj
 from bok_drone_onboard_system.survey.gps import GPSPoint
 
+WGS84_EPSG = 4326
+UTM34N_EPSG = 32634
+
+
+@lru_cache(maxsize=32)
+def get_transformer(source_epsg: int, target_epsg: int) -> pyproj.Transformer:
+    """
+    Cached transformer between two coordinate systems, with (longitude, latitude) / (x, y) axis order.
+    """
+    return pyproj.Transformer.from_crs(
+        pyproj.CRS.from_epsg(source_epsg),
+        pyproj.CRS.from_epsg(target_epsg),
+        always_xy=True,
+    )
+
+
+def utm_epsg(latitude: float, longitude: float) -> int:
+    """
+    EPSG code of the WGS84 UTM zone containing a point (standard 6 degree zones, without the Norway/Svalbard exceptions).
+    """
+    zone = int((longitude + 180) // 6) % 60 + 1
+    return (32600 if latitude >= 0 else 32700) + zone
+
+
+def utm_epsg_for(positions: np.ndarray) -> int:
+    """
+    EPSG code of the UTM zone for a whole data set, so that all its points are projected in the same system.
+    The zone is the one of the median position.
+
+    Args:
+        positions: (N,3) array of (latitude, longitude, altitude)
+    """
+    positions = np.asarray(positions, dtype=float)
+    if len(positions) == 0:
+        raise ValueError("Cannot pick a UTM zone without positions")
+    latitude, longitude = np.nanmedian(positions[:, 0:2], axis=0)
+    return utm_epsg(float(latitude), float(longitude))
+
+
+def wgs84_to_utm(gps_point: GPSPoint, epsg: int | None = None) -> Tuple[float, float, float]:
+    """
+    Convert WGS84 GPS coordinates to UTM coordinates.
+
+    Args:
+        gps_point: A GPSPoint object containing WGS84 coordinates (latitude, longitude, altitude)
+        epsg: EPSG code of the UTM zone. If None, the zone containing the point.
+
+    Returns:
+        A tuple of three floats (x, y, z). The altitude remains the same.
+    """
+    if epsg is None:
+        epsg = utm_epsg(gps_point.latitude, gps_point.longitude)
+    x, y = get_transformer(WGS84_EPSG, epsg).transform(gps_point.longitude, gps_point.latitude)
+    return (x, y, gps_point.altitude)
+
+
+def wgs84_to_utm_array(positions: np.ndarray, epsg: int | None = None) -> np.ndarray:
+    """
+    Convert WGS84 GPS coordinates to UTM coordinates, in a single pyproj call.
+
+    Args:
+        positions: (N,3) array of (latitude, longitude, altitude)
+        epsg: EPSG code of the UTM zone. If None, picked from the data with utm_epsg_for.
+
+    Returns:
+        (N,3) array of (x, y, z). The altitude remains the same.
+    """
+    positions = np.asarray(positions, dtype=float)
+    if epsg is None:
+        epsg = utm_epsg_for(positions)
+    x, y = get_transformer(WGS84_EPSG, epsg).transform(positions[:, 1], positions[:, 0])
+    return np.column_stack((x, y, positions[:, 2]))
+
+
 def wgs84_to_utm34n(gps_point: GPSPoint) -> Tuple[float, float, float]:
     """
     Convert WGS84 GPS coordinates to UTM zone 34N coordinates using pyproj.
-    
+
     Args:
         gps_point: A GPSPoint object containing WGS84 coordinates (latitude, longitude, altitude)
-        
+
     Returns:
         A tuple of three floats (x, y, z) representing the coordinates in UTM zone 34N
     """
-    # Create a transformer from WGS84 to UTM zone 34N
-    wgs84 = pyproj.CRS.from_epsg(4326)  # WGS84
-    utm34n = pyproj.CRS.from_epsg(32634)  # UTM zone 34N
-    
-    # Create the transformer
-    transformer = pyproj.Transformer.from_crs(wgs84, utm34n, always_xy=True)
-    
-    # Transform the coordinates
-    x, y = transformer.transform(gps_point.longitude, gps_point.latitude)
-    
-    # The z coordinate (altitude) remains the same
-    z = gps_point.altitude
-    
-    return (x, y, z)
\ No newline at end of file
+    return wgs84_to_utm(gps_point, UTM34N_EPSG)
+
+
+def wgs84_to_utm34n_array(positions: np.ndarray) -> np.ndarray:
+    """
+    Convert WGS84 GPS coordinates to UTM zone 34N coordinates, in a single pyproj call.
+
+    Args:
+        positions: (N,3) array of (latitude, longitude, altitude)
+
+    Returns:
+        (N,3) array of (x, y, z) in UTM zone 34N. The altitude remains the same.
+    """
+    return wgs84_to_utm_array(positions, UTM34N_EPSG)
@@ -10,12 +10,30 @@ class MockBNO08X:
     def __init__(self, fail_rate: float = 0.):
         self.fail_rate = fail_rate
 
-    @property
-    def quaternion(self):
+    def _maybe_fail(self):
         if random.random() < self.fail_rate:
             raise OSError("MockBNO08X: Random fail error")
+
+    @property
+    def quaternion(self):
+        self._maybe_fail()
         return random.random(), random.random(), random.random(), random.random()
 
+    @property
+    def acceleration(self):
+        self._maybe_fail()
+        return random.random(), random.random(), 9.81 + random.random()
+
+    @property
+    def gyro(self):
+        self._maybe_fail()
+        return random.random(), random.random(), random.random()
+
+    @property
+    def magnetic(self):
+        self._maybe_fail()
+        return 20 * random.random(), 20 * random.random(), -40 * random.random()
+
 
 def load_bno(is_mock: bool = False) -> ():
     if is_mock:
@@ -1,16 +1,22 @@
 import logging
-import sqlite3
 from datetime import datetime, timezone
 from sqlite3 import Connection
+from typing import Generator
+
+import numpy as np
+import pandas as pd
+
+from bok_drone_onboard_system.storage.sqlite import open_connection
 
 logger = logging.getLogger(__name__)
 
 TABLE_NAME= "bno_data"
+INSERT_STMT = f"INSERT INTO {TABLE_NAME} (timestamp, quat_i, quat_j, quat_k, quat_real) VALUES (?, ?, ?, ?, ?)"
 
 
 def db_conn(sqlite_filename: str) -> Connection:
     logger.info(f"Connecting to DB {sqlite_filename}")
-    return sqlite3.connect(sqlite_filename)
+    return open_connection(sqlite_filename)
 
 
 def create_table_if_not_exists(conn: Connection):
@@ -28,12 +34,64 @@ def create_table_if_not_exists(conn: Connection):
     return conn
 
 
-def append_measure(quaternion: tuple, conn: Connection):
+def measure_row(quaternion: tuple) -> tuple:
+    """
+    Build the row to be inserted with INSERT_STMT, timestamped now.
+    """
     current_time = datetime.now(timezone.utc)
     timestamp = current_time.isoformat(timespec='milliseconds')
+    return (timestamp, *quaternion)
 
-    conn.execute(
-        f"INSERT INTO {TABLE_NAME} (timestamp, quat_i, quat_j, quat_k, quat_real) VALUES (?, ?, ?, ?, ?)",
-        (timestamp, *quaternion),
-    )
+
+def append_measure(quaternion: tuple, conn: Connection):
+    conn.execute(INSERT_STMT, measure_row(quaternion))
     conn.commit()
+
+
+def quaternions_query(start: datetime | None, end: datetime | None, columns: str) -> tuple[str, list]:
+    """
+    :return: the query selecting columns between two timestamps, compared as ISO text as they are stored,
+        ordered by time, and its parameters
+    """
+    query = f"SELECT {columns} FROM {TABLE_NAME}"
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append("timestamp >= ?")
+        params.append(start.isoformat(timespec='milliseconds'))
+    if end is not None:
+        conditions.append("timestamp < ?")
+        params.append(end.isoformat(timespec='milliseconds'))
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query + " ORDER BY timestamp", params
+
+
+def load_quaternions(conn: Connection, start: datetime | None = None, end: datetime | None = None) -> np.ndarray:
+    """
+    Quaternions between two timestamps
+    :param start: inclusive starting timestamp. If None, start from the beginning.
+    :param end: exclusive ending timestamp. If None, end at the end.
+    :return: (N,4) array of quaternions as (i, j, k, real)
+    """
+    rows = conn.execute(*quaternions_query(start, end, "quat_i, quat_j, quat_k, quat_real")).fetchall()
+    return np.array(rows, dtype=float).reshape(-1, 4)
+
+
+def iter_quaternions(
+        conn: Connection, start: datetime | None = None, end: datetime | None = None, chunk_size: int = 10000
+) -> Generator[tuple[np.ndarray, np.ndarray], None, None]:
+    """
+    Stream the timestamped quaternions between two timestamps, in chunks of at most chunk_size rows.
+    The ISO timestamps are parsed at once for each chunk; naive ones are considered as UTC.
+    :return: for each chunk, the (N,) int64 epoch timestamps in nanoseconds and the (N,4) quaternions
+    """
+    query, params = quaternions_query(start, end, "timestamp, quat_i, quat_j, quat_k, quat_real")
+    cursor = conn.execute(query, params)
+    try:
+        while rows := cursor.fetchmany(chunk_size):
+            timestamps = pd.to_datetime([r[0] for r in rows], utc=True, format="ISO8601")
+            quaternions = np.array([r[1:] for r in rows], dtype=float).reshape(-1, 4)
+            yield timestamps.as_unit("ns").asi8, quaternions
+    finally:
+        cursor.close()
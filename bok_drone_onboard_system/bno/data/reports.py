@@ -0,0 +1,161 @@
+"""
+Compact storage of all the BNO08x reports enabled by `load_bno_real`.
+
+One row per tick, keyed by an integer epoch in microseconds. As an INTEGER PRIMARY KEY is the rowid itself,
+there is no separate index to maintain, and range scans by time are seeks on the table b-tree.
+"""
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from sqlite3 import Connection
+from typing import Generator
+
+import numpy as np
+
+from bok_drone_onboard_system.storage import sqlite
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+TABLE_NAME = "bno_reports"
+VALUE_COLUMNS = (
+    "accel_x", "accel_y", "accel_z",
+    "gyro_x", "gyro_y", "gyro_z",
+    "mag_x", "mag_y", "mag_z",
+    "quat_i", "quat_j", "quat_k", "quat_real",
+)
+# A batch is written in a single executemany: ignore the (rare) duplicated timestamp rather than failing the batch
+INSERT_STMT = (
+    f"INSERT OR IGNORE INTO {TABLE_NAME} (timestamp_us, {', '.join(VALUE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * (len(VALUE_COLUMNS) + 1))})"
+)
+
+
+class BNOReports:
+    """
+    Columnar view of BNO08x reports, one row per tick.
+    """
+    timestamps_us: np.ndarray
+    acceleration: np.ndarray
+    gyro: np.ndarray
+    magnetic: np.ndarray
+    quaternion: np.ndarray
+
+    def __init__(self, timestamps_us: np.ndarray, values: np.ndarray):
+        """
+        :param timestamps_us: (N,) int64 epoch in microseconds
+        :param values: (N,13) float array, in the VALUE_COLUMNS order
+        """
+        self.timestamps_us = timestamps_us
+        self.acceleration = values[:, 0:3]
+        self.gyro = values[:, 3:6]
+        self.magnetic = values[:, 6:9]
+        self.quaternion = values[:, 9:13]
+
+    def __len__(self):
+        return len(self.timestamps_us)
+
+
+def create_table_if_not_exists(conn: Connection) -> Connection:
+    logger.info(f"Creating table {TABLE_NAME} if not exists")
+    columns = ",\n".join(f"        {c} REAL" for c in VALUE_COLUMNS)
+    stmt = f"""
+    CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+        timestamp_us INTEGER PRIMARY KEY,
+{columns}
+    )"""
+    conn.execute(stmt)
+    conn.commit()
+    return conn
+
+
+def table_exists(conn: Connection) -> bool:
+    return sqlite.table_exists(conn, TABLE_NAME)
+
+
+def now_us() -> int:
+    return time.time_ns() // 1000
+
+
+def to_epoch_us(timestamp: datetime) -> int:
+    """
+    Naive datetimes are considered as UTC.
+    """
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+
+def read_reports(bno) -> tuple:
+    """
+    Read all the enabled reports from the BNO08x
+    :return: flat tuple of values, in the VALUE_COLUMNS order
+    """
+    return (*bno.acceleration, *bno.gyro, *bno.magnetic, *bno.quaternion)
+
+
+def report_row(reports: tuple, timestamp_us: int | None = None) -> tuple:
+    """
+    Build the row to be inserted with INSERT_STMT. Timestamped now, unless timestamp_us is given.
+    """
+    return (now_us() if timestamp_us is None else timestamp_us, *reports)
+
+
+def reports_query(start: datetime | None, end: datetime | None) -> tuple[str, list]:
+    """
+    :return: the query selecting (timestamp_us, *VALUE_COLUMNS) between two timestamps, ordered by time,
+        and its parameters
+    """
+    query = f"SELECT timestamp_us, {', '.join(VALUE_COLUMNS)} FROM {TABLE_NAME}"
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append("timestamp_us >= ?")
+        params.append(to_epoch_us(start))
+    if end is not None:
+        conditions.append("timestamp_us < ?")
+        params.append(to_epoch_us(end))
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query + " ORDER BY timestamp_us", params
+
+
+def load_reports(conn: Connection, start: datetime | None = None, end: datetime | None = None) -> BNOReports:
+    """
+    Load the reports between two timestamps
+    :param start: inclusive starting timestamp. If None, start from the beginning.
+    :param end: exclusive ending timestamp. If None, end at the end.
+    """
+    rows = conn.execute(*reports_query(start, end)).fetchall()
+    timestamps = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    values = np.array([r[1:] for r in rows], dtype=float).reshape(len(rows), len(VALUE_COLUMNS))
+    return BNOReports(timestamps, values)
+
+
+def iter_reports(
+        conn: Connection, start: datetime | None = None, end: datetime | None = None, chunk_size: int = 10000
+) -> Generator[tuple[np.ndarray, np.ndarray], None, None]:
+    """
+    Stream the reports between two timestamps, as load_reports, in chunks of at most chunk_size rows
+    :return: for each chunk, the (N,) int64 timestamps in microseconds and the (N,13) values
+    """
+    cursor = conn.execute(*reports_query(start, end))
+    try:
+        while rows := cursor.fetchmany(chunk_size):
+            timestamps = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+            yield timestamps, np.array([r[1:] for r in rows], dtype=float).reshape(len(rows), len(VALUE_COLUMNS))
+    finally:
+        cursor.close()
+
+
+def load_reports_around(conn: Connection, timestamps_ns: np.ndarray, offset: float = 0., margin: float = 1.) -> BNOReports:
+    """
+    Load the reports covering a time series of other timestamps (e.g. survey records), shifted by offset seconds,
+    with margin seconds before and after.
+    """
+    if len(timestamps_ns) == 0:
+        return BNOReports(np.empty(0, dtype=np.int64), np.empty((0, len(VALUE_COLUMNS))))
+    start_us = int(timestamps_ns[0]) // 1000 + round((offset - margin) * 1_000_000)
+    end_us = int(timestamps_ns[-1]) // 1000 + round((offset + margin) * 1_000_000) + 1
+    return load_reports(conn, EPOCH + timedelta(microseconds=start_us), EPOCH + timedelta(microseconds=end_us))
@@ -1,14 +1,46 @@
 import argparse
+import contextlib
 import logging
 import time
 
 from bok_drone_onboard_system.bno import load_bno
-from bok_drone_onboard_system.bno.data import db_conn, create_table_if_not_exists, append_measure
+from bok_drone_onboard_system.bno.data import create_table_if_not_exists, measure_row, INSERT_STMT
+from bok_drone_onboard_system.bno.data import reports
+from bok_drone_onboard_system.metrics import Registry, serve_metrics, stage_timer, count_error, samples_counter, \
+    reconnections_counter, instrument_writer, instrument_scheduler, instrument_supervisor
 from bok_drone_onboard_system.positioner import Vector, vector_from_quaternion
+from bok_drone_onboard_system.replay import ReplayBNO08X, ReplayClock
+from bok_drone_onboard_system.scheduler import FixedRateScheduler
+from bok_drone_onboard_system.storage import BatchWriter, gaps
+from bok_drone_onboard_system.storage.sqlite import open_connection, Checkpointer, WAL_AUTOCHECKPOINT
+from bok_drone_onboard_system.supervisor import DeviceSupervisor, RetryPolicy
 
 logger = logging.getLogger(__name__)
 
 
+def quaternion_sample(bno) -> tuple[tuple, tuple]:
+    """
+    :return: the bno_data row and the quaternion
+    """
+    quat = bno.quaternion
+    return measure_row(quat), quat
+
+
+def full_sample(bno) -> tuple[tuple, tuple]:
+    """
+    :return: the bno_reports row (accelerometer, gyroscope, magnetometer and rotation vector) and the quaternion
+    """
+    values = reports.read_reports(bno)
+    return reports.report_row(values), values[-4:]
+
+
+# for each capture mode: table creation, insert statement and sampling function
+CAPTURE_MODES = {
+    "quaternion": (create_table_if_not_exists, INSERT_STMT, quaternion_sample),
+    "full": (reports.create_table_if_not_exists, reports.INSERT_STMT, full_sample),
+}
+
+
 def main():
     logging.basicConfig(level=logging.INFO)
     parser = argparse.ArgumentParser(description="acquire data from BNO08x and store in sqllite DB.")
@@ -31,44 +63,189 @@ def main():
         default=0.1,
         help="How often to read data from BNO08x is seconds. Default is 0.1 second."
     )
+    parser.add_argument(
+        "--mode",
+        choices=sorted(CAPTURE_MODES),
+        default="quaternion",
+        help="quaternion: store the rotation vector in bno_data. "
+             "full: store accelerometer, gyroscope, magnetometer and rotation vector reports in bno_reports. "
+             "Default is quaternion."
+    )
+    parser.add_argument(
+        "--catch-up",
+        action="store_true",
+        help="When reading falls behind, read the missed samples as fast as possible instead of skipping them."
+    )
     parser.add_argument(
         "--mock",
         action="store_true",
         help="Do not read on BNO08x, but generate random data. "
     )
+    parser.add_argument(
+        "--replay-bno",
+        type=str,
+        help="Do not read on BNO08x, but replay the bno_reports (or bno_data) of this sqlite database."
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=1.,
+        help="Speed factor of --replay-bno. 0 replays one report per read, as fast as possible. "
+             "Default is 1."
+    )
     parser.add_argument(
         "--log-level",
         type=str,
         default="INFO",
         help="the log level. Default is INFO. Options are: DEBUG, INFO, WARNING, ERROR, CRITICAL"
     )
+    parser.add_argument(
+        "--read-retries",
+        type=int,
+        default=5,
+        help="Number of retries of a failed BNO08x read, with a sub-millisecond backoff, before reopening the device. "
+             "Default is 5."
+    )
+    parser.add_argument(
+        "--max-reopen-delay",
+        type=float,
+        default=3.,
+        help="Maximum delay in seconds between two attempts to reopen a lost device, starting at 0.1. Default is 3."
+    )
+    parser.add_argument(
+        "--metrics-address",
+        type=str,
+        help="serve the metrics in the Prometheus text format on /metrics, at host:port (e.g. 127.0.0.1:9100) "
+             "or on a unix socket path"
+    )
+    parser.add_argument(
+        "--status-interval",
+        type=float,
+        default=60.,
+        help="Seconds between two JSON status lines of the metrics in the log, 0 to disable. Default is 60."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Maximum number of measurements written to the DB in one transaction. Default is 100."
+    )
+    parser.add_argument(
+        "--flush-interval",
+        type=float,
+        default=0.5,
+        help="Maximum delay in seconds before a measurement is committed to the DB. Default is 0.5 second."
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=10000,
+        help="Maximum number of measurements waiting to be written. Measurements are dropped beyond. Default is 10000."
+    )
+    parser.add_argument(
+        "--synchronous",
+        type=str,
+        default="NORMAL",
+        help="sqlite synchronous mode. Default is NORMAL. Options are: OFF, NORMAL, FULL, EXTRA"
+    )
+    parser.add_argument(
+        "--no-wal",
+        action="store_true",
+        help="Do not use sqlite write-ahead log journal mode."
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=30.,
+        help="Seconds between two WAL checkpoints, run in the background rather than by the commits. "
+             "0 leaves them to the commits. Default is 30."
+    )
     args = parser.parse_args()
     show_orientation = args.show_orientation
     v_nat = Vector(1, 0, 0)
 
-    connection = db_conn(args.db)
-    create_table_if_not_exists(connection)
-    bno = None
+    create_table, insert_stmt, sample = CAPTURE_MODES[args.mode]
+    wal = not args.no_wal
+    connection = open_connection(args.db, wal=wal, synchronous=args.synchronous)
+    create_table(connection)
+    gaps.create_table_if_not_exists(connection)
+    connection.close()
+    # the background checkpoints replace the ones run by the commits
+    checkpoints = wal and args.checkpoint_interval > 0
+    connection_options = {
+        "wal": wal,
+        "synchronous": args.synchronous,
+        "wal_autocheckpoint": 0 if checkpoints else WAL_AUTOCHECKPOINT,
+    }
+    writer = BatchWriter(
+        args.db,
+        insert_stmt,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        max_queue=args.queue_size,
+        **connection_options,
+    )
+    gaps_writer = BatchWriter(args.db, gaps.INSERT_STMT, flush_interval=args.flush_interval, **connection_options)
+    registry = Registry()
+    instrument_writer(registry, "bno", writer)
+    with contextlib.ExitStack() as stack:
+        if checkpoints:
+            stack.enter_context(Checkpointer(args.db, args.checkpoint_interval))
+        stack.enter_context(writer)
+        stack.enter_context(gaps_writer)
+        stack.enter_context(serve_metrics(registry, args.metrics_address, args.status_interval))
+        acquire(args, writer, sample, show_orientation, v_nat, registry, gaps_writer)
+
+
+def open_bno(args):
+    if args.replay_bno:
+        return ReplayBNO08X.from_db(args.replay_bno, clock=ReplayClock(args.replay_speed))
+    return load_bno(args.mock)
+
+
+def acquire(args, writer: BatchWriter, sample, show_orientation: bool, v_nat: Vector, registry: Registry,
+            gaps_writer: BatchWriter):
+    scheduler = FixedRateScheduler(args.period, catch_up=args.catch_up)
+    instrument_scheduler(registry, "bno", scheduler)
+    read_timer = stage_timer(registry, "bno", "read")
+    samples = samples_counter(registry, "bno")
+    reconnections = reconnections_counter(registry, "bno")
+
+    def reconnected():
+        reconnections.inc()
+        scheduler.reset()
+
+    supervisor = DeviceSupervisor(
+        "bno",
+        lambda: open_bno(args),
+        RetryPolicy(read_retries=args.read_retries, max_reopen_delay=args.max_reopen_delay),
+        on_error=lambda e: count_error(registry, "bno", e),
+        on_reconnect=reconnected,
+        on_gap=lambda gap: gaps_writer.put(gaps.gap_row(gap)),
+    )
+    instrument_supervisor(registry, "bno", supervisor)
     i = 0
-    while True:
-        try:
-            if not bno:
-                bno = load_bno(args.mock)
-                connection.close()
-                connection = db_conn(args.db)
+    try:
+        while True:
+            scheduler.wait()
             i += 1
-            quat = bno.quaternion
+            t0 = time.perf_counter_ns()
+            row, quat = supervisor.read(sample)
+            read_timer.observe_since(t0)
+            samples.inc()
             if show_orientation:
-                v = vector_from_quaternion(quat, v_nat)
-                print(v)
-            append_measure(quat, connection)
+                try:
+                    print(vector_from_quaternion(quat, v_nat))
+                except ValueError as e:
+                    # a zero quaternion, until the sensor settles
+                    logger.debug(e)
+            writer.put(row)
             if i % 1000 == 0:
-                logger.info(f"Appended {i} measurements")
-            time.sleep(args.period)
-        except Exception as e:
-            logger.error(f"Error: {e}")
-            time.sleep(3)
-            bno = None
+                logger.info(f"Appended {i} measurements, queue depth={writer.queue_depth}, {writer.stats}")
+                logger.info(f"Sampling: {scheduler.stats}")
+                logger.info(f"Device: {supervisor.stats}")
+    except KeyboardInterrupt:
+        logger.info("Stopping acquisition")
 
 
 if __name__ == "__main__":
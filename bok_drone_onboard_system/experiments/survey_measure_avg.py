@@ -2,7 +2,7 @@ import argparse
 import logging
 
 from bok_drone_onboard_system.survey.emlid_reader import stream_from_emlid_llh
-from bok_drone_onboard_system.survey.gps import GPSPointFifo
+from bok_drone_onboard_system.survey.gps import GPSPointFifo, GPSPointTimeWindow
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +11,30 @@ def main():
     logging.basicConfig(level=logging.INFO)
     parser = argparse.ArgumentParser(description="follow emlid rover data RT")
 
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="192.168.1.79",
+        help="the emlid rover LLH stream host. Default is 192.168.1.79"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=9001,
+        help="the emlid rover LLH stream port. Default is 9001"
+    )
+    parser.add_argument(
+        "-n",
+        "--window",
+        type=int,
+        default=20,
+        help="Number of points to average. Default is 20."
+    )
+    parser.add_argument(
+        "--seconds",
+        type=float,
+        help="Average the points of the last given seconds, instead of a number of points."
+    )
     parser.add_argument(
         "--log-level",
         type=str,
@@ -19,16 +43,12 @@ def main():
     )
     args = parser.parse_args()
 
-    host = "192.168.1.79"
-    port = 9001
-
-    n = 20
-    fifo = GPSPointFifo(n)
-    for e in stream_from_emlid_llh(host, port):
-        if len(fifo) == n:
-            avg = fifo.average()
-            print(f"{e} -> {avg.distance_to(e.gps_point):2.3f}")
-        fifo.push(e.gps_point)
+    window = GPSPointTimeWindow(args.seconds) if args.seconds else GPSPointFifo(args.window)
+    for e in stream_from_emlid_llh(args.host, args.port):
+        if len(window) == args.window or (args.seconds and len(window) > 0):
+            avg = window.average()
+            print(f"{e} -> {avg.distance_to(e.gps_point):2.3f} spread={window.spread():2.3f}")
+        window.push(e.gps_point)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,10 @@
-import math
 import sqlite3
 from typing import Tuple
 
 import numpy as np
-from scipy.optimize import minimize
-
-from bok_drone_onboard_system.positioner import Vector, vector_from_quaternion, Position
+from bok_drone_onboard_system import positioner
+from bok_drone_onboard_system.positioner import Vector, Position, VectorArray
+from bok_drone_onboard_system.positioner.calibration import calibrate
 
 
 def read_quaternions(db_path, start: str, end: str):
@@ -24,29 +23,10 @@ def read_quaternions(db_path, start: str, end: str):
     return rows
 
 
-def spherical_to_cartesian(theta, phi):
-    return (
-        math.cos(phi) * math.sin(theta),
-        math.sin(phi) * math.sin(theta),
-        math.cos(theta)
-    )
-
-
-def cartesian_to_spherical(vs: Tuple[float, float, float]) -> Tuple[float, float]:
-    x, y, z = vs
-    r = math.sqrt(x ** 2 + y ** 2 + z ** 2)
-    if r == 0:
-        return 0.0, 0.0, 0.0  # undefined direction, just return zeros
-    theta = math.acos(z / r)  # polar angle [0, π]
-    phi = math.atan2(y, x)  # azimuth angle [-π, π]
-    return theta, phi
-
-
-def average_vector(vs: list[Vector]) -> Vector:
-    n = len(vs)
-    av = sum(vs)
-    av /= n
-    return av
+def average_vector(vs: list[Vector] | VectorArray) -> Vector:
+    if not isinstance(vs, VectorArray):
+        vs = VectorArray.from_vectors(vs)
+    return vs.mean()
 
 
 def read_quaternions_between(start: str, end: str) -> list[Tuple[float, float, float, float]]:
@@ -54,35 +34,26 @@ def read_quaternions_between(start: str, end: str) -> list[Tuple[float, float, f
     return [(float(q['quat_i']), float(q['quat_j']), float(q['quat_k']), float(q['quat_real'])) for q in read_quaternions(db_name, start, end)]
 
 
-def vectors_from_quaternions(quaternions: list[Tuple[float, float, float, float]], v_nat: Vector) -> list[Vector]:
-    return [vector_from_quaternion((q[0], q[1], q[2], q[3]), v_nat) for q in quaternions]
+def vectors_from_quaternions(quaternions: list[Tuple[float, float, float, float]], v_nat: Vector) -> VectorArray:
+    return VectorArray(positioner.vectors_from_quaternions(np.array(quaternions, dtype=float), v_nat.np))
 
 
-def error_on_average(vectors: list[Vector], pole_length: float) -> Tuple[float, float]:
-    v_avg = average_vector(vectors)
+def error_on_average(vectors: list[Vector] | VectorArray, pole_length: float) -> Tuple[float, float]:
+    if not isinstance(vectors, VectorArray):
+        vectors = VectorArray.from_vectors(vectors)
+    v_avg = vectors.mean()
     p_0 = Position(0, 0, 0)
     p_avg = p_0 + v_avg * pole_length
 
-    dists = [p_avg.distance_to(p_0 + v * pole_length) for v in vectors]
+    dists = (p_0 + vectors * pole_length).distance_to(p_avg)
     return round(float(np.mean(dists)), 4), round(float(np.std(dists)), 4)
 
 
 def optimal_v_nat(quats: list[Tuple[float, float, float, float]], v_init: Vector = Vector(1, 0, 0)) -> Vector:
-    def abs_error(tp: Tuple[float, float]) -> float:
-        vs = spherical_to_cartesian(tp[0], tp[1])
-        v_nat = Vector(vs[0], vs[1], vs[2])
-        vectors = vectors_from_quaternions(quats, v_nat=v_nat)
-
-        avg_vect = average_vector(vectors)
-
-        abs_error = 0
-        for v in vectors:
-            abs_error += avg_vect.colinearity(v)
-        return abs_error
-
-    initial_guess = cartesian_to_spherical((v_init.x, v_init.y, v_init.z))
-    result = minimize(abs_error, initial_guess, method="Nelder-Mead")
-    return Vector(*spherical_to_cartesian(result.x[0], result.x[1]))
+    """
+    The v_nat making the vectors the most colinear, see positioner.calibration
+    """
+    return Vector(*calibrate(np.array(quats), v_init.np).axis.tolist())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,17 @@
+"""
+Low overhead instrumentation of the acquisition daemons: stage timers, sample, error and reconnection counters,
+exposed as a periodic JSON status line (StatusReporter) and in the Prometheus text format (MetricsServer).
+"""
+from bok_drone_onboard_system.metrics.registry import Registry, Family, Value, Timer
+from bok_drone_onboard_system.metrics.exposition import prometheus_text, snapshot, StatusReporter, MetricsServer, \
+    serve_metrics
+from bok_drone_onboard_system.metrics.acquisition import stage_timer, count_error, samples_counter, \
+    reconnections_counter, instrument_source, instrument_writer, instrument_scheduler, \
+    instrument_supervisor
+
+__all__ = [
+    'Registry', 'Family', 'Value', 'Timer',
+    'prometheus_text', 'snapshot', 'StatusReporter', 'MetricsServer', 'serve_metrics',
+    'stage_timer', 'count_error', 'samples_counter', 'reconnections_counter', 'instrument_source',
+    'instrument_writer', 'instrument_scheduler', 'instrument_supervisor',
+]
@@ -0,0 +1,80 @@
+"""
+The metrics shared by the acquisition daemons, and their registration from the existing stats objects.
+Counters already kept in a stats object are read from it at collection time, so they cost nothing more on the hot path.
+"""
+from bok_drone_onboard_system.metrics.registry import Registry, Timer, Value
+
+STAGE_SECONDS = "bok_stage_seconds"
+SAMPLES_TOTAL = "bok_samples_total"
+ERRORS_TOTAL = "bok_errors_total"
+RECONNECTIONS_TOTAL = "bok_reconnections_total"
+WRITER_ROWS_TOTAL = "bok_writer_rows_total"
+WRITER_QUEUE_DEPTH = "bok_writer_queue_depth"
+SCHEDULER_TICKS_TOTAL = "bok_scheduler_ticks_total"
+SCHEDULER_MISSED_TOTAL = "bok_scheduler_missed_ticks_total"
+READ_RETRIES_TOTAL = "bok_read_retries_total"
+GAPS_TOTAL = "bok_gaps_total"
+GAP_SECONDS_TOTAL = "bok_gap_seconds_total"
+
+
+def stage_timer(registry: Registry, source: str, stage: str) -> Timer:
+    """
+    :param stage: read, parse, insert, commit...
+    """
+    return registry.timer(STAGE_SECONDS, "Duration of the acquisition stages", ("source", "stage")).labels(source, stage)
+
+
+def count_error(registry: Registry, source: str, error: BaseException):
+    registry.counter(ERRORS_TOTAL, "Errors by source and exception type", ("source", "type")) \
+        .labels(source, type(error).__name__).inc()
+
+
+def samples_counter(registry: Registry, source: str) -> Value:
+    return registry.counter(SAMPLES_TOTAL, "Acquired samples", ("source",)).labels(source)
+
+
+def reconnections_counter(registry: Registry, source: str) -> Value:
+    return registry.counter(RECONNECTIONS_TOTAL, "Reopened devices and connections", ("source",)).labels(source)
+
+
+def instrument_source(registry: Registry, source: str, stats):
+    """
+    Read the samples and reconnections of a source from its stats object, with `received` and `reconnections`
+    """
+    samples_counter(registry, source).set_function(lambda: stats.received)
+    reconnections_counter(registry, source).set_function(lambda: stats.reconnections)
+
+
+def instrument_writer(registry: Registry, name: str, writer):
+    """
+    Register the row counters, the queue depth and the insert and commit timers of a BatchWriter
+    """
+    stats = writer.stats
+    rows = registry.counter(WRITER_ROWS_TOTAL, "Rows handled by the sqlite writers", ("writer", "state"))
+    for state in ("enqueued", "written", "dropped", "failed"):
+        rows.labels(name, state).set_function(lambda state=state: getattr(stats, state))
+    registry.gauge(WRITER_QUEUE_DEPTH, "Rows waiting to be written", ("writer",)).labels(name) \
+        .set_function(lambda: writer.queue_depth)
+    timers = registry.timer(STAGE_SECONDS, "Duration of the acquisition stages", ("source", "stage"))
+    timers.add(stats.insert, name, "insert")
+    timers.add(stats.commit, name, "commit")
+
+
+def instrument_scheduler(registry: Registry, name: str, scheduler):
+    stats = scheduler.stats
+    registry.counter(SCHEDULER_TICKS_TOTAL, "Released sampling ticks", ("source",)).labels(name) \
+        .set_function(lambda: stats.ticks)
+    registry.counter(SCHEDULER_MISSED_TOTAL, "Skipped sampling ticks", ("source",)).labels(name) \
+        .set_function(lambda: stats.missed_ticks)
+
+
+def instrument_supervisor(registry: Registry, name: str, supervisor):
+    """
+    Register the read retries and the gaps of a DeviceSupervisor
+    """
+    stats = supervisor.stats
+    registry.counter(READ_RETRIES_TOTAL, "Transient read failures retried on the same device", ("source",)) \
+        .labels(name).set_function(lambda: stats.retries)
+    registry.counter(GAPS_TOTAL, "Intervals without data", ("source",)).labels(name).set_function(lambda: stats.gaps)
+    registry.counter(GAP_SECONDS_TOTAL, "Time without data, in seconds", ("source",)).labels(name) \
+        .set_function(lambda: stats.lost_seconds)
@@ -0,0 +1,250 @@
+"""
+Exposition of a Registry:
+* prometheus_text: the Prometheus text format, served by MetricsServer on /metrics
+* StatusReporter: a JSON status line, with the counter rates, logged periodically
+"""
+import contextlib
+import http.server
+import json
+import logging
+import math
+import os
+import socketserver
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Iterator
+
+from bok_drone_onboard_system.metrics.registry import Registry, Timer, TIMER, COUNTER
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{k}="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for k, v in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def prometheus_text(registry: Registry) -> str:
+    """
+    :return: the metrics in the Prometheus text format. A timer is a summary, in seconds, with a <name>_max gauge.
+    """
+    lines = []
+    for family in registry.families():
+        children = family.children()
+        if family.kind == TIMER:
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} summary")
+            for labels, timer in children:
+                lines.append(f"{family.name}_count{_format_labels(labels)} {timer.count}")
+                lines.append(f"{family.name}_sum{_format_labels(labels)} {_format_value(timer.total)}")
+            lines.append(f"# HELP {family.name}_max Maximum of {family.documentation.lower()}")
+            lines.append(f"# TYPE {family.name}_max gauge")
+            for labels, timer in children:
+                lines.append(f"{family.name}_max{_format_labels(labels)} {_format_value(timer.max)}")
+        else:
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for labels, value in children:
+                lines.append(f"{family.name}{_format_labels(labels)} {_format_value(value.value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _key(name: str, labels: dict[str, str]) -> str:
+    return name + ("{" + ",".join(f"{k}={v}" for k, v in labels.items()) + "}" if labels else "")
+
+
+def snapshot(registry: Registry) -> dict:
+    """
+    :return: metric{label=value,...}: value, or for timers {count, mean_ms, max_ms}
+    """
+    values = {}
+    for family in registry.families():
+        for labels, child in family.children():
+            if isinstance(child, Timer):
+                values[_key(family.name, labels)] = {
+                    "count": child.count,
+                    "mean_ms": round(child.mean * 1000, 3),
+                    "max_ms": round(child.max * 1000, 3),
+                }
+            else:
+                values[_key(family.name, labels)] = child.value
+    return values
+
+
+class StatusReporter:
+    """
+    Emit a JSON status line every `interval` seconds, from a daemon thread: the metrics, and the rate per second of
+    the counters since the previous line.
+
+    :param emit: called with each line. Default is logging it.
+    :param clock: monotonic clock, in seconds
+    """
+
+    def __init__(self, registry: Registry, interval: float = 60., emit: Callable[[str], None] | None = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.registry = registry
+        self.interval = interval
+        self.emit = emit or (lambda line: logger.info(f"status {line}"))
+        self._clock = clock
+        self._previous: tuple[float, dict] | None = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def status(self) -> dict:
+        now = self._clock()
+        counters = {_key(family.name, labels): child.value
+                    for family in self.registry.families() if family.kind == COUNTER
+                    for labels, child in family.children()}
+        rates = {}
+        if self._previous is not None:
+            previous_at, previous = self._previous
+            elapsed = now - previous_at
+            if elapsed > 0:
+                rates = {k: round((v - previous.get(k, 0.)) / elapsed, 3) for k, v in counters.items()}
+        self._previous = (now, counters)
+        return {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "metrics": snapshot(self.registry),
+            "rates": rates,
+        }
+
+    def status_line(self) -> str:
+        return json.dumps(self.status(), separators=(",", ":"))
+
+    def start(self) -> "StatusReporter":
+        self.status()
+        self._thread = threading.Thread(target=self._run, name="metrics-status", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "StatusReporter":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.emit(self.status_line())
+            except Exception as e:
+                logger.error(f"Status line failed: {e}")
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    server: "_HTTPMetricsServer | _UnixMetricsServer"
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path in ("/", "/metrics"):
+            body, content_type = prometheus_text(self.server.registry), PROMETHEUS_CONTENT_TYPE
+        elif path == "/status":
+            body, content_type = json.dumps(snapshot(self.server.registry)), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self) -> str:
+        # the client address of a unix socket is an empty string
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class _HTTPMetricsServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    registry: Registry
+
+
+class _UnixMetricsServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    registry: Registry
+
+
+class MetricsServer:
+    """
+    Serve the metrics over HTTP, from a daemon thread: /metrics in the Prometheus text format, /status in JSON.
+
+    :param address: "host:port" (port 0 picks a free one, see `address`), or the path of a unix socket,
+        e.g. for `curl --unix-socket <path> http://localhost/metrics`
+    """
+
+    def __init__(self, registry: Registry, address: str):
+        if ":" in address and not address.startswith(("/", ".")):
+            host, port = address.rsplit(":", 1)
+            self._server = _HTTPMetricsServer((host or "127.0.0.1", int(port)), _MetricsHandler)
+            self._unix_path = None
+        else:
+            if os.path.exists(address):
+                os.unlink(address)
+            self._server = _UnixMetricsServer(address, _MetricsHandler)
+            self._unix_path = address
+        self._server.registry = registry
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+
+    @property
+    def address(self) -> str:
+        if self._unix_path is not None:
+            return self._unix_path
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> "MetricsServer":
+        self._thread.start()
+        logger.info(f"Serving metrics on {self.address}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._unix_path is not None and os.path.exists(self._unix_path):
+            os.unlink(self._unix_path)
+
+    def __enter__(self) -> "MetricsServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+@contextlib.contextmanager
+def serve_metrics(registry: Registry, address: str | None = None, status_interval: float = 0.) -> Iterator[None]:
+    """
+    Run a MetricsServer on `address`, and a StatusReporter every `status_interval` seconds, while in the context
+    :param address: see MetricsServer. None does not serve the metrics.
+    :param status_interval: 0 does not log status lines
+    """
+    with contextlib.ExitStack() as stack:
+        if address:
+            stack.enter_context(MetricsServer(registry, address))
+        if status_interval > 0:
+            stack.enter_context(StatusReporter(registry, status_interval))
+        yield
@@ -0,0 +1,164 @@
+"""
+Metrics kept in memory by the acquisition daemons: counters, gauges and timers, grouped in families of labelled
+children, as Prometheus does.
+
+Updating a metric is a plain attribute update, without lock: each child is meant to be updated from a single thread,
+as WriterStats is. Timers use time.perf_counter_ns, a monotonic clock cheap enough to time every sample.
+"""
+import contextlib
+import time
+from typing import Callable, Iterator
+
+COUNTER = "counter"
+GAUGE = "gauge"
+TIMER = "timer"
+
+NS_PER_SECOND = 1_000_000_000
+
+
+class Value:
+    """
+    A counter or gauge value, either updated with inc/set or read from a function at collection time
+    (e.g. a stats attribute, which costs nothing on the hot path)
+    """
+
+    def __init__(self):
+        self._value = 0
+        self._function = None
+
+    def inc(self, amount: float = 1):
+        self._value += amount
+
+    def set(self, value: float):
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        return self._function() if self._function is not None else self._value
+
+
+class Timer:
+    """
+    Durations of a stage: count, total and maximum.
+
+        t0 = time.perf_counter_ns()
+        ...
+        timer.observe_since(t0)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def observe_ns(self, duration_ns: int):
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def observe_since(self, start_ns: int):
+        """
+        :param start_ns: a time.perf_counter_ns() value
+        """
+        self.observe_ns(time.perf_counter_ns() - start_ns)
+
+    @contextlib.contextmanager
+    def time(self) -> Iterator[None]:
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.observe_since(start_ns)
+
+    @property
+    def total(self) -> float:
+        return self.total_ns / NS_PER_SECOND
+
+    @property
+    def max(self) -> float:
+        return self.max_ns / NS_PER_SECOND
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.
+
+
+class Family:
+    """
+    The children of a metric, one per combination of label values
+    """
+    name: str
+    documentation: str
+    kind: str
+    labelnames: tuple[str, ...]
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Value | Timer] = {}
+
+    def labels(self, *values) -> Value | Timer:
+        """
+        :return: the child of the label values, created on first use. Keep it to update it on the hot path.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects the labels {self.labelnames}, got {values}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = Timer() if self.kind == TIMER else Value()
+        return child
+
+    def add(self, child: Value | Timer, *values) -> Value | Timer:
+        """
+        Register an existing child, e.g. a Timer kept in a stats object, under the label values
+        """
+        expected = Timer if self.kind == TIMER else Value
+        if not isinstance(child, expected) or len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects a {expected.__name__} with the labels {self.labelnames}")
+        self._children[tuple(str(v) for v in values)] = child
+        return child
+
+    def children(self) -> list[tuple[dict[str, str], Value | Timer]]:
+        """
+        :return: (labels, child), in creation order
+        """
+        return [(dict(zip(self.labelnames, key)), child) for key, child in list(self._children.items())]
+
+
+class Registry:
+    """
+    The metric families of a process, by name
+    """
+
+    def __init__(self):
+        self._families: dict[str, Family] = {}
+
+    def _family(self, name: str, documentation: str, kind: str, labelnames: tuple[str, ...]) -> Family:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = Family(name, documentation, kind, labelnames)
+        elif family.kind != kind or family.labelnames != tuple(labelnames):
+            raise ValueError(f"{name} is already registered as a {family.kind} with labels {family.labelnames}")
+        return family
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Family:
+        """
+        :return: the counter family, registered on first call
+        """
+        return self._family(name, documentation, COUNTER, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Family:
+        return self._family(name, documentation, GAUGE, labelnames)
+
+    def timer(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Family:
+        return self._family(name, documentation, TIMER, labelnames)
+
+    def families(self) -> list[Family]:
+        return list(self._families.values())
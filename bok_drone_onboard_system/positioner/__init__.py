@@ -5,6 +5,7 @@ from scipy.spatial.transform import Rotation as R
 
 
 class Vector:
+    __slots__ = ("x", "y", "z")
     x: float
     y: float
     z: float
@@ -54,14 +55,85 @@ class Vector:
         return f"V\t{self.x:+.4f}\t{self.y:+.4f}\t{self.z:+.4f}"
 
 
+# from this number of quaternions, the numpy kernel is faster than scipy (which is faster on smaller batches)
+NUMPY_MIN_BATCH = 256
+
+
+def rotate_vector(q, v) -> tuple[float, float, float]:
+    """
+    Rotate a single vector by a single quaternion, with plain floats: v + 2w(u x v) + 2u x (u x v).
+    For one quaternion at a time (e.g. the live acquisition loop), it avoids the scipy and numpy call overheads.
+
+    :param q: quaternion as (i, j, k, real), normalized here
+    :param v: (x, y, z)
+    :raise ValueError: for a zero quaternion, e.g. reported by a BNO08x before it settles, as scipy does
+    """
+    x, y, z, w = q
+    n = math.sqrt(x * x + y * y + z * z + w * w)
+    if n == 0:
+        raise ValueError("Cannot rotate by a zero norm quaternion")
+    x, y, z, w = x / n, y / n, z / n, w / n
+    vx, vy, vz = v
+    tx = 2 * (y * vz - z * vy)
+    ty = 2 * (z * vx - x * vz)
+    tz = 2 * (x * vy - y * vx)
+    return vx + w * tx + y * tz - z * ty, vy + w * ty + z * tx - x * tz, vz + w * tz + x * ty - y * tx
+
+
+def rotate_by_quaternions(quaternions, vectors) -> np.ndarray:
+    """
+    Numpy version of rotate_vector, on whole columns.
+
+    :param quaternions: (N,4) quaternions as (i, j, k, real), normalized here
+    :param vectors: (3,) vector, or (N,3) vectors (one per quaternion)
+    :return: (N,3) rotated vectors
+    :raise ValueError: if any quaternion is zero, as rotate_vector
+    """
+    q = np.asarray(quaternions, dtype=float).reshape(-1, 4)
+    norms = np.sqrt(np.einsum('ij,ij->i', q, q))
+    if np.any(norms == 0):
+        raise ValueError("Cannot rotate by a zero norm quaternion")
+    x, y, z, w = (q / norms[:, None]).T
+    v = np.asarray(vectors, dtype=float)
+    vx, vy, vz = v[..., 0], v[..., 1], v[..., 2]
+    tx = 2 * (y * vz - z * vy)
+    ty = 2 * (z * vx - x * vz)
+    tz = 2 * (x * vy - y * vx)
+    return np.stack((vx + w * tx + y * tz - z * ty, vy + w * ty + z * tx - x * tz, vz + w * tz + x * ty - y * tx),
+                    axis=-1)
+
+
+def vectors_from_quaternions(quaternions, local_directions) -> np.ndarray:
+    """
+    Batch version of vector_from_quaternion: one rotation per quaternion, applied to one or more local directions.
+    The rotations are built once for all the directions, with scipy, or with rotate_by_quaternions for
+    batches of NUMPY_MIN_BATCH quaternions or more.
+
+    :param quaternions: (N,4) quaternions as (i, j, k, real)
+    :param local_directions: (3,) direction, or (K,3) directions
+    :return: (N,3) world vectors for a single direction, (N,K,3) for K directions
+    :raise ValueError: if any quaternion is zero, with both kernels
+    """
+    quaternions = np.asarray(quaternions, dtype=float).reshape(-1, 4)
+    directions = np.asarray(local_directions, dtype=float)
+    if len(quaternions) == 0:
+        return np.empty((0, 3) if directions.ndim == 1 else (0, len(directions), 3))
+    if len(quaternions) >= NUMPY_MIN_BATCH:
+        if directions.ndim == 1:
+            return rotate_by_quaternions(quaternions, directions)
+        return np.stack([rotate_by_quaternions(quaternions, d) for d in directions], axis=1)
+    matrices = R.from_quat(quaternions).as_matrix()
+    if directions.ndim == 1:
+        return matrices @ directions
+    return np.einsum('nij,kj->nki', matrices, directions)
+
+
 def vector_from_quaternion(q, local_direction: Vector) -> Vector:
-    rotation = R.from_quat(q)
-    v_local = local_direction.np
-    v_world = rotation.apply(v_local)
-    return Vector(*v_world)
+    return Vector(*rotate_vector(q, (local_direction.x, local_direction.y, local_direction.z)))
 
 
 class Position:
+    __slots__ = ("x", "y", "z")
     x: float
     y: float
     z: float
@@ -77,6 +149,8 @@ class Position:
     def __add__(self, other):
         if isinstance(other, Vector):
             return self.plus(other)
+        if isinstance(other, VectorArray):
+            return PositionArray(self.np + other.values)
         return NotImplemented
 
     def distance_to(self, other: "Position"):
@@ -88,3 +162,138 @@ class Position:
 
     def __repr__(self):
         return f"P\t{self.x:+.3f}\t{self.y:+.3f}\t{self.z:+.3f}"
+
+
+def _values(other) -> np.ndarray | float:
+    """
+    The coordinates of a Vector, Position, array of them, or raw coordinates, as numpy for broadcasting
+    """
+    if isinstance(other, (VectorArray, PositionArray)):
+        return other.values
+    if isinstance(other, (Vector, Position)):
+        return other.np
+    return np.asarray(other, dtype=float)
+
+
+class VectorArray:
+    """
+    N vectors backed by a single (N,3) ndarray, with the Vector API applied to all of them at once.
+    Operations with a single Vector are broadcast to all the vectors.
+    """
+    __slots__ = ("values",)
+    values: np.ndarray
+
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=float).reshape(-1, 3)
+
+    @staticmethod
+    def from_vectors(vectors: list[Vector]) -> "VectorArray":
+        return VectorArray(np.array([(v.x, v.y, v.z) for v in vectors], dtype=float))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return Vector(*self.values[item].tolist())
+        return VectorArray(self.values[item])
+
+    def __iter__(self):
+        return (Vector(*v) for v in self.values.tolist())
+
+    def __add__(self, other):
+        if isinstance(other, (Vector, VectorArray)):
+            return VectorArray(self.values + _values(other))
+        return NotImplemented
+
+    def __radd__(self, other):
+        if isinstance(other, (int, float)) and other == 0:
+            return self
+        return self.__add__(other)
+
+    def __mul__(self, v):
+        """
+        :param v: a scalar, or (N,) scales, one per vector
+        """
+        return VectorArray(self.values * np.reshape(v, (-1, 1)))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, v):
+        return VectorArray(self.values / np.reshape(v, (-1, 1)))
+
+    def dot(self, other) -> np.ndarray:
+        return np.einsum('ij,ij->i', self.values, np.broadcast_to(_values(other), self.values.shape))
+
+    def norm(self) -> np.ndarray:
+        return np.linalg.norm(self.values, axis=1)
+
+    def colinearity(self, other) -> np.ndarray:
+        """
+        0 if colinear, 1 perpendicular, for each vector"""
+        other_norm = np.linalg.norm(_values(other), axis=-1)
+        return 1 - np.abs(self.dot(other) / (self.norm() * other_norm))
+
+    def mean(self) -> Vector:
+        return Vector(*self.values.mean(axis=0).tolist())
+
+    @property
+    def np(self):
+        return self.values
+
+    def __repr__(self):
+        return f"VectorArray({len(self)})"
+
+
+class PositionArray:
+    """
+    N positions backed by a single (N,3) ndarray, with the Position API applied to all of them at once.
+    """
+    __slots__ = ("values",)
+    values: np.ndarray
+
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=float).reshape(-1, 3)
+
+    @staticmethod
+    def from_positions(positions: list[Position]) -> "PositionArray":
+        return PositionArray(np.array([(p.x, p.y, p.z) for p in positions], dtype=float))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return Position(*self.values[item].tolist())
+        return PositionArray(self.values[item])
+
+    def __iter__(self):
+        return (Position(*p) for p in self.values.tolist())
+
+    def plus(self, v) -> "PositionArray":
+        """
+        :param v: a Vector added to all the positions, or a VectorArray, one vector per position
+        """
+        return PositionArray(self.values + _values(v))
+
+    def __add__(self, other):
+        if isinstance(other, (Vector, VectorArray)):
+            return self.plus(other)
+        return NotImplemented
+
+    def distance_to(self, other) -> np.ndarray:
+        """
+        :param other: a Position, or a PositionArray of the same length
+        :return: (N,) distances
+        """
+        return np.linalg.norm(self.values - _values(other), axis=1)
+
+    def mean(self) -> Position:
+        return Position(*self.values.mean(axis=0).tolist())
+
+    @property
+    def np(self):
+        return self.values
+
+    def __repr__(self):
+        return f"PositionArray({len(self)})"
@@ -0,0 +1,88 @@
+"""
+Calibration of the pole axis in the BNO08x frame (the `v_nat` of the projection).
+
+During a calibration, the pole is turned around its own axis, which keeps pointing in a fixed direction.
+With R_i the rotation of each quaternion, the axis v is the unit vector for which the world directions R_i v
+are the most constant, minimizing sum ||R_i v - a||^2 over v and the common direction a.
+For a given v, the best a is M v, with M the mean of the R_i, and the sum is N (1 - ||M v||^2):
+v is the eigenvector of M^T M with the largest eigenvalue.
+
+The quaternions are converted once to an (N,3,3) stack of rotation matrices, and the solution needs a single
+3x3 eigen decomposition, whatever the number of quaternions.
+"""
+import numpy as np
+from scipy.spatial.transform import Rotation as R
+
+
+class PoleCalibration:
+    """
+    :param axis: unit vector of the pole in the BNO08x frame
+    :param residual: RMS angle in degrees between the world directions of the axis and their mean
+    :param n_quaternions: number of quaternions used
+    """
+    axis: np.ndarray
+    residual: float
+    n_quaternions: int
+
+    def __init__(self, axis, residual: float, n_quaternions: int):
+        self.axis = np.asarray(axis, dtype=float)
+        self.residual = residual
+        self.n_quaternions = n_quaternions
+
+    def to_dict(self) -> dict:
+        return {"axis": self.axis.tolist(), "residual": self.residual, "n_quaternions": self.n_quaternions}
+
+    @staticmethod
+    def from_dict(d: dict) -> "PoleCalibration":
+        return PoleCalibration(d["axis"], d["residual"], d["n_quaternions"])
+
+    def __repr__(self):
+        x, y, z = self.axis
+        return f"axis=({x:+.4f}, {y:+.4f}, {z:+.4f}) residual={self.residual:.3f}deg n={self.n_quaternions}"
+
+
+def rotation_matrices(quaternions: np.ndarray) -> np.ndarray:
+    """
+    :param quaternions: (N,4) BNO08x quaternions as (i, j, k, real). Undefined ones (NaN) and the zero ones reported
+        while the sensor settles are ignored.
+    :return: (N,3,3) rotation matrices
+    """
+    quaternions = np.asarray(quaternions, dtype=float).reshape(-1, 4)
+    defined = np.all(np.isfinite(quaternions), axis=1) & (np.linalg.norm(quaternions, axis=1) > 0)
+    quaternions = quaternions[defined]
+    if len(quaternions) == 0:
+        return np.empty((0, 3, 3))
+    return R.from_quat(quaternions).as_matrix()
+
+
+def solve_pole_axis(matrices: np.ndarray, v_init=(1., 0., 0.)) -> np.ndarray:
+    """
+    :param matrices: (N,3,3) rotation matrices
+    :param v_init: the axis is returned in the same half space as v_init
+    :return: the unit axis minimizing the spread of its world directions
+    """
+    if len(matrices) == 0:
+        raise ValueError("Cannot calibrate without quaternions")
+    mean = matrices.mean(axis=0)
+    _, eigenvectors = np.linalg.eigh(mean.T @ mean)
+    axis = eigenvectors[:, -1]
+    return -axis if np.dot(axis, v_init) < 0 else axis
+
+
+def axis_residual(matrices: np.ndarray, axis: np.ndarray) -> float:
+    """
+    :return: RMS angle in degrees between the world directions R_i axis and their mean direction
+    """
+    directions = matrices @ axis
+    mean = directions.mean(axis=0)
+    cosines = np.clip(directions @ (mean / np.linalg.norm(mean)), -1., 1.)
+    return float(np.degrees(np.sqrt(np.mean(np.arccos(cosines) ** 2))))
+
+
+def calibrate(quaternions: np.ndarray, v_init=(1., 0., 0.)) -> PoleCalibration:
+    """
+    Pole axis from the quaternions measured while turning the pole around its axis.
+    """
+    matrices = rotation_matrices(quaternions)
+    axis = solve_pole_axis(matrices, v_init)
+    return PoleCalibration(axis, axis_residual(matrices, axis), len(matrices))
@@ -1,6 +1,8 @@
 from typing import Tuple
 
-from bok_drone_onboard_system.positioner import Vector, vector_from_quaternion, Position
+import numpy as np
+
+from bok_drone_onboard_system.positioner import Vector, vector_from_quaternion, vectors_from_quaternions, Position
 
 
 def calculate_pole_end_position(
@@ -49,4 +51,32 @@ def calculate_pole_end_position(
     position_b = position_a.plus(scaled_direction)
     
     # Return the result as a tuple
-    return (position_b.x, position_b.y, position_b.z)
\ No newline at end of file
+    return (position_b.x, position_b.y, position_b.z)
+
+
+def calculate_pole_end_positions(
+    quaternions: np.ndarray,
+    utm_positions: np.ndarray,
+    pole_length: float,
+    v_nat=None,
+) -> np.ndarray:
+    """
+    Batch version of calculate_pole_end_position: all the quaternions are applied in a single scipy call.
+
+    Args:
+        quaternions: (N,4) array of BNO08x quaternions as (i, j, k, real)
+        utm_positions: (N,3) array of positions at end A of the pole, in UTM coordinates
+        pole_length: Length of the pole in meters
+        v_nat: direction of the pole in the BNO08x frame, e.g. from positioner.calibration. Default is (1, 0, 0).
+
+    Returns:
+        (N,3) array of positions at end B of the pole, in UTM coordinates
+    """
+    utm_positions = np.asarray(utm_positions, dtype=float)
+    if len(utm_positions) == 0:
+        return np.empty((0, 3))
+
+    v_nat = np.array([1., 0., 0.]) if v_nat is None else np.asarray(v_nat, dtype=float)
+    directions = vectors_from_quaternions(quaternions, v_nat)
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    return utm_positions + directions * pole_length
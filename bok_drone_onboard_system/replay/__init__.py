@@ -0,0 +1,19 @@
+"""
+Replay of recorded sessions through mock devices, to run and load test the acquisition without hardware:
+* ReplayBNO08X: a BNO08x returning the reports of a database
+* FakeSerialPort: a pseudo terminal sending NMEA sentences, as the Emlid serial device
+* LLHServer: a local TCP server sending LLH solutions, as the Emlid LLH stream
+
+They share a ReplayClock, to replay at real or accelerated speed with jitter, and a FaultInjector.
+"""
+from bok_drone_onboard_system.replay.timing import ReplayClock, FaultInjector, FaultStats
+from bok_drone_onboard_system.replay.bno import ReplayBNO08X
+from bok_drone_onboard_system.replay.nmea import FakeSerialPort, survey_sentences, read_nmea_log
+from bok_drone_onboard_system.replay.llh import LLHServer, llh_records_lines, read_llh_log
+
+__all__ = [
+    'ReplayClock', 'FaultInjector', 'FaultStats',
+    'ReplayBNO08X',
+    'FakeSerialPort', 'survey_sentences', 'read_nmea_log',
+    'LLHServer', 'llh_records_lines', 'read_llh_log',
+]
@@ -0,0 +1,108 @@
+import logging
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+
+from bok_drone_onboard_system.bno import data as bno_data
+from bok_drone_onboard_system.bno.data import reports
+from bok_drone_onboard_system.replay.timing import ReplayClock, FaultInjector, NO_FAULTS, recording_period
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayBNO08X:
+    """
+    A BNO08x returning recorded reports, as MockBNO08X returns random ones: each read returns the last report
+    recorded before the replayed time, which runs at `speed` times the wall clock from the first read.
+    An unthrottled clock (speed 0) moves forward one report per sample instead: a sample reads each property at
+    most once (see reports.read_reports), and reading a property again starts the next sample.
+    At the end of the recording, the replay loops, or fails as a disconnected device.
+    """
+
+    def __init__(self, timestamps_us: np.ndarray, values: np.ndarray, clock: ReplayClock | None = None,
+                 faults: FaultInjector = NO_FAULTS, loop: bool = True):
+        """
+        :param timestamps_us: (N,) int64 epoch in microseconds, ordered
+        :param values: (N,13) reports, in the bno_reports VALUE_COLUMNS order
+        :param clock: the replay clock, real time by default
+        """
+        if len(timestamps_us) == 0:
+            raise ValueError("Cannot replay an empty recording")
+        self._timestamps_ns = np.asarray(timestamps_us, dtype=np.int64) * 1000
+        self._values = np.asarray(values, dtype=float)
+        self._period_ns = recording_period(self._timestamps_ns)
+        self.clock = clock or ReplayClock()
+        self.faults = faults
+        self.loop = loop
+        self.reads = 0
+        # unthrottled replay: the index of the current sample, and the properties it has read
+        self._sample = -1
+        self._sampled = set()
+
+    @staticmethod
+    def from_db(sqlite_filename: str, start: datetime | None = None, end: datetime | None = None,
+                **kwargs) -> "ReplayBNO08X":
+        """
+        Replay the bno_reports table of a database, or its bno_data one, with NaN for the other reports
+        """
+        conn = sqlite3.connect(sqlite_filename)
+        try:
+            if reports.table_exists(conn):
+                recording = reports.load_reports(conn, start, end)
+                timestamps_us = recording.timestamps_us
+                values = np.hstack((recording.acceleration, recording.gyro, recording.magnetic,
+                                    recording.quaternion))
+            else:
+                chunks = list(bno_data.iter_quaternions(conn, start, end))
+                timestamps_us = np.concatenate([t for t, _ in chunks]) // 1000 if chunks else np.empty(0, np.int64)
+                values = np.full((len(timestamps_us), len(reports.VALUE_COLUMNS)), np.nan)
+                if chunks:
+                    values[:, 9:13] = np.concatenate([q for _, q in chunks])
+        finally:
+            conn.close()
+        logger.info(f"Replaying {len(timestamps_us)} BNO08x reports from {sqlite_filename}")
+        return ReplayBNO08X(timestamps_us, values, **kwargs)
+
+    def __len__(self):
+        return len(self._timestamps_ns)
+
+    def _index(self, report: str) -> int:
+        if self.clock.speed <= 0:
+            if self._sample < 0 or report in self._sampled:
+                if self._sample + 1 >= len(self) and not self.loop:
+                    raise OSError("ReplayBNO08X: end of the recording")
+                self._sample += 1
+                self._sampled.clear()
+            self._sampled.add(report)
+            return self._sample % len(self)
+        if not self.clock.started:
+            self.clock.start(int(self._timestamps_ns[0]))
+        elapsed_ns = self.clock.recorded_ns() - self._timestamps_ns[0]
+        if elapsed_ns >= self._period_ns:
+            if not self.loop:
+                raise OSError("ReplayBNO08X: end of the recording")
+            elapsed_ns %= self._period_ns
+        return max(0, int(np.searchsorted(self._timestamps_ns, self._timestamps_ns[0] + elapsed_ns, 'right')) - 1)
+
+    def _current(self, report: str) -> np.ndarray:
+        self.faults.maybe_fail("ReplayBNO08X")
+        i = self._index(report)
+        self.reads += 1
+        return self._values[i]
+
+    @property
+    def acceleration(self):
+        return tuple(self._current("acceleration")[0:3].tolist())
+
+    @property
+    def gyro(self):
+        return tuple(self._current("gyro")[3:6].tolist())
+
+    @property
+    def magnetic(self):
+        return tuple(self._current("magnetic")[6:9].tolist())
+
+    @property
+    def quaternion(self):
+        return tuple(self._current("quaternion")[9:13].tolist())
@@ -0,0 +1,121 @@
+"""
+Replay of the Emlid LLH TCP stream, from an LLH log or from the llh_records of a database.
+"""
+import logging
+import socketserver
+import sqlite3
+import threading
+from datetime import datetime
+
+from bok_drone_onboard_system.bno.data.reports import to_epoch_us
+from bok_drone_onboard_system.replay.timing import ReplayClock, FaultInjector, NO_FAULTS, replay_lines
+from bok_drone_onboard_system.survey.data import from_epoch_ms, time_range_condition, SCHEMA_V2
+from bok_drone_onboard_system.survey.data import llh
+from bok_drone_onboard_system.survey.emlid_reader import _parse_llh_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+def llh_line(timestamp: datetime, latitude: float, longitude: float, height: float, quality: int,
+             n_satellites: int, sdn: float, sde: float, sdu: float, age: float, ratio: float) -> str:
+    """
+    :return: an LLH solution, as parse_llh reads it. The covariance terms are not stored: they are 0.
+    """
+    return (f"{timestamp:%Y/%m/%d %H:%M:%S}.{timestamp.microsecond // 1000:03d}"
+            f"   {latitude:.9f}   {longitude:.9f}   {height:.4f}   {quality}  {n_satellites:2d}"
+            f"   {sdn:.4f}   {sde:.4f}   {sdu:.4f}   0.0000   0.0000   0.0000   {age:.2f}   {ratio:.1f}")
+
+
+def llh_records_lines(conn: sqlite3.Connection, start: datetime | None = None,
+                      end: datetime | None = None) -> list[tuple[int, bytes]]:
+    """
+    :return: (timestamp in ns, LLH line with its line ending) of the llh_records, ordered by time
+    """
+    conditions, params = time_range_condition(start, end, SCHEMA_V2)
+    columns = ", ".join(c for c, _ in llh.VALUE_COLUMNS)
+    query = f"SELECT timestamp_ms, {columns} FROM {llh.TABLE_NAME}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    lines = []
+    for timestamp_ms, *values in conn.execute(query + " ORDER BY timestamp_ms", params):
+        values = [0 if v is None else v for v in values]
+        line = llh_line(from_epoch_ms(timestamp_ms), *values)
+        lines.append((timestamp_ms * 1_000_000, (line + "\n").encode('ascii')))
+    return lines
+
+
+def read_llh_log(path: str) -> list[tuple[int, bytes]]:
+    """
+    :return: (timestamp in ns, LLH line with its line ending) of an Emlid LLH log, without its % headers
+    """
+    lines = []
+    with open(path, "rb") as f:
+        for raw in f:
+            line = raw.rstrip(b"\r\n")
+            if not line.strip() or line.startswith(b"%"):
+                continue
+            parts = line.split(maxsplit=2)
+            timestamp = _parse_llh_timestamp(parts[0].decode('ascii'), parts[1].decode('ascii'))
+            lines.append((to_epoch_us(timestamp) * 1000, line + b"\n"))
+    return lines
+
+
+class _LLHHandler(socketserver.BaseRequestHandler):
+    server: "LLHServer"
+
+    def _disconnect(self, line: bytes):
+        raise ConnectionAbortedError("injected failure")
+
+    def handle(self):
+        server = self.server
+        clock = ReplayClock(server.speed, server.jitter)
+        logger.info(f"LLH client {self.client_address} connected")
+        try:
+            sent = replay_lines(server.lines, self.request.sendall, self._disconnect, clock, server.faults,
+                                server.stopped, server.loop)
+            logger.info(f"Replayed {sent} LLH solutions to {self.client_address}")
+        except OSError as e:
+            # includes the injected failures
+            logger.info(f"LLH client {self.client_address} disconnected: {e}")
+
+
+class LLHServer(socketserver.ThreadingTCPServer):
+    """
+    A local TCP server sending the recorded LLH solutions to each client, from the first one, when they are due.
+    An injected failure closes the connection, as a dropped link.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, lines: list[tuple[int, bytes]], host: str = "127.0.0.1", port: int = 0,
+                 speed: float = 1., jitter: float = 0., faults: FaultInjector = NO_FAULTS, loop: bool = False):
+        """
+        :param port: 0 picks a free port, see `address`
+        """
+        super().__init__((host, port), _LLHHandler)
+        self.lines = lines
+        self.speed = speed
+        self.jitter = jitter
+        self.faults = faults
+        self.loop = loop
+        self.stopped = threading.Event()
+        self._thread = threading.Thread(target=self.serve_forever, name="llh-server", daemon=True)
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self.server_address[:2]
+
+    def start(self) -> "LLHServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "LLHServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,169 @@
+"""
+Replay of the Emlid NMEA output on a pseudo terminal, opened by survey-acquire as the serial device.
+The sentences come from an NMEA log, or are generated from the survey_records of a database.
+"""
+import logging
+import os
+import select
+import sqlite3
+import threading
+import tty
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from bok_drone_onboard_system.replay.timing import ReplayClock, FaultInjector, NO_FAULTS, replay_lines, \
+    NS_PER_SECOND
+from bok_drone_onboard_system.survey.data import iter_arrays
+from bok_drone_onboard_system.survey.nmea import with_checksum, sentence_type, parse_sentence, GGA
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+NS_PER_DAY = 86400 * NS_PER_SECOND
+
+
+def _nmea_coordinate(value: float, degree_digits: int, hemispheres: str) -> str:
+    """
+    Signed decimal degrees to "dddmm.mmmmmmm,H"
+    """
+    absolute = abs(value)
+    degrees = int(absolute)
+    minutes = (absolute - degrees) * 60
+    return f"{degrees:0{degree_digits}d}{minutes:010.7f},{hemispheres[value < 0]}"
+
+
+def gga_sentence(timestamp: datetime, latitude: float, longitude: float, altitude: float,
+                 quality: int = 4, n_satellites: int = 12, hdop: float = 0.6) -> str:
+    return with_checksum(
+        f"GNGGA,{timestamp:%H%M%S}.{timestamp.microsecond // 10000:02d},"
+        f"{_nmea_coordinate(latitude, 2, 'NS')},{_nmea_coordinate(longitude, 3, 'EW')},"
+        f"{quality},{n_satellites:02d},{hdop:.1f},{altitude:.3f},M,0.0,M,1.0,0000"
+    )
+
+
+def rmc_sentence(timestamp: datetime, latitude: float, longitude: float) -> str:
+    return with_checksum(
+        f"GNRMC,{timestamp:%H%M%S}.{timestamp.microsecond // 10000:02d},A,"
+        f"{_nmea_coordinate(latitude, 2, 'NS')},{_nmea_coordinate(longitude, 3, 'EW')},"
+        f"0.00,0.00,{timestamp:%d%m%y},,,D"
+    )
+
+
+def survey_sentences(conn: sqlite3.Connection, start: datetime | None = None,
+                     end: datetime | None = None) -> list[tuple[int, bytes]]:
+    """
+    An RMC and a GGA sentence per survey record with a position, as sent by the Emlid
+    :return: (timestamp in ns, sentence with its line ending), ordered by time
+    """
+    lines = []
+    for survey_arrays in iter_arrays(conn, start, end, only_defined=False):
+        defined = np.all(np.isfinite(survey_arrays.positions), axis=1)
+        for timestamp_ns, (latitude, longitude, altitude) in zip(survey_arrays.timestamps_ns[defined].tolist(),
+                                                                 survey_arrays.positions[defined].tolist()):
+            timestamp = EPOCH + timedelta(microseconds=timestamp_ns // 1000)
+            lines.append((timestamp_ns, (rmc_sentence(timestamp, latitude, longitude) + "\r\n").encode('ascii')))
+            lines.append((timestamp_ns, (gga_sentence(timestamp, latitude, longitude, altitude) + "\r\n")
+                          .encode('ascii')))
+    return lines
+
+
+def read_nmea_log(path: str) -> list[tuple[int, bytes]]:
+    """
+    Read a raw NMEA log, timed by its GGA sentences: the other sentences are sent with the previous GGA,
+    or the first one.
+    :return: (timestamp in ns, sentence with its line ending), ordered by time. Timestamps are only relative,
+        from the time of day of the GGA sentences.
+    """
+    lines = []
+    pending = []
+    current_ns = None
+    day_ns = 0
+    with open(path, "rb") as f:
+        for raw in f:
+            line = raw.rstrip(b"\r\n")
+            if not line:
+                continue
+            text = line.decode('ascii', errors='replace')
+            if text.startswith('$') and sentence_type(text) == GGA:
+                parsed = parse_sentence(text)
+                fix = parsed[1] if parsed else None
+                if fix is not None:
+                    t = fix.time
+                    time_ns = ((t.hour * 60 + t.minute) * 60 + t.second) * NS_PER_SECOND + t.microsecond * 1000
+                    # past midnight
+                    if current_ns is not None and day_ns + time_ns < current_ns - NS_PER_DAY // 2:
+                        day_ns += NS_PER_DAY
+                    current_ns = day_ns + time_ns
+                    lines += [(current_ns, p) for p in pending]
+                    pending = []
+            if current_ns is None:
+                pending.append(line + b"\r\n")
+            else:
+                lines.append((current_ns, line + b"\r\n"))
+    return lines + [(current_ns or 0, p) for p in pending]
+
+
+class FakeSerialPort:
+    """
+    A pseudo terminal on which recorded NMEA sentences are written when due, from a background thread.
+    Open `port` as the serial device (e.g. survey-acquire --serial-port). Opening it flushes the pending input,
+    as with a real device: the sentences written before are lost.
+
+    An injected failure sends the first half of the sentence only, as a glitch on the link.
+    """
+
+    def __init__(self, lines: list[tuple[int, bytes]], clock: ReplayClock | None = None,
+                 faults: FaultInjector = NO_FAULTS, loop: bool = False):
+        self.lines = lines
+        self.clock = clock or ReplayClock()
+        self.faults = faults
+        self.loop = loop
+        self.written = 0
+        self._master, self._slave = os.openpty()
+        # no echo nor line ending translation on the device side
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fake-serial", daemon=True)
+
+    def _write(self, data: bytes):
+        while data and not self._stopped.is_set():
+            # do not block forever on a full buffer, when nobody reads the device
+            _, writable, _ = select.select([], [self._master], [], 0.1)
+            if writable:
+                data = data[os.write(self._master, data):]
+
+    def _truncated(self, line: bytes):
+        self._write(line[:len(line) // 2])
+
+    def _run(self):
+        try:
+            self.written = replay_lines(self.lines, self._write, self._truncated, self.clock, self.faults,
+                                        self._stopped, self.loop)
+            logger.info(f"Replayed {self.written} NMEA sentences on {self.port}, faults: {self.faults.stats}")
+        except OSError as e:
+            logger.error(f"Fake serial port {self.port} failed: {e}")
+
+    def start(self) -> "FakeSerialPort":
+        self._thread.start()
+        return self
+
+    def join(self, timeout: float | None = None):
+        """
+        Wait for the end of the replay
+        """
+        self._thread.join(timeout)
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def __enter__(self) -> "FakeSerialPort":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,190 @@
+import random
+import threading
+import time
+from typing import Callable, Sequence
+
+NS_PER_SECOND = 1_000_000_000
+
+
+class ReplayClock:
+    """
+    Maps the recorded timestamps onto the wall clock: the recorded time elapsed since the first timestamp,
+    divided by speed, is the wall time elapsed since start().
+    A speed of 0 (or less) replays as fast as possible.
+    Each emission can be delayed by a random jitter, a normal delay of `jitter` seconds standard deviation,
+    which does not accumulate.
+    """
+    speed: float
+    jitter: float
+
+    def __init__(self, speed: float = 1., jitter: float = 0., seed: int | None = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.speed = speed
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._clock = clock
+        self._start_wall = None
+        self._start_ns = None
+
+    def start(self, first_ns: int):
+        """
+        :param first_ns: the recorded timestamp replayed now
+        """
+        self._start_wall = self._clock()
+        self._start_ns = first_ns
+
+    @property
+    def started(self) -> bool:
+        return self._start_wall is not None
+
+    def recorded_ns(self) -> int:
+        """
+        :return: the recorded timestamp being replayed now
+        """
+        if self.speed <= 0:
+            raise ValueError("An unthrottled replay has no current time")
+        return self._start_ns + round((self._clock() - self._start_wall) * self.speed * NS_PER_SECOND)
+
+    def delay(self, timestamp_ns: int) -> float:
+        """
+        :return: seconds to wait before emitting the recorded timestamp, jitter included
+        """
+        if self.speed <= 0:
+            return 0.
+        due = self._start_wall + (timestamp_ns - self._start_ns) / NS_PER_SECOND / self.speed
+        jitter = abs(self._random.gauss(0., self.jitter)) if self.jitter > 0 else 0.
+        return max(0., due - self._clock() + jitter)
+
+    def wait(self, timestamp_ns: int, stopped: threading.Event | None = None) -> bool:
+        """
+        Wait for the recorded timestamp to be due, starting the clock on the first one
+        :param stopped: interrupts the wait when set
+        :return: False if interrupted
+        """
+        if not self.started:
+            self.start(timestamp_ns)
+        delay = self.delay(timestamp_ns)
+        if stopped is not None:
+            return not stopped.wait(delay)
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+
+class FaultStats:
+    failures: int
+    drops: int
+    corruptions: int
+
+    def __init__(self):
+        self.failures = 0
+        self.drops = 0
+        self.corruptions = 0
+
+    def __repr__(self):
+        return f"failures={self.failures} drops={self.drops} corruptions={self.corruptions}"
+
+
+class FaultInjector:
+    """
+    Random faults, decided independently for each emitted sample or line:
+    * fail: the device or the connection fails (the meaning depends on the replayed device)
+    * drop: the sample or line is lost
+    * corrupt: a byte of the line is altered, as on a noisy link
+
+    A seed makes the faults reproducible.
+    """
+    fail_rate: float
+    drop_rate: float
+    corrupt_rate: float
+    stats: FaultStats
+
+    def __init__(self, fail_rate: float = 0., drop_rate: float = 0., corrupt_rate: float = 0.,
+                 seed: int | None = None):
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.corrupt_rate = corrupt_rate
+        self.stats = FaultStats()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fails(self) -> bool:
+        with self._lock:
+            if self.fail_rate > 0 and self._random.random() < self.fail_rate:
+                self.stats.failures += 1
+                return True
+            return False
+
+    def maybe_fail(self, what: str):
+        """
+        :raise OSError: on a failure, as a device read error
+        """
+        if self.fails():
+            raise OSError(f"{what}: injected failure")
+
+    def drops(self) -> bool:
+        with self._lock:
+            if self.drop_rate > 0 and self._random.random() < self.drop_rate:
+                self.stats.drops += 1
+                return True
+            return False
+
+    def corrupt(self, line: bytes) -> bytes:
+        """
+        :return: the line, with one of its bytes (line ending excluded) replaced by another printable one
+        """
+        with self._lock:
+            body_length = len(line.rstrip(b"\r\n"))
+            if self.corrupt_rate <= 0 or body_length == 0 or self._random.random() >= self.corrupt_rate:
+                return line
+            self.stats.corruptions += 1
+            i = self._random.randrange(body_length)
+            replacement = self._random.choice([c for c in b"0123456789ABCDEF,.*$" if c != line[i]])
+            return line[:i] + bytes((replacement,)) + line[i + 1:]
+
+
+NO_FAULTS = FaultInjector()
+
+
+def recording_period(timestamps_ns: Sequence[int]) -> int:
+    """
+    :return: the duration of a looped recording: its span, plus the mean interval between two records
+    """
+    if len(timestamps_ns) < 2:
+        return NS_PER_SECOND
+    span = timestamps_ns[-1] - timestamps_ns[0]
+    return span + max(1, span // (len(timestamps_ns) - 1))
+
+
+def replay_lines(
+        lines: Sequence[tuple[int, bytes]], write: Callable[[bytes], None], on_failure: Callable[[bytes], None],
+        clock: ReplayClock, faults: FaultInjector = NO_FAULTS, stopped: threading.Event | None = None,
+        loop: bool = False
+) -> int:
+    """
+    Write the recorded lines when they are due, with the injected faults
+    :param lines: (timestamp in ns, line) ordered by time
+    :param on_failure: called instead of write on an injected failure, with the line. It may raise.
+    :param stopped: stops the replay when set
+    :param loop: restart from the first line at the end of the recording, until stopped
+    :return: the number of written lines
+    """
+    if not lines:
+        return 0
+    period_ns = recording_period([t for t, _ in lines])
+    written = 0
+    iteration = 0
+    while True:
+        for timestamp_ns, line in lines:
+            if not clock.wait(timestamp_ns + iteration * period_ns, stopped):
+                return written
+            if faults.drops():
+                continue
+            if faults.fails():
+                on_failure(line)
+                continue
+            write(faults.corrupt(line))
+            written += 1
+        if not loop or (stopped is not None and stopped.is_set()):
+            return written
+        iteration += 1
@@ -0,0 +1,157 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Callable
+
+import numpy as np
+
+
+class SchedulerStats:
+    """
+    Timing statistics of a FixedRateScheduler.
+    Lateness is the delay between a tick deadline and the moment the tick is actually released.
+    Only the last `window` lateness values are kept to compute the jitter percentiles.
+    """
+    ticks: int
+    overruns: int
+    missed_ticks: int
+    first_tick: float | None
+    last_tick: float | None
+
+    def __init__(self, window: int = 10000):
+        self.ticks = 0
+        self.overruns = 0
+        self.missed_ticks = 0
+        self.first_tick = None
+        self.last_tick = None
+        self._lateness = deque(maxlen=window)
+
+    def record_tick(self, at: float, lateness: float):
+        if self.first_tick is None:
+            self.first_tick = at
+        self.last_tick = at
+        self.ticks += 1
+        self._lateness.append(lateness)
+
+    def achieved_hz(self) -> float:
+        if self.ticks < 2 or self.last_tick == self.first_tick:
+            return 0.
+        return (self.ticks - 1) / (self.last_tick - self.first_tick)
+
+    def jitter_percentiles(self, percentiles=(50, 95, 99)) -> dict[float, float]:
+        """
+        :return: lateness in seconds for each of the requested percentiles
+        """
+        if not self._lateness:
+            return {p: 0. for p in percentiles}
+        values = np.percentile(np.fromiter(self._lateness, dtype=float), percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
+    def __repr__(self):
+        jitter = " ".join(f"p{p}={v * 1000:.2f}ms" for p, v in self.jitter_percentiles().items())
+        return (f"ticks={self.ticks} achieved={self.achieved_hz():.1f}Hz overruns={self.overruns} "
+                f"missed={self.missed_ticks} jitter({jitter})")
+
+
+class FixedRateScheduler:
+    """
+    Release ticks at a fixed rate, against absolute deadlines `start + k * period` on a monotonic clock.
+    As deadlines do not depend on how long the work between two ticks took, the rate does not drift.
+
+    When the work overran and one or more deadlines were missed:
+        * with catch_up, the missed ticks are released immediately, one per call to `wait`, until back on schedule
+        * otherwise, the missed ticks are skipped (and counted) and the next tick is aligned on the schedule
+
+    :param period: time between two ticks, in seconds
+    :param catch_up: release missed ticks instead of skipping them
+    :param clock: monotonic clock, in seconds
+    :param sleep: sleep function, in seconds
+    :param jitter_window: number of recent ticks used for jitter percentiles
+    """
+
+    def __init__(
+            self,
+            period: float,
+            catch_up: bool = False,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], None] = time.sleep,
+            jitter_window: int = 10000,
+    ):
+        if period <= 0:
+            raise ValueError(f"period must be positive, got {period}")
+        self.period = period
+        self.catch_up = catch_up
+        self._clock = clock
+        self._sleep = sleep
+        self.stats = SchedulerStats(jitter_window)
+        self._start = None
+        self._tick = 0
+
+    def reset(self):
+        """
+        Restart the schedule on the next call to `wait`, e.g. after the device was reloaded.
+        """
+        self._start = None
+        self._tick = 0
+
+    def wait(self) -> int:
+        """
+        Block until the next tick deadline.
+        :return: the index of the released tick since the schedule (re)started
+        """
+        now = self._clock()
+        deadline = self._next_deadline(now)
+        if deadline is None:
+            return self._tick
+        if now < deadline:
+            self._sleep(deadline - now)
+            now = self._clock()
+        else:
+            deadline = self._overrun(now, deadline)
+        self.stats.record_tick(now, max(0., now - deadline))
+        return self._tick
+
+    async def wait_async(self) -> int:
+        """
+        Same as `wait`, for asyncio tasks: the event loop runs the other tasks until the tick deadline.
+        The `sleep` function is not used.
+        """
+        now = self._clock()
+        deadline = self._next_deadline(now)
+        if deadline is None:
+            return self._tick
+        if now < deadline:
+            await asyncio.sleep(deadline - now)
+            now = self._clock()
+        else:
+            deadline = self._overrun(now, deadline)
+        self.stats.record_tick(now, max(0., now - deadline))
+        return self._tick
+
+    def _next_deadline(self, now: float) -> float | None:
+        """
+        :return: the deadline of the next tick, or None if the schedule just started, with a tick released now
+        """
+        if self._start is None:
+            self._start = now
+            self.stats.record_tick(now, 0.)
+            return None
+        self._tick += 1
+        return self._start + self._tick * self.period
+
+    def _overrun(self, now: float, deadline: float) -> float:
+        self.stats.overruns += 1
+        return self._skip_missed(now, deadline)
+
+    def _skip_missed(self, now: float, deadline: float) -> float:
+        """
+        When not catching up, jump over the deadlines that already passed and release the latest one.
+        :return: the deadline of the released tick
+        """
+        missed = math.floor((now - deadline) / self.period)
+        if self.catch_up or missed <= 0:
+            return deadline
+        self.stats.missed_ticks += missed
+        self._tick += missed
+        return self._start + self._tick * self.period
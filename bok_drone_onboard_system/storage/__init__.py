@@ -0,0 +1,3 @@
+from bok_drone_onboard_system.storage.writer import BatchWriter, WriterStats
+
+__all__ = ['BatchWriter', 'WriterStats']
@@ -0,0 +1,182 @@
+"""
+Columnar archive of a session, as Parquet or Arrow IPC files, for the GIS and analysis tooling.
+
+Each file holds one table: an int64 epoch timestamp column followed by float64 value columns, written one
+row group (Parquet) or record batch (Arrow) per chunk, compressed. The session metadata (clock offset,
+pole calibration...) is stored as JSON in the schema metadata, so that an archived session can be
+re-analysed without its sqlite database.
+
+pyarrow is an optional dependency (`pip install bok-drone-onboard-system[archive]`), imported on first use.
+"""
+import json
+import logging
+from typing import Iterable, Generator, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# format: file extension
+FORMATS = {
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+}
+PARQUET_MAGIC = b"PAR1"
+ARROW_MAGIC = b"ARROW1"
+DEFAULT_COMPRESSION = "zstd"
+
+
+def require_pyarrow():
+    """
+    :return: the pyarrow module
+    :raise ImportError: with the way to install it, if it is not
+    """
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "pyarrow is needed to read and write archives: pip install bok-drone-onboard-system[archive]"
+        ) from e
+    return pyarrow
+
+
+def archive_schema(columns: Sequence[str], metadata: dict | None = None):
+    """
+    :param columns: the int64 timestamp column, followed by the float64 value columns
+    :param metadata: JSON serializable values, by key
+    """
+    pa = require_pyarrow()
+    fields = [pa.field(columns[0], pa.int64(), nullable=False)] + [pa.field(c, pa.float64()) for c in columns[1:]]
+    encoded = {key: json.dumps(value) for key, value in (metadata or {}).items()}
+    return pa.schema(fields, metadata=encoded)
+
+
+def detect_format(path: str) -> str:
+    """
+    :return: the format of an archive file, from its magic bytes
+    """
+    with open(path, "rb") as f:
+        head = f.read(len(ARROW_MAGIC))
+    if head.startswith(PARQUET_MAGIC):
+        return "parquet"
+    if head == ARROW_MAGIC:
+        return "arrow"
+    raise ValueError(f"{path} is neither a Parquet nor an Arrow IPC file")
+
+
+class ArchiveWriter:
+    """
+    Write chunks of (timestamps, values) into an archive file, one row group or record batch per chunk.
+    To be used as a context manager.
+    """
+
+    def __init__(self, path: str, columns: Sequence[str], fmt: str = "parquet",
+                 compression: str | None = DEFAULT_COMPRESSION, metadata: dict | None = None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown archive format {fmt}, expected one of {sorted(FORMATS)}")
+        pa = require_pyarrow()
+        self.path = path
+        self.schema = archive_schema(columns, metadata)
+        self.count = 0
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, self.schema, compression=compression or "none")
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            self._writer = pa.ipc.new_file(path, self.schema, options=options)
+
+    def write(self, timestamps: np.ndarray, values: np.ndarray):
+        """
+        :param timestamps: (N,) int64 epoch timestamps
+        :param values: (N,K) values, in the order of the value columns
+        """
+        if len(timestamps) == 0:
+            return
+        pa = require_pyarrow()
+        values = np.asarray(values, dtype=float)
+        arrays = [pa.array(np.asarray(timestamps, dtype=np.int64))]
+        arrays += [pa.array(values[:, i]) for i in range(values.shape[1])]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.count += len(timestamps)
+
+    def close(self):
+        self._writer.close()
+        logger.info(f"Wrote {self.count} rows to {self.path}")
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def write_archive(path: str, columns: Sequence[str], chunks: Iterable[tuple[np.ndarray, np.ndarray]],
+                  fmt: str = "parquet", compression: str | None = DEFAULT_COMPRESSION,
+                  metadata: dict | None = None) -> int:
+    """
+    Write all the chunks of (timestamps, values) into an archive file
+    :return: the number of written rows
+    """
+    with ArchiveWriter(path, columns, fmt, compression, metadata) as writer:
+        for timestamps, values in chunks:
+            writer.write(timestamps, values)
+    return writer.count
+
+
+def _batch_arrays(batch) -> tuple[np.ndarray, np.ndarray]:
+    timestamps = batch.column(0).to_numpy().astype(np.int64, copy=False)
+    if batch.num_columns == 1:
+        return timestamps, np.empty((batch.num_rows, 0))
+    values = np.column_stack([batch.column(i).to_numpy(zero_copy_only=False) for i in range(1, batch.num_columns)])
+    return timestamps, values.astype(float, copy=False)
+
+
+def iter_archive(path: str, chunk_size: int = 10000) -> Generator[tuple[np.ndarray, np.ndarray], None, None]:
+    """
+    Stream an archive file written by ArchiveWriter, whatever its format
+    :param chunk_size: maximum number of rows per Parquet chunk. Arrow record batches are read as written.
+    :return: for each chunk, the (N,) int64 timestamps and the (N,K) float values
+    """
+    pa = require_pyarrow()
+    if detect_format(path) == "parquet":
+        import pyarrow.parquet as pq
+        with pq.ParquetFile(path) as parquet_file:
+            for batch in parquet_file.iter_batches(batch_size=chunk_size):
+                yield _batch_arrays(batch)
+    else:
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield _batch_arrays(reader.get_batch(i))
+
+
+def read_archive(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    :return: the (N,) int64 timestamps and the (N,K) float values of a whole archive file
+    """
+    chunks = list(iter_archive(path))
+    if not chunks:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(read_archive_columns(path)) - 1))
+    return np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks])
+
+
+def _read_schema(path: str):
+    pa = require_pyarrow()
+    if detect_format(path) == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_schema(path)
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).schema
+
+
+def read_archive_columns(path: str) -> list[str]:
+    return _read_schema(path).names
+
+
+def read_archive_metadata(path: str) -> dict:
+    """
+    :return: the metadata values stored with the archive, by key
+    """
+    metadata = _read_schema(path).metadata or {}
+    # pyarrow may add its own keys (e.g. ARROW:schema), which are not JSON
+    return {k.decode(): json.loads(v) for k, v in metadata.items() if not k.startswith(b"ARROW:")}
@@ -0,0 +1,50 @@
+"""
+Storage of the acquisition gaps: the intervals without data of a source, while its device was failing or reopened.
+"""
+import logging
+from sqlite3 import Connection
+
+from bok_drone_onboard_system.supervisor import Gap
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = "acquisition_gaps"
+INSERT_STMT = (
+    f"INSERT INTO {TABLE_NAME} (source, start_ms, end_ms, failures, kind, error) VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+
+def create_table_if_not_exists(conn: Connection) -> Connection:
+    logger.info(f"Creating table {TABLE_NAME} if not exists")
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+        id INTEGER PRIMARY KEY,
+        source TEXT NOT NULL,
+        start_ms INTEGER NOT NULL,
+        end_ms INTEGER NOT NULL,
+        failures INTEGER,
+        kind TEXT,
+        error TEXT
+    )""")
+    conn.commit()
+    return conn
+
+
+def gap_row(gap: Gap) -> tuple:
+    """
+    Build the row to be inserted with INSERT_STMT, with epoch milliseconds
+    """
+    return gap.source, round(gap.start * 1000), round(gap.end * 1000), gap.failures, gap.kind, gap.error
+
+
+def load_gaps(conn: Connection, source: str | None = None) -> list[Gap]:
+    """
+    :return: the gaps, of a source or of all of them, ordered by start
+    """
+    query = f"SELECT source, start_ms, end_ms, failures, kind, error FROM {TABLE_NAME}"
+    params = ()
+    if source is not None:
+        query += " WHERE source = ?"
+        params = (source,)
+    return [Gap(s, start_ms / 1000, end_ms / 1000, failures, kind, error)
+            for s, start_ms, end_ms, failures, kind, error in conn.execute(query + " ORDER BY start_ms", params)]
@@ -0,0 +1,175 @@
+"""
+The sqlite connections of the acquisition and analysis tools, tuned for a Raspberry Pi writing on an SD card:
+* WAL journal, synchronous=NORMAL: a commit appends to the WAL without fsync, only checkpoints sync the database
+* temp_store=MEMORY, a larger page cache and memory mapped reads, to spare the card on sorts and scans
+* 4 KiB pages, the flash page size, set when the database is created
+* prepared statements cached per connection, keyed by their SQL text, so that each execution reuses them
+
+Checkpointer runs the WAL checkpoints from a background thread, so that they are not paid by the commits of the
+writers, and `upgrade_schema` versions a database in its user_version.
+"""
+import logging
+import sqlite3
+import threading
+from sqlite3 import Connection
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+PAGE_SIZE = 4096
+# page cache, in KiB
+CACHE_SIZE_KIB = 8192
+MMAP_SIZE = 64 * 1024 * 1024
+CACHED_STATEMENTS = 256
+# sqlite default, in pages
+WAL_AUTOCHECKPOINT = 1000
+
+
+def open_connection(
+        sqlite_filename: str,
+        wal: bool = True,
+        synchronous: str = "NORMAL",
+        wal_autocheckpoint: int = WAL_AUTOCHECKPOINT,
+        cache_size_kib: int = CACHE_SIZE_KIB,
+        mmap_size: int = MMAP_SIZE,
+        page_size: int = PAGE_SIZE,
+        cached_statements: int = CACHED_STATEMENTS,
+        check_same_thread: bool = True,
+) -> Connection:
+    """
+    :param wal: use the write-ahead log journal mode
+    :param synchronous: sqlite synchronous pragma, one of OFF, NORMAL, FULL, EXTRA
+    :param wal_autocheckpoint: WAL size in pages triggering a checkpoint on commit, 0 when a Checkpointer runs
+    :param page_size: only applied to a new database
+    :param cached_statements: number of prepared statements kept by the connection
+    """
+    if synchronous.upper() not in SYNCHRONOUS_MODES:
+        raise ValueError(f"synchronous must be one of {SYNCHRONOUS_MODES}, got {synchronous}")
+    conn = sqlite3.connect(sqlite_filename, cached_statements=cached_statements, check_same_thread=check_same_thread)
+    # before the journal mode: the page size of a WAL database cannot change
+    conn.execute(f"PRAGMA page_size={int(page_size)}")
+    if wal:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA wal_autocheckpoint={int(wal_autocheckpoint)}")
+    conn.execute(f"PRAGMA synchronous={synchronous.upper()}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA cache_size={-int(cache_size_kib)}")
+    conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+    return conn
+
+
+def checkpoint(conn: Connection, mode: str = "PASSIVE") -> tuple[int, int, int]:
+    """
+    :return: (busy, WAL pages, checkpointed pages), busy being 1 if the checkpoint could not complete
+    """
+    if mode.upper() not in CHECKPOINT_MODES:
+        raise ValueError(f"mode must be one of {CHECKPOINT_MODES}, got {mode}")
+    return conn.execute(f"PRAGMA wal_checkpoint({mode.upper()})").fetchone()
+
+
+class CheckpointStats:
+    checkpoints: int
+    busy: int
+    pages: int
+
+    def __init__(self):
+        self.checkpoints = 0
+        self.busy = 0
+        self.pages = 0
+
+    def __repr__(self):
+        return f"checkpoints={self.checkpoints} busy={self.busy} pages={self.pages}"
+
+
+class Checkpointer:
+    """
+    Checkpoint the WAL of a database every `interval` seconds, from a dedicated thread and connection.
+    The writers then open their connections with wal_autocheckpoint=0, so no commit pays for a checkpoint.
+    PASSIVE checkpoints do not wait for the readers or the writers: a busy one completes on a next interval.
+    A last TRUNCATE checkpoint, when stopped, resets the WAL file.
+    """
+
+    def __init__(self, sqlite_filename: str, interval: float = 30., mode: str = "PASSIVE"):
+        self.sqlite_filename = sqlite_filename
+        self.interval = interval
+        self.mode = mode
+        self.stats = CheckpointStats()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> "Checkpointer":
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="sqlite-checkpointer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = None):
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info(f"Checkpointer stopped: {self.stats}")
+
+    def __enter__(self) -> "Checkpointer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _checkpoint(self, conn: Connection, mode: str):
+        try:
+            busy, _, pages = checkpoint(conn, mode)
+        except sqlite3.Error as e:
+            logger.error(f"Checkpoint failed: {e}")
+            return
+        self.stats.checkpoints += 1
+        self.stats.busy += busy
+        self.stats.pages += max(0, pages)
+
+    def _run(self):
+        # the journal mode is the one of the writers: a database without WAL is not switched to it
+        conn = open_connection(self.sqlite_filename, wal=False)
+        try:
+            while not self._stopped.wait(self.interval):
+                self._checkpoint(conn, self.mode)
+            self._checkpoint(conn, "TRUNCATE")
+        finally:
+            conn.close()
+
+
+def table_exists(conn: Connection, table_name: str) -> bool:
+    query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    return conn.execute(query, (table_name,)).fetchone() is not None
+
+
+def user_version(conn: Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def set_user_version(conn: Connection, version: int):
+    conn.execute(f"PRAGMA user_version={int(version)}")
+    conn.commit()
+
+
+def upgrade_schema(conn: Connection, migrations: dict[int, Callable[[Connection], object]],
+                   current: int | None = None) -> int:
+    """
+    Run the migrations to the versions above the current one, in order, each version being stored in the
+    database user_version once its migration is done. A migration must be safe to run again if interrupted.
+    :param current: the current version, when the database does not store it yet (user_version 0).
+        It is then stored.
+    :return: the version of the database
+    """
+    version = user_version(conn) or current or 0
+    for target in sorted(v for v in migrations if v > version):
+        logger.info(f"Upgrading the database schema from v{version} to v{target}")
+        migrations[target](conn)
+        set_user_version(conn, target)
+        version = target
+    if version and user_version(conn) != version:
+        set_user_version(conn, version)
+    return version
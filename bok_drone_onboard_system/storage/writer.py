@@ -0,0 +1,218 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from sqlite3 import Connection
+
+from bok_drone_onboard_system.metrics.registry import Timer
+from bok_drone_onboard_system.storage.sqlite import open_connection, SYNCHRONOUS_MODES, WAL_AUTOCHECKPOINT
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriterStats:
+    """
+    Counters maintained by a BatchWriter.
+    Each counter is only incremented from a single thread (the producer for enqueued/dropped,
+    the writer thread for the others), so no lock is needed to keep them consistent.
+    """
+    enqueued: int
+    dropped: int
+    written: int
+    failed: int
+    flushes: int
+    last_flush_latency: float
+    max_flush_latency: float
+    total_flush_latency: float
+    insert: Timer
+    commit: Timer
+
+    def __init__(self):
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_latency = 0.
+        self.max_flush_latency = 0.
+        self.total_flush_latency = 0.
+        self.insert = Timer()
+        self.commit = Timer()
+
+    def record_flush(self, n_rows: int, insert_ns: int, commit_ns: int):
+        """
+        :param insert_ns: duration of the executemany, in ns
+        :param commit_ns: duration of the commit, in ns
+        """
+        self.insert.observe_ns(insert_ns)
+        self.commit.observe_ns(commit_ns)
+        latency = (insert_ns + commit_ns) / 1e9
+        self.written += n_rows
+        self.flushes += 1
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        self.total_flush_latency += latency
+
+    @property
+    def mean_flush_latency(self) -> float:
+        if self.flushes == 0:
+            return 0.
+        return self.total_flush_latency / self.flushes
+
+    def __repr__(self):
+        return (f"enqueued={self.enqueued} written={self.written} dropped={self.dropped} failed={self.failed} "
+                f"flushes={self.flushes} flush_latency(mean={self.mean_flush_latency * 1000:.2f}ms "
+                f"max={self.max_flush_latency * 1000:.2f}ms)")
+
+
+class BatchWriter:
+    """
+    Write rows to sqlite from a dedicated thread.
+
+    The producer (typically the sampling loop) calls `put`, which never blocks: rows go into a bounded queue,
+    and are dropped (and counted) if the queue is full.
+    The writer thread drains the queue and inserts rows with `executemany`, in one transaction per batch.
+    A batch is flushed as soon as it holds `batch_size` rows, or `flush_interval` seconds after its first row arrived.
+    Remaining rows are flushed when the writer is closed.
+
+    :param sqlite_filename: path to the sqlite database file. The writer opens its own connection.
+    :param insert_stmt: parameterized INSERT statement, executed for each row
+    :param batch_size: maximum number of rows per transaction
+    :param flush_interval: maximum delay in seconds between a row being queued and being committed
+    :param max_queue: maximum number of rows waiting to be written
+    :param wal: use the write-ahead log journal mode
+    :param synchronous: sqlite synchronous pragma, one of OFF, NORMAL, FULL, EXTRA
+    :param wal_autocheckpoint: WAL size in pages triggering a checkpoint on commit, 0 when a Checkpointer runs
+    """
+
+    def __init__(
+            self,
+            sqlite_filename: str,
+            insert_stmt: str,
+            batch_size: int = 100,
+            flush_interval: float = 0.5,
+            max_queue: int = 10000,
+            wal: bool = True,
+            synchronous: str = "NORMAL",
+            wal_autocheckpoint: int = WAL_AUTOCHECKPOINT,
+    ):
+        if synchronous.upper() not in SYNCHRONOUS_MODES:
+            raise ValueError(f"synchronous must be one of {SYNCHRONOUS_MODES}, got {synchronous}")
+        self.sqlite_filename = sqlite_filename
+        self.insert_stmt = insert_stmt
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.wal = wal
+        self.synchronous = synchronous.upper()
+        self.wal_autocheckpoint = wal_autocheckpoint
+        self.stats = WriterStats()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._error = None
+
+    def start(self) -> "BatchWriter":
+        self._thread = threading.Thread(target=self._run, name="sqlite-batch-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def put(self, row: tuple) -> bool:
+        """
+        Queue a row for writing.
+        :return: False if the queue was full and the row has been dropped
+        """
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.stats.dropped += 1
+            return False
+        self.stats.enqueued += 1
+        return True
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, timeout: float | None = None):
+        """
+        Flush the pending rows and stop the writer thread.
+        :raise: the exception which stopped the writer thread, if any
+        """
+        if self._thread is None:
+            return
+        # a dead writer thread no longer drains the queue: do not wait for room in it forever
+        while self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info(f"Writer closed: {self.stats}")
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _connect(self) -> Connection:
+        return open_connection(self.sqlite_filename, wal=self.wal, synchronous=self.synchronous,
+                               wal_autocheckpoint=self.wal_autocheckpoint)
+
+    def _run(self):
+        try:
+            conn = self._connect()
+            try:
+                stop = False
+                while not stop:
+                    batch, stop = self._collect()
+                    if batch:
+                        self._flush(conn, batch)
+            finally:
+                conn.close()
+        except Exception as e:
+            # raised again by close, in the producer thread
+            logger.exception("Writer thread stopped")
+            self._error = e
+
+    def _collect(self) -> tuple[list, bool]:
+        """
+        Wait for a first row, then gather more until the batch is full or the flush interval has elapsed.
+        :return: the batch and whether the writer has been asked to stop
+        """
+        row = self._queue.get()
+        if row is _STOP:
+            return [], True
+        batch = [row]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                row = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if row is _STOP:
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    def _flush(self, conn: Connection, batch: list):
+        t0 = time.perf_counter_ns()
+        try:
+            with conn:
+                conn.executemany(self.insert_stmt, batch)
+                t1 = time.perf_counter_ns()
+        except sqlite3.Error as e:
+            self.stats.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} rows: {e}")
+            return
+        self.stats.record_flush(len(batch), t1 - t0, time.perf_counter_ns() - t1)
@@ -0,0 +1,256 @@
+import errno
+import logging
+import threading
+import time
+from typing import Callable, NamedTuple, TypeVar
+
+from serial import SerialException
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# failure kinds
+TRANSIENT = "transient"
+DEVICE_LOST = "device_lost"
+
+# errno of a device which is gone: unplugged, removed from the bus, or closed under our feet
+_LOST_ERRNOS = {errno.ENODEV, errno.ENXIO, errno.ENOENT, errno.EBADF}
+
+
+def classify_failure(e: BaseException) -> str:
+    """
+    :return: TRANSIENT for a read error worth retrying on the same device (an I2C NACK, EREMOTEIO, or EIO,
+        a packet error of the BNO08x driver, a garbled line), DEVICE_LOST when the device must be reopened
+    """
+    if isinstance(e, SerialException):
+        # pyserial raises it when the port disappears, e.g. "device reports readiness to read but returned no data"
+        return DEVICE_LOST
+    if isinstance(e, OSError):
+        return DEVICE_LOST if isinstance(e, FileNotFoundError) or e.errno in _LOST_ERRNOS else TRANSIENT
+    if isinstance(e, (RuntimeError, ValueError)):
+        return TRANSIENT
+    return DEVICE_LOST
+
+
+class RetryPolicy:
+    """
+    How a DeviceSupervisor recovers:
+    * a transient read failure is retried on the same device up to `read_retries` times, after a backoff doubling
+      from `initial_backoff` to `max_backoff` seconds: a few hundred microseconds for an I2C hiccup
+    * beyond, or when the device is lost, it is reopened after a delay doubling from `reopen_delay`
+      to `max_reopen_delay` seconds, until a read succeeds
+    """
+    read_retries: int
+    initial_backoff: float
+    max_backoff: float
+    reopen_delay: float
+    max_reopen_delay: float
+
+    def __init__(self, read_retries: int = 5, initial_backoff: float = 100e-6, max_backoff: float = 0.01,
+                 reopen_delay: float = 0.1, max_reopen_delay: float = 3.):
+        self.read_retries = read_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.reopen_delay = reopen_delay
+        self.max_reopen_delay = max_reopen_delay
+
+    def read_backoff(self, attempt: int) -> float:
+        return min(self.initial_backoff * 2 ** attempt, self.max_backoff)
+
+    def reopen_backoff(self, attempt: int) -> float:
+        return min(self.reopen_delay * 2 ** attempt, self.max_reopen_delay)
+
+
+class Gap(NamedTuple):
+    """
+    An interval without data: from the last successful read to the next one, in epoch seconds
+    """
+    source: str
+    start: float
+    end: float
+    failures: int
+    kind: str
+    error: str
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class SupervisorStats:
+    failures: int
+    retries: int
+    reconnections: int
+    gaps: int
+    lost_seconds: float
+
+    def __init__(self):
+        self.failures = 0
+        self.retries = 0
+        self.reconnections = 0
+        self.gaps = 0
+        self.lost_seconds = 0.
+
+    def __repr__(self):
+        return (f"failures={self.failures} retries={self.retries} reconnections={self.reconnections} "
+                f"gaps={self.gaps} lost={self.lost_seconds:.3f}s")
+
+
+class Stopped(Exception):
+    """
+    Raised by DeviceSupervisor.read once stopped
+    """
+
+
+class DeviceSupervisor:
+    """
+    Keep a device open and read it, recovering from failures with bounded latency:
+    transient read failures are retried in place with a short backoff, and escalate to reopening the device only when
+    they persist or when the device is lost (see classify_failure and RetryPolicy).
+    Each interruption is reported as a Gap once the reads succeed again, so the data loss can be measured.
+
+    Only the device is reopened: the storage (e.g. a BatchWriter) is not affected by the failures.
+    `read` is blocking, and meant to be called from a single thread at a time.
+
+    :param name: the source name, in logs and gaps
+    :param open_device: open the device, e.g. `load_bno`
+    :param close_device: release a device before reopening it. Default is calling its `close` method, if any.
+    :param on_error: called with each failure, including opening ones
+    :param on_reconnect: called when the device has been reopened after a failure
+    :param on_gap: called with each Gap
+    :param clock: epoch clock of the gaps, in seconds
+    :param sleep: sleep function of the read backoff, in seconds
+    """
+
+    def __init__(
+            self,
+            name: str,
+            open_device: Callable[[], object],
+            policy: RetryPolicy | None = None,
+            close_device: Callable[[object], None] | None = None,
+            on_error: Callable[[Exception], None] | None = None,
+            on_reconnect: Callable[[], None] | None = None,
+            on_gap: Callable[[Gap], None] | None = None,
+            clock: Callable[[], float] = time.time,
+            sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.name = name
+        self.open_device = open_device
+        self.policy = policy or RetryPolicy()
+        self.close_device = close_device or _close
+        self.on_error = on_error
+        self.on_reconnect = on_reconnect
+        self.on_gap = on_gap
+        self.stats = SupervisorStats()
+        self.stopped = threading.Event()
+        self._clock = clock
+        self._sleep = sleep
+        self._device = None
+        self._opened = False
+        self._last_read_at = None
+
+    @property
+    def device(self):
+        return self._device
+
+    def stop(self):
+        """
+        Interrupt the reopening delays: the pending and next reads raise Stopped
+        """
+        self.stopped.set()
+
+    def close(self):
+        if self._device is not None:
+            try:
+                self.close_device(self._device)
+            except Exception as e:
+                logger.debug(f"{self.name}: failed to close the device: {e}")
+            self._device = None
+
+    def read(self, read: Callable[[object], T]) -> T:
+        """
+        :param read: read a value from the device
+        :return: the value of the first successful read
+        :raise Stopped: when stopped before a read succeeded
+        """
+        failures = 0
+        kind = TRANSIENT
+        last_error = None
+        gap_start = None
+        retries = 0
+        reopens = 0
+        while True:
+            if self.stopped.is_set():
+                raise Stopped(f"{self.name} supervisor stopped")
+            if self._device is None:
+                try:
+                    self._device = self.open_device()
+                except Exception as e:
+                    failures += 1
+                    kind, last_error = DEVICE_LOST, e
+                    gap_start = self._gap_start(gap_start)
+                    self._failed(e)
+                    delay = self.policy.reopen_backoff(reopens)
+                    reopens += 1
+                    logger.error(f"{self.name}: cannot open the device: {e}. Retrying in {delay:.3f}s")
+                    self.stopped.wait(delay)
+                    continue
+                if self._opened:
+                    self.stats.reconnections += 1
+                    if self.on_reconnect is not None:
+                        self.on_reconnect()
+                    logger.info(f"{self.name}: device reopened")
+                self._opened = True
+                retries = 0
+            try:
+                value = read(self._device)
+            except Exception as e:
+                failures += 1
+                last_error = e
+                gap_start = self._gap_start(gap_start)
+                self._failed(e)
+                if classify_failure(e) == TRANSIENT and retries < self.policy.read_retries:
+                    self.stats.retries += 1
+                    logger.debug(f"{self.name}: transient read failure: {e}")
+                    self._sleep(self.policy.read_backoff(retries))
+                    retries += 1
+                    continue
+                kind = DEVICE_LOST
+                self.close()
+                delay = self.policy.reopen_backoff(reopens)
+                reopens += 1
+                logger.warning(f"{self.name}: reopening the device in {delay:.3f}s after {failures} failures: {e}")
+                self.stopped.wait(delay)
+                continue
+            now = self._clock()
+            if failures:
+                self._record_gap(Gap(self.name, gap_start, now, failures, kind, str(last_error)))
+            self._last_read_at = now
+            return value
+
+    def _gap_start(self, gap_start: float | None) -> float:
+        """
+        :return: the start of the current gap: the last successful read, or now on the first failure without any
+        """
+        if gap_start is not None:
+            return gap_start
+        return self._last_read_at if self._last_read_at is not None else self._clock()
+
+    def _failed(self, e: Exception):
+        self.stats.failures += 1
+        if self.on_error is not None:
+            self.on_error(e)
+
+    def _record_gap(self, gap: Gap):
+        self.stats.gaps += 1
+        self.stats.lost_seconds += gap.duration
+        logger.info(f"{self.name}: {gap.kind} gap of {gap.duration * 1000:.1f}ms, {gap.failures} failures")
+        if self.on_gap is not None:
+            self.on_gap(gap)
+
+
+def _close(device):
+    close = getattr(device, "close", None)
+    if close is not None:
+        close()
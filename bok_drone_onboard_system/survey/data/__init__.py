@@ -1,8 +1,12 @@
 import logging
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from sqlite3 import Connection
+from typing import Generator
 
+import numpy as np
+
+from bok_drone_onboard_system.storage.sqlite import open_connection, user_version, set_user_version
 from bok_drone_onboard_system.survey import SurveyMeasure
 from bok_drone_onboard_system.survey.gps import GPSPoint
 
@@ -10,46 +14,160 @@ logger = logging.getLogger(__name__)
 
 TABLE_NAME="survey_records"
 
+# v1: ISO text timestamp primary key
+SCHEMA_V1 = 1
+# v2: INTEGER epoch milliseconds primary key (the rowid itself, so time range queries are b-tree seeks)
+SCHEMA_V2 = 2
+
+TIMESTAMP_COLUMNS = {
+    SCHEMA_V1: ("timestamp", "TEXT"),
+    SCHEMA_V2: ("timestamp_ms", "INTEGER"),
+}
+VALUE_COLUMNS = ("quat_i", "quat_j", "quat_k", "quat_real", "gps_lat", "gps_lon", "gps_alt")
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# SQL expression of the timestamp as epoch milliseconds, for each schema
+TIMESTAMP_MS_EXPRESSIONS = {
+    SCHEMA_V1: "CAST(ROUND((julianday(timestamp) - 2440587.5) * 86400000.0) AS INTEGER)",
+    SCHEMA_V2: "timestamp_ms",
+}
+
+
+class SurveyArrays:
+    """
+    Columnar survey data, ordered by timestamp.
+    """
+    timestamps_ns: np.ndarray
+    quaternions: np.ndarray
+    positions: np.ndarray
+
+    def __init__(self, timestamps_ns: np.ndarray, quaternions: np.ndarray, positions: np.ndarray):
+        """
+        :param timestamps_ns: (N,) int64 epoch in nanoseconds
+        :param quaternions: (N,4) BNO08x quaternions as (i, j, k, real)
+        :param positions: (N,3) WGS84 GPS positions as (latitude, longitude, altitude)
+        """
+        self.timestamps_ns = timestamps_ns
+        self.quaternions = quaternions
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.timestamps_ns)
+
+
 def db_conn(sqlite_filename: str) -> Connection:
     logger.info(f"Connecting to DB {sqlite_filename}")
-    return sqlite3.connect(sqlite_filename)
+    return open_connection(sqlite_filename)
 
 
-def create_table_if_not_exists(conn: Connection) -> Connection:
-    logger.info("Creating table if not exists")
+def to_epoch_ms(timestamp: datetime) -> int:
+    """
+    Naive datetimes are considered as UTC.
+    """
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (timestamp - EPOCH) // timedelta(milliseconds=1)
+
+
+def from_epoch_ms(timestamp_ms: int) -> datetime:
+    return EPOCH + timedelta(milliseconds=timestamp_ms)
+
+
+def create_table(conn: Connection, table_name: str, schema_version: int):
+    timestamp_column, timestamp_type = TIMESTAMP_COLUMNS[schema_version]
+    value_columns = ",\n".join(f"               {c} REAL" for c in VALUE_COLUMNS)
     stmt = f"""
-           CREATE TABLE IF NOT EXISTS {TABLE_NAME}
+           CREATE TABLE IF NOT EXISTS {table_name}
            (
-               timestamp TEXT PRIMARY KEY,
-               quat_i REAL,
-               quat_j REAL,
-               quat_k REAL,
-               quat_real REAL,
-               gps_lat REAL,
-               gps_lon REAL,
-               gps_alt REAL
+               {timestamp_column} {timestamp_type} PRIMARY KEY,
+{value_columns}
            )"""
     conn.execute(stmt)
+
+
+def create_table_if_not_exists(conn: Connection, schema_version: int = SCHEMA_V2) -> Connection:
+    """
+    Create the survey table with the given schema, unless it exists already (whatever its schema).
+    The schema version of a new table is stored as the database user_version, see storage.sqlite.upgrade_schema.
+    """
+    logger.info("Creating table if not exists")
+    exists = detect_schema_version(conn) is not None
+    create_table(conn, TABLE_NAME, schema_version)
     conn.commit()
+    if not exists and user_version(conn) == 0:
+        set_user_version(conn, schema_version)
     return conn
 
 
-def append_measure(quaternion: tuple, gps_point: GPSPoint, conn: Connection):
-    timestamp = None if gps_point.timestamp is None else gps_point.timestamp.isoformat(timespec='milliseconds')
+def detect_schema_version(conn: Connection, table_name: str = TABLE_NAME) -> int | None:
+    """
+    :return: SCHEMA_V1 or SCHEMA_V2, or None if the table does not exist
+    """
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")}
+    if not columns:
+        return None
+    if TIMESTAMP_COLUMNS[SCHEMA_V2][0] in columns:
+        return SCHEMA_V2
+    return SCHEMA_V1
+
+
+def insert_statement(schema_version: int, table_name: str = TABLE_NAME, or_ignore: bool = False) -> str:
+    timestamp_column = TIMESTAMP_COLUMNS[schema_version][0]
+    columns = (timestamp_column, *VALUE_COLUMNS)
+    verb = "INSERT OR IGNORE" if or_ignore else "INSERT"
+    return f"{verb} INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+
+def timestamp_param(timestamp: datetime | None, schema_version: int):
+    """
+    :return: the timestamp as stored in the given schema
+    """
+    if timestamp is None:
+        return None
+    if schema_version == SCHEMA_V2:
+        return to_epoch_ms(timestamp)
+    return timestamp.isoformat(timespec='milliseconds')
+
+
+def append_measure(quaternion: tuple, gps_point: GPSPoint, conn: Connection, schema_version: int = SCHEMA_V2):
+    timestamp = timestamp_param(gps_point.timestamp, schema_version)
+    if timestamp is None and schema_version == SCHEMA_V2:
+        logger.warning(f"Skipping measure without timestamp {quaternion}, {gps_point.latitude}, {gps_point.longitude}")
+        return
 
     conn.execute(
-        f"INSERT INTO {TABLE_NAME} (timestamp, quat_i, quat_j, quat_k, quat_real, gps_lat, gps_lon, gps_alt) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        insert_statement(schema_version),
         (timestamp, *quaternion, gps_point.latitude, gps_point.longitude, gps_point.altitude),
     )
     conn.commit()
 
 
+def time_range_condition(
+        start: datetime | None, end: datetime | None, schema_version: int
+) -> tuple[list[str], list]:
+    """
+    :return: the SQL conditions and their parameters to select [start, end[
+    """
+    timestamp_column = TIMESTAMP_COLUMNS[schema_version][0]
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append(f"{timestamp_column} >= ?")
+        params.append(timestamp_param(start, schema_version))
+    if end is not None:
+        conditions.append(f"{timestamp_column} < ?")
+        params.append(timestamp_param(end, schema_version))
+    return conditions, params
+
+
 def load_data(
         conn: Connection,
         start: datetime | None, end: datetime | None,
         only_defined:bool=False
 ) -> list[SurveyMeasure]:
     """ survey data from the database
+    Both schemas are supported. With SCHEMA_V2, timestamps are returned as UTC datetimes.
 
     :param conn: sqlite datbase connection
     :param start: inclusive starting timestamp. If None, start from the beginning of the survey.
@@ -57,44 +175,147 @@ def load_data(
     :param only_defined: if True, only return SurveyMeasure when defined.
     :return: list of SurveyMeasure
     """
-    query = f"SELECT timestamp, quat_i, quat_j, quat_k, quat_real, gps_lat, gps_lon, gps_alt FROM {TABLE_NAME}"
-    params = []
-    
+    schema_version = detect_schema_version(conn)
+    if schema_version is None:
+        raise sqlite3.OperationalError(f"no such table: {TABLE_NAME}")
+    timestamp_column = TIMESTAMP_COLUMNS[schema_version][0]
+    parse_timestamp = from_epoch_ms if schema_version == SCHEMA_V2 else datetime.fromisoformat
+
+    query = f"SELECT {timestamp_column}, {', '.join(VALUE_COLUMNS)} FROM {TABLE_NAME}"
+
     # Add timestamp filters if provided
-    conditions = []
-    if start is not None:
-        conditions.append("timestamp >= ?")
-        params.append(start.isoformat(timespec='milliseconds'))
-    if end is not None:
-        conditions.append("timestamp < ?")
-        params.append(end.isoformat(timespec='milliseconds'))
-    
+    conditions, params = time_range_condition(start, end, schema_version)
+
     # Add conditions to query if any exist
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
-    
+
     # Execute query
     cursor = conn.execute(query, params)
-    
+
     # Process results
     results = []
     for row in cursor.fetchall():
-        timestamp_str, quat_i, quat_j, quat_k, quat_real, gps_lat, gps_lon, gps_alt = row
-        
+        timestamp_value, quat_i, quat_j, quat_k, quat_real, gps_lat, gps_lon, gps_alt = row
+
         # Parse timestamp if it exists
-        timestamp = datetime.fromisoformat(timestamp_str) if timestamp_str else None
-        
+        timestamp = parse_timestamp(timestamp_value) if timestamp_value is not None else None
+
         # Create GPSPoint
         gps_point = GPSPoint(timestamp, gps_lat, gps_lon, gps_alt)
-        
+
         # Create quaternion tuple
         quaternion = (quat_i, quat_j, quat_k, quat_real)
-        
+
         # Create SurveyMeasure
         measure = SurveyMeasure(gps_point, quaternion)
-        
+
         # Add to results if it meets the criteria
         if not only_defined or measure.is_defined():
             results.append(measure)
-    
+
     return results
+
+
+def arrays_query(
+        conn: Connection, start: datetime | None, end: datetime | None, only_defined: bool
+) -> tuple[str, list]:
+    """
+    :return: the query selecting (timestamp in epoch ms, *VALUE_COLUMNS), ordered by time, and its parameters
+    """
+    schema_version = detect_schema_version(conn)
+    if schema_version is None:
+        raise sqlite3.OperationalError(f"no such table: {TABLE_NAME}")
+    timestamp_column = TIMESTAMP_COLUMNS[schema_version][0]
+
+    timestamp_ms = TIMESTAMP_MS_EXPRESSIONS[schema_version]
+    conditions, params = time_range_condition(start, end, schema_version)
+    # also excludes the v1 timestamps julianday() cannot parse, which would otherwise be read as epoch 0
+    conditions.append(f"{timestamp_ms} IS NOT NULL")
+    if only_defined:
+        conditions += [f"{c} IS NOT NULL" for c in VALUE_COLUMNS]
+
+    query = (f"SELECT {timestamp_ms}, {', '.join(VALUE_COLUMNS)} FROM {TABLE_NAME}"
+             f" WHERE {' AND '.join(conditions)} ORDER BY {timestamp_column}")
+    return query, params
+
+
+def median_position(
+        conn: Connection, start: datetime | None = None, end: datetime | None = None
+) -> tuple[float, float] | None:
+    """
+    The median latitude and longitude of the survey records in [start, end[, computed by sqlite,
+    e.g. to pick the UTM zone of a whole survey before streaming it.
+    :return: (latitude, longitude), or None if no record has a position
+    """
+    schema_version = detect_schema_version(conn)
+    if schema_version is None:
+        raise sqlite3.OperationalError(f"no such table: {TABLE_NAME}")
+    conditions, params = time_range_condition(start, end, schema_version)
+    conditions += ["gps_lat IS NOT NULL", "gps_lon IS NOT NULL"]
+    where = " AND ".join(conditions)
+    n = conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME} WHERE {where}", params).fetchone()[0]
+    if n == 0:
+        return None
+    latitude, longitude = (
+        conn.execute(f"SELECT {column} FROM {TABLE_NAME} WHERE {where} ORDER BY {column} LIMIT 1 OFFSET ?",
+                     [*params, n // 2]).fetchone()[0]
+        for column in ("gps_lat", "gps_lon")
+    )
+    return latitude, longitude
+
+
+def load_arrays(
+        conn: Connection,
+        start: datetime | None = None, end: datetime | None = None,
+        only_defined: bool = True,
+        chunk_size: int = 10000,
+) -> SurveyArrays:
+    """
+    Load survey data as arrays, without building an object per record.
+    The cursor is read in chunks of `chunk_size` rows, copied into preallocated arrays.
+    Records without a valid timestamp are ignored. Undefined values are NaN.
+
+    :param conn: sqlite database connection
+    :param start: inclusive starting timestamp. If None, start from the beginning of the survey.
+    :param end: exclusive ending timestamp. If None, end at the end of the survey.
+    :param only_defined: if True, only load records with all quaternion and GPS values defined.
+    :param chunk_size: number of rows fetched at once
+    :return: SurveyArrays
+    """
+    query, params = arrays_query(conn, start, end, only_defined)
+    n = conn.execute(f"SELECT COUNT(*) FROM ({query})", params).fetchone()[0]
+    timestamps_ms = np.empty(n, dtype=np.int64)
+    values = np.empty((n, len(VALUE_COLUMNS)), dtype=float)
+
+    cursor = conn.execute(query, params)
+    filled = 0
+    # records may be appended while reading: stop at the counted size
+    while filled < n and (rows := cursor.fetchmany(min(chunk_size, n - filled))):
+        chunk = np.array(rows, dtype=float)
+        timestamps_ms[filled:filled + len(rows)] = chunk[:, 0]
+        values[filled:filled + len(rows)] = chunk[:, 1:]
+        filled += len(rows)
+    cursor.close()
+
+    return SurveyArrays(timestamps_ms[:filled] * 1_000_000, values[:filled, 0:4], values[:filled, 4:7])
+
+
+def iter_arrays(
+        conn: Connection,
+        start: datetime | None = None, end: datetime | None = None,
+        only_defined: bool = True,
+        chunk_size: int = 10000,
+) -> Generator[SurveyArrays, None, None]:
+    """
+    Stream the survey data as SurveyArrays of at most chunk_size records, straight from the DB cursor,
+    so that memory does not depend on the survey length. Same selection as load_arrays.
+    """
+    query, params = arrays_query(conn, start, end, only_defined)
+    cursor = conn.execute(query, params)
+    try:
+        while rows := cursor.fetchmany(chunk_size):
+            chunk = np.array(rows, dtype=float)
+            yield SurveyArrays(chunk[:, 0].astype(np.int64) * 1_000_000, chunk[:, 1:5], chunk[:, 5:8])
+    finally:
+        cursor.close()
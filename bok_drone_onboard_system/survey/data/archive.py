@@ -0,0 +1,192 @@
+"""
+Archive of a survey session: one file per table in a directory, written by survey-export and read back by
+survey-analyse without going through sqlite. See storage.archive for the file format.
+"""
+import logging
+import os
+from datetime import datetime
+from sqlite3 import Connection
+from typing import Generator, Iterable
+
+import numpy as np
+
+from bok_drone_onboard_system.bno import data as bno_data
+from bok_drone_onboard_system.bno.data import reports
+from bok_drone_onboard_system.bno.data.reports import BNOReports
+from bok_drone_onboard_system.storage.archive import FORMATS, DEFAULT_COMPRESSION, write_archive, iter_archive, \
+    read_archive, read_archive_metadata
+from bok_drone_onboard_system.survey.data import TABLE_NAME, VALUE_COLUMNS, SurveyArrays, iter_arrays, to_epoch_ms
+from bok_drone_onboard_system.survey.data.metadata import get_all_metadata
+
+logger = logging.getLogger(__name__)
+
+PROJECTED_TABLE_NAME = "projected"
+
+# table: columns of its archive, the int64 timestamp first
+ARCHIVE_COLUMNS = {
+    TABLE_NAME: ("timestamp_ns", *VALUE_COLUMNS),
+    bno_data.TABLE_NAME: ("timestamp_ns", "quat_i", "quat_j", "quat_k", "quat_real"),
+    reports.TABLE_NAME: ("timestamp_us", *reports.VALUE_COLUMNS),
+    PROJECTED_TABLE_NAME: ("timestamp_ns", "utm_x", "utm_y", "utm_z", "proj_x", "proj_y", "proj_z"),
+}
+
+
+def archive_path(directory: str, table_name: str, fmt: str | None = None) -> str | None:
+    """
+    :param fmt: the archive format. If None, the one of the existing file.
+    :return: the path of the archive of a table, or None if fmt is None and there is no such archive
+    """
+    if fmt is not None:
+        return os.path.join(directory, table_name + FORMATS[fmt])
+    for extension in FORMATS.values():
+        path = os.path.join(directory, table_name + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def export_survey_records(
+        conn: Connection, directory: str, fmt: str = "parquet", compression: str | None = DEFAULT_COMPRESSION,
+        start: datetime | None = None, end: datetime | None = None, chunk_size: int = 10000
+) -> int:
+    """
+    Export all the survey records, undefined values included as NaN, with the session metadata
+    :return: the number of exported records
+    """
+    chunks = (
+        (a.timestamps_ns, np.hstack((a.quaternions, a.positions)))
+        for a in iter_arrays(conn, start, end, only_defined=False, chunk_size=chunk_size)
+    )
+    return write_archive(archive_path(directory, TABLE_NAME, fmt), ARCHIVE_COLUMNS[TABLE_NAME], chunks,
+                         fmt, compression, get_all_metadata(conn))
+
+
+def export_bno_data(
+        conn: Connection, directory: str, fmt: str = "parquet", compression: str | None = DEFAULT_COMPRESSION,
+        start: datetime | None = None, end: datetime | None = None, chunk_size: int = 10000
+) -> int:
+    """
+    :return: the number of exported quaternions
+    """
+    chunks = bno_data.iter_quaternions(conn, start, end, chunk_size)
+    return write_archive(archive_path(directory, bno_data.TABLE_NAME, fmt), ARCHIVE_COLUMNS[bno_data.TABLE_NAME],
+                         chunks, fmt, compression)
+
+
+def export_bno_reports(
+        conn: Connection, directory: str, fmt: str = "parquet", compression: str | None = DEFAULT_COMPRESSION,
+        start: datetime | None = None, end: datetime | None = None, chunk_size: int = 10000
+) -> int:
+    """
+    :return: the number of exported reports
+    """
+    chunks = reports.iter_reports(conn, start, end, chunk_size)
+    return write_archive(archive_path(directory, reports.TABLE_NAME, fmt), ARCHIVE_COLUMNS[reports.TABLE_NAME],
+                         chunks, fmt, compression)
+
+
+def export_projected(
+        projected: Iterable[tuple[np.ndarray, np.ndarray, np.ndarray]], directory: str, fmt: str = "parquet",
+        compression: str | None = DEFAULT_COMPRESSION, metadata: dict | None = None
+) -> int:
+    """
+    :param projected: chunks of (timestamps in ns, (N,3) GPS positions, (N,3) pole end positions), in UTM
+    :param metadata: how the projection was made (EPSG code, pole length...)
+    :return: the number of exported projected measures
+    """
+    chunks = ((timestamps_ns, np.hstack((utm_coords, projections)))
+              for timestamps_ns, utm_coords, projections in projected)
+    return write_archive(archive_path(directory, PROJECTED_TABLE_NAME, fmt), ARCHIVE_COLUMNS[PROJECTED_TABLE_NAME],
+                         chunks, fmt, compression, metadata)
+
+
+def iter_survey_archive(
+        directory: str, start: datetime | None = None, end: datetime | None = None,
+        only_defined: bool = True, chunk_size: int = 10000
+) -> Generator[SurveyArrays, None, None]:
+    """
+    Stream the archived survey records, as survey.data.iter_arrays
+    """
+    path = archive_path(directory, TABLE_NAME)
+    if path is None:
+        raise FileNotFoundError(f"No {TABLE_NAME} archive in {directory}")
+    start_ns = to_epoch_ms(start) * 1_000_000 if start is not None else None
+    end_ns = to_epoch_ms(end) * 1_000_000 if end is not None else None
+    for timestamps_ns, values in iter_archive(path, chunk_size):
+        selected = np.ones(len(timestamps_ns), dtype=bool)
+        if start_ns is not None:
+            selected &= timestamps_ns >= start_ns
+        if end_ns is not None:
+            selected &= timestamps_ns < end_ns
+        if only_defined:
+            selected &= np.all(np.isfinite(values), axis=1)
+        yield SurveyArrays(timestamps_ns[selected], values[selected, 0:4], values[selected, 4:7])
+
+
+def median_position_archive(
+        directory: str, start: datetime | None = None, end: datetime | None = None, chunk_size: int = 10000
+) -> tuple[float, float] | None:
+    """
+    survey.data.median_position, from the archived survey records: only their latitudes and longitudes are kept
+    :return: (latitude, longitude), or None if no record has a position
+    """
+    coordinates = [chunk.positions[np.all(np.isfinite(chunk.positions[:, 0:2]), axis=1), 0:2]
+                   for chunk in iter_survey_archive(directory, start, end, only_defined=False, chunk_size=chunk_size)]
+    coordinates = np.concatenate(coordinates) if coordinates else np.empty((0, 2))
+    if len(coordinates) == 0:
+        return None
+    latitude, longitude = np.median(coordinates, axis=0)
+    return float(latitude), float(longitude)
+
+
+def load_reports_archive(directory: str) -> BNOReports | None:
+    """
+    :return: all the archived BNO08x reports, or None if they were not archived
+    """
+    path = archive_path(directory, reports.TABLE_NAME)
+    if path is None:
+        return None
+    return BNOReports(*read_archive(path))
+
+
+def iter_reports_archive_around(
+        directory: str, chunks: Iterable[SurveyArrays], offset: float = 0., margin: float = 1., chunk_size: int = 10000
+) -> Generator[tuple[SurveyArrays, BNOReports], None, None]:
+    """
+    Streaming version of load_reports_archive: for each chunk of survey records, in time order, the archived reports
+    covering it as bno.data.reports.load_reports_around. Only the reports of the current window are kept in memory.
+    :return: for each chunk, the chunk and its reports
+    """
+    path = archive_path(directory, reports.TABLE_NAME)
+    if path is None:
+        raise FileNotFoundError(f"No {reports.TABLE_NAME} archive in {directory}")
+    report_chunks = iter_archive(path, chunk_size)
+    timestamps_us = np.empty(0, dtype=np.int64)
+    values = np.empty((0, len(reports.VALUE_COLUMNS)))
+    exhausted = False
+    for survey_arrays in chunks:
+        if len(survey_arrays) == 0:
+            yield survey_arrays, BNOReports(timestamps_us[:0], values[:0])
+            continue
+        start_us = int(survey_arrays.timestamps_ns[0]) // 1000 + round((offset - margin) * 1_000_000)
+        end_us = int(survey_arrays.timestamps_ns[-1]) // 1000 + round((offset + margin) * 1_000_000) + 1
+        while not exhausted and (len(timestamps_us) == 0 or timestamps_us[-1] < end_us):
+            chunk = next(report_chunks, None)
+            if chunk is None:
+                exhausted = True
+            else:
+                timestamps_us = np.concatenate([timestamps_us, chunk[0]])
+                values = np.concatenate([values, chunk[1]])
+        # the survey chunks are in time order: the reports before this window are not needed anymore
+        kept = np.searchsorted(timestamps_us, start_us)
+        timestamps_us, values = timestamps_us[kept:], values[kept:]
+        window = slice(0, np.searchsorted(timestamps_us, end_us))
+        yield survey_arrays, BNOReports(timestamps_us[window], values[window])
+
+
+def load_archive_metadata(directory: str) -> dict:
+    """
+    :return: the session metadata stored with the archived survey records
+    """
+    path = archive_path(directory, TABLE_NAME)
+    return read_archive_metadata(path) if path is not None else {}
@@ -0,0 +1,53 @@
+"""
+Storage of the Emlid LLH stream, next to the survey records.
+
+One row per LLH solution, keyed by the GPS time as integer epoch milliseconds (the rowid, as in SCHEMA_V2).
+"""
+import logging
+from sqlite3 import Connection
+
+from bok_drone_onboard_system.survey.data import to_epoch_ms
+from bok_drone_onboard_system.survey.gps import EmlidEntry
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = "llh_records"
+VALUE_COLUMNS = (
+    ("latitude", "REAL"), ("longitude", "REAL"), ("height", "REAL"),
+    ("quality", "INTEGER"), ("n_satellites", "INTEGER"),
+    ("sdn", "REAL"), ("sde", "REAL"), ("sdu", "REAL"),
+    ("age", "REAL"), ("ratio", "REAL"),
+)
+# rows are written in batches: ignore a duplicated solution rather than failing the batch
+INSERT_STMT = (
+    f"INSERT OR IGNORE INTO {TABLE_NAME} (timestamp_ms, {', '.join(c for c, _ in VALUE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * (len(VALUE_COLUMNS) + 1))})"
+)
+
+
+def create_table_if_not_exists(conn: Connection) -> Connection:
+    logger.info(f"Creating table {TABLE_NAME} if not exists")
+    columns = ",\n".join(f"        {c} {t}" for c, t in VALUE_COLUMNS)
+    stmt = f"""
+    CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+        timestamp_ms INTEGER PRIMARY KEY,
+{columns}
+    )"""
+    conn.execute(stmt)
+    conn.commit()
+    return conn
+
+
+def llh_row(entry: EmlidEntry) -> tuple:
+    """
+    Build the row to be inserted with INSERT_STMT
+    """
+    point = entry.gps_point
+    quality = entry.solution_status.value if entry.solution_status is not None else None
+    return (
+        to_epoch_ms(point.timestamp),
+        point.latitude, point.longitude, point.altitude,
+        quality, entry.n_satellites,
+        *entry.std_dev,
+        entry.age, entry.ratio,
+    )
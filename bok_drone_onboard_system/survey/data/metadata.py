@@ -0,0 +1,60 @@
+"""
+Session metadata, stored in the survey database next to the records: results of the analysis steps
+(clock offset, calibration...) to be reused by the following ones.
+
+Values are stored as JSON, by key.
+"""
+import json
+import logging
+from sqlite3 import Connection
+
+from bok_drone_onboard_system.storage import sqlite
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = "session_metadata"
+
+CLOCK_OFFSET_KEY = "clock_offset"
+POLE_AXIS_KEY = "pole_axis"
+
+
+def create_table_if_not_exists(conn: Connection) -> Connection:
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )""")
+    conn.commit()
+    return conn
+
+
+def set_metadata(conn: Connection, key: str, value):
+    """
+    Store a JSON serializable value, replacing the previous one
+    """
+    create_table_if_not_exists(conn)
+    conn.execute(f"INSERT OR REPLACE INTO {TABLE_NAME} (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+    conn.commit()
+
+
+def table_exists(conn: Connection) -> bool:
+    return sqlite.table_exists(conn, TABLE_NAME)
+
+
+def get_metadata(conn: Connection, key: str, default=None):
+    """
+    :return: the stored value, or default if there is none
+    """
+    if not table_exists(conn):
+        return default
+    row = conn.execute(f"SELECT value FROM {TABLE_NAME} WHERE key = ?", (key,)).fetchone()
+    return json.loads(row[0]) if row else default
+
+
+def get_all_metadata(conn: Connection) -> dict:
+    """
+    :return: all the stored values, by key
+    """
+    if not table_exists(conn):
+        return {}
+    return {key: json.loads(value) for key, value in conn.execute(f"SELECT key, value FROM {TABLE_NAME}")}
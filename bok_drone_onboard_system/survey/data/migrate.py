@@ -0,0 +1,96 @@
+"""
+In place migration of the survey_records table from SCHEMA_V1 (ISO text timestamp) to SCHEMA_V2 (INTEGER epoch ms).
+"""
+import logging
+from datetime import datetime
+from sqlite3 import Connection
+
+from bok_drone_onboard_system.storage.sqlite import upgrade_schema
+from bok_drone_onboard_system.survey.data import (
+    TABLE_NAME, SCHEMA_V1, SCHEMA_V2, VALUE_COLUMNS,
+    create_table, detect_schema_version, insert_statement, to_epoch_ms,
+)
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_TABLE_NAME = f"{TABLE_NAME}_v2_migration"
+
+
+def convert_v1_rows(rows: list[tuple]) -> tuple[list[tuple], int]:
+    """
+    :param rows: (rowid, timestamp, *values) rows from the SCHEMA_V1 table
+    :return: the SCHEMA_V2 rows, and the number of rows skipped because they have no valid timestamp
+    """
+    converted = []
+    for _, timestamp, *values in rows:
+        if not timestamp:
+            continue
+        try:
+            timestamp_ms = to_epoch_ms(datetime.fromisoformat(timestamp))
+        except ValueError:
+            logger.debug(f"Invalid timestamp {timestamp!r}")
+            continue
+        converted.append((timestamp_ms, *values))
+    return converted, len(rows) - len(converted)
+
+
+def copy_chunks(conn: Connection, chunk_size: int) -> tuple[int, int]:
+    """
+    Copy the SCHEMA_V1 table into the migration table, one transaction per chunk of rows.
+    As rows are inserted with INSERT OR IGNORE, an interrupted migration can be run again.
+    :return: the number of copied and skipped rows
+    """
+    select = f"SELECT rowid, timestamp, {', '.join(VALUE_COLUMNS)} FROM {TABLE_NAME} WHERE rowid > ? ORDER BY rowid LIMIT ?"
+    insert = insert_statement(SCHEMA_V2, MIGRATION_TABLE_NAME, or_ignore=True)
+    last_rowid = -1
+    copied = skipped = 0
+    while rows := conn.execute(select, (last_rowid, chunk_size)).fetchall():
+        converted, n_skipped = convert_v1_rows(rows)
+        with conn:
+            conn.executemany(insert, converted)
+        last_rowid = rows[-1][0]
+        copied += len(converted)
+        skipped += n_skipped
+        logger.info(f"Migrated {copied} rows")
+    return copied, skipped
+
+
+def migrate_to_v2(conn: Connection, chunk_size: int = 10000) -> int:
+    """
+    Convert the survey table to SCHEMA_V2, in place.
+    Rows are copied in chunks into a new table, which then replaces the original one in a single transaction.
+    Rows without a valid timestamp cannot be keyed in SCHEMA_V2 and are dropped.
+
+    :param conn: sqlite database connection
+    :param chunk_size: number of rows copied per transaction
+    :return: the number of migrated rows
+    """
+    schema_version = detect_schema_version(conn)
+    if schema_version is None:
+        raise ValueError(f"No {TABLE_NAME} table to migrate")
+    if schema_version == SCHEMA_V2:
+        logger.info(f"{TABLE_NAME} is already in schema v{SCHEMA_V2}")
+        return 0
+
+    logger.info(f"Migrating {TABLE_NAME} from schema v{SCHEMA_V1} to v{SCHEMA_V2}")
+    create_table(conn, MIGRATION_TABLE_NAME, SCHEMA_V2)
+    conn.commit()
+    copied, skipped = copy_chunks(conn, chunk_size)
+    if skipped:
+        logger.warning(f"Dropped {skipped} rows without a valid timestamp")
+
+    with conn:
+        conn.execute(f"DROP TABLE {TABLE_NAME}")
+        conn.execute(f"ALTER TABLE {MIGRATION_TABLE_NAME} RENAME TO {TABLE_NAME}")
+    logger.info(f"Migrated {copied} rows to schema v{SCHEMA_V2}")
+    return copied
+
+
+def upgrade(conn: Connection, chunk_size: int = 10000) -> int:
+    """
+    Upgrade the survey database to the latest schema, its version being stored in the database user_version.
+    The version of a database created before it was stored is detected from the survey table.
+    :return: the schema version of the database
+    """
+    migrations = {SCHEMA_V2: lambda c: migrate_to_v2(c, chunk_size)}
+    return upgrade_schema(conn, migrations, current=detect_schema_version(conn))
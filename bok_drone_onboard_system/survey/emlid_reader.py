@@ -1,15 +1,17 @@
 import logging
+import platform
 import re
 import sys
 import socket
 from typing import Callable, Generator
 from datetime import datetime
 
-import pynmea2
+import numpy as np
 from serial.tools import list_ports
 from serial import Serial
 
 from bok_drone_onboard_system.survey.gps import GPSPoint, EmlidEntry, SolutionQuality
+from bok_drone_onboard_system.survey.nmea import parse_sentence, GGA
 
 logger = logging.getLogger(__name__)
 
@@ -29,19 +31,19 @@ def stream_from_emlid_llh(host: str, port: int) -> Generator[EmlidEntry, None, N
 def read_from_emlid(connection: Serial, callback: Callable):
     """
     Read NMEA2 data from EMLID device via serial connection and print lat, lon, altitude and precise time.
-    Uses RMC messages to get date information and combines it with GGA messages for complete timestamp.
-    
-    The function processes both GGA and RMC NMEA messages:
-    - GGA messages provide time, latitude, longitude, and altitude
-    - RMC messages provide date information along with time and position
-    
+    Uses RMC (or ZDA) messages to get date information and combines it with GGA messages for complete timestamp.
+
+    The function processes GGA, RMC and ZDA NMEA messages, and ignores the other ones:
+    - GGA messages provide time, latitude, longitude, and altitude, with fix quality, number of satellites and HDOP
+    - RMC and ZDA messages provide date information
+
     When an RMC message is received, its date information is stored and used to create
-    full datetime objects for subsequent GGA messages. If a GGA message is received before
-    any RMC message, it's stored temporarily and processed once date information becomes available.
+    full datetime objects for subsequent GGA messages. GGA messages received before
+    any date information, or without position, are skipped.
 
     Args:
         connection: Serial connection to the EMLID device
-        callback: Callable function to process the GPS data
+        callback: Callable function to process the GPS data, called with a GGAPoint
     """
     try:
         # Store the latest date from RMC messages
@@ -55,25 +57,20 @@ def read_from_emlid(connection: Serial, callback: Callable):
             if not line:
                 continue
 
-            # Try to parse the NMEA sentence
-            try:
-                msg = pynmea2.parse(line)
-
-                # RMC message contains date information
-                if isinstance(msg, pynmea2.RMC):
-                    latest_date = msg.datestamp
-
+            # Parse the wanted NMEA sentences only
+            parsed = parse_sentence(line)
+            if parsed is None:
+                continue
+            kind, value = parsed
 
-                # GGA message contains latitude, longitude, and altitude
-                elif isinstance(msg, pynmea2.GGA):
-                    if latest_date:
-                        # Combine date from RMC with time from GGA
-                        full_datetime = datetime.combine(latest_date, msg.timestamp)
-                        callback(GPSPoint(full_datetime, msg.latitude, msg.longitude, msg.altitude))
+            # RMC and ZDA messages contain date information
+            if kind != GGA:
+                latest_date = value or latest_date
 
-            except pynmea2.ParseError:
-                # Skip lines that can't be parsed
-                continue
+            # GGA message contains latitude, longitude, and altitude
+            elif latest_date and value:
+                # Combine date from RMC with time from GGA
+                callback(value.to_point(latest_date))
 
     except KeyboardInterrupt as e:
         print("Stopping EMLID data reading")
@@ -83,76 +80,30 @@ def read_from_emlid(connection: Serial, callback: Callable):
         raise e
 
 
-def _split_llh_line(line: str) -> list:
-    """
-    Split an LLH line into its components, handling the special case of timestamp with space.
-    
-    Args:
-        line: The LLH line to split
-        
-    Returns:
-        List of parts from the LLH line
-    """
-    # Split the line by multiple spaces
-    parts = [part for part in re.split(r'\s+', line) if part]
-
-    # Handle the special case of timestamp with space
-    if len(parts) > 14:  # If we have more parts than expected, the timestamp has a space
-        date_str = parts[0]
-        time_str = parts[1]
-        timestamp_str = f"{date_str} {time_str}"
-        # Shift the parts list to account for the split timestamp
-        parts = [timestamp_str] + parts[2:]
-
-    return parts
-
-
-def _parse_gps_point(parts: list) -> GPSPoint:
-    """
-    Parse GPS point information from LLH line parts.
-    
-    Args:
-        parts: List of parts from the LLH line
-        
-    Returns:
-        GPSPoint object with timestamp, latitude, longitude, and altitude
-    """
-    # Parse timestamp
-    timestamp = datetime.strptime(parts[0], "%Y/%m/%d %H:%M:%S.%f")
-
-    # Parse coordinates
-    latitude = float(parts[1])
-    longitude = float(parts[2])
-    height = float(parts[3])
+# numpy structured type of the records read by parse_llh_file
+LLH_DTYPE = np.dtype([
+    ('timestamp', 'datetime64[ms]'),
+    ('latitude', 'f8'), ('longitude', 'f8'), ('height', 'f8'),
+    ('q', 'u1'), ('ns', 'u1'),
+    ('sdn', 'f8'), ('sde', 'f8'), ('sdu', 'f8'),
+    ('sdne', 'f8'), ('sdeu', 'f8'), ('sdun', 'f8'),
+    ('age', 'f8'), ('ratio', 'f8'),
+])
+_SOLUTION_QUALITIES = {q.value: q for q in SolutionQuality}
+# as read by numpy.loadtxt, with the date and the time of the timestamp in two columns
+_LLH_TEXT_DTYPE = np.dtype([('date', 'U10'), ('time', 'U12')] + LLH_DTYPE.descr[1:])
 
-    return GPSPoint(timestamp, latitude, longitude, height)
 
-
-def _parse_solution_status(parts: list) -> SolutionQuality:
+def _parse_llh_timestamp(date_str: str, time_str: str) -> datetime:
     """
-    Parse solution status from LLH line parts.
-    
-    Args:
-        parts: List of parts from the LLH line
-        
-    Returns:
-        SolutionQuality enum value
+    Parse the fixed width timestamp "2025/08/24" "10:59:13.800", much faster than datetime.strptime.
     """
-    solution_status_value = int(parts[4])
-    return SolutionQuality.from_value(solution_status_value)
-
-
-def _parse_std_dev(parts: list) -> tuple:
-    """
-    Parse standard deviations from LLH line parts.
-    
-    Args:
-        parts: List of parts from the LLH line
-        
-    Returns:
-        Tuple of standard deviations (sdn, sde, sdu)
-    """
-    return (float(parts[6]), float(parts[7]), float(parts[8]))
+    fraction = time_str[9:]
+    microseconds = int(fraction.ljust(6, '0')[:6]) if fraction else 0
+    return datetime(
+        int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]),
+        int(time_str[0:2]), int(time_str[3:5]), int(time_str[6:8]), microseconds,
+    )
 
 
 def parse_llh(line: str) -> EmlidEntry:
@@ -179,16 +130,40 @@ def parse_llh(line: str) -> EmlidEntry:
     Example
     2025/08/24 10:59:13.800   43.737672206    5.462569945   307.6388   2  11   0.0680   0.1100   0.2400   0.0000   0.0000   0.0000   1.80    0.0
     """
-    parts = _split_llh_line(line)
-    gps_point = _parse_gps_point(parts)
-    solution_status = _parse_solution_status(parts)
-    std_dev = _parse_std_dev(parts)
+    parts = line.split()
+    if len(parts) != 15:
+        raise ValueError(f"Invalid LLH line, expecting 14 fields: {line}")
+
+    gps_point = GPSPoint(_parse_llh_timestamp(parts[0], parts[1]), float(parts[2]), float(parts[3]), float(parts[4]))
+    return EmlidEntry(
+        gps_point,
+        (float(parts[7]), float(parts[8]), float(parts[9])),
+        _SOLUTION_QUALITIES.get(int(parts[5])),
+        n_satellites=int(parts[6]),
+        covariance=(float(parts[10]), float(parts[11]), float(parts[12])),
+        age=float(parts[13]),
+        ratio=float(parts[14]),
+    )
+
+
+def parse_llh_file(path: str) -> np.ndarray:
+    """
+    Read a whole Emlid LLH log at once.
+    Lines starting with % (RTKLIB headers) are ignored.
 
-    return EmlidEntry(gps_point, std_dev, solution_status)
+    :param path: the LLH file
+    :return: structured array of LLH_DTYPE, one record per line
+    """
+    raw = np.loadtxt(path, dtype=_LLH_TEXT_DTYPE, comments='%', ndmin=1)
+    records = np.empty(len(raw), dtype=LLH_DTYPE)
+    iso_timestamps = np.char.add(np.char.add(np.char.replace(raw['date'], '/', '-'), 'T'), raw['time'])
+    records['timestamp'] = iso_timestamps.astype('datetime64[ms]')
+    for name in LLH_DTYPE.names[1:]:
+        records[name] = raw[name]
+    return records
 
 
 def find_emlid_device():
-    return "/dev/cu.tsreachrover"
     """
     Find the EMLID device USB file descriptor on both macOS and Raspberry Pi.
 
@@ -199,28 +174,29 @@ def find_emlid_device():
     ports = list(list_ports.comports())
 
     # EMLID devices typically appear as:
-    # - macOS: /dev/tty.usbmodem* or /dev/cu.usbmodem*
+    # - macOS: /dev/tty.usbmodem* or /dev/cu.usbmodem*, or a Bluetooth serial port named after the Reach
+    #   (e.g. /dev/cu.tsreachrover)
     # - Raspberry Pi: /dev/ttyACM* or /dev/ttyUSB*
 
     # Check if we're on macOS or Raspberry Pi
     is_macos = sys.platform == 'darwin'
-    is_raspberry_pi = sys.platform == 'linux' and 'arm' in sys.platform
+    is_raspberry_pi = sys.platform == 'linux' and platform.machine().startswith(('arm', 'aarch64'))
 
     # Define patterns to look for based on platform
     if is_macos:
-        patterns = [r'(tty|cu)\.usbmodem']
+        patterns = [r'(tty|cu)\.usbmodem', r'(tty|cu)\..*reach']
     elif is_raspberry_pi:
         patterns = [r'ttyACM', r'ttyUSB']
     else:
         # For other platforms, try both patterns
-        patterns = [r'(tty|cu)\.usbmodem', r'ttyACM', r'ttyUSB']
+        patterns = [r'(tty|cu)\.usbmodem', r'(tty|cu)\..*reach', r'ttyACM', r'ttyUSB']
 
     # Try to find EMLID device by checking device names
     emlid_ports = []
     for port in ports:
         # Check if the port matches any of our patterns
         for pattern in patterns:
-            if re.search(pattern, port.device):
+            if re.search(pattern, port.device, re.IGNORECASE):
                 # If the device has "emlid" in its description or hardware ID, it's very likely our device
                 if hasattr(port, 'description') and 'emlid' in port.description.lower():
                     return port.device
@@ -1,7 +1,14 @@
-from datetime import datetime
+import math
+from collections import deque
+from datetime import datetime, timedelta
 from enum import IntEnum
 from typing import Optional, Tuple
 
+import numpy as np
+
+# mean length of a degree of latitude, and of longitude at the equator, on the WGS84 mean radius
+METERS_PER_DEGREE = math.pi / 180 * 6371008.8
+
 
 class GPSPoint:
     def __init__(self, timestamp: datetime, latitude, longitude, altitude):
@@ -23,13 +30,10 @@ class GPSPoint:
         Returns:
             Distance in meters between the two points
         """
-        import pyproj
-
-        # Create a geodesic calculator using the WGS84 ellipsoid
-        geod = pyproj.Geod(ellps="WGS84")
+        from bok_drone_onboard_system.survey.gps.geodesic import wgs84_geod
 
-        # Calculate the forward and backward azimuths and distance
-        _, _, distance = geod.inv(
+        # Calculate the forward and backward azimuths and distance, with the cached WGS84 geodesic calculator
+        _, _, distance = wgs84_geod().inv(
             self.longitude, self.latitude,
             other.longitude, other.latitude
         )
@@ -37,33 +41,148 @@ class GPSPoint:
         return distance
 
 
-class GPSPointFifo:
-    _stack: list[GPSPoint]
+class RunningStats:
+    """
+    Mean and variance of 3D samples, updated in O(1) when a sample is added or removed (Welford's algorithm).
+    """
     n: int
+    mean: np.ndarray
+    m2: np.ndarray
 
-    def __init__(self, n: int):
-        self._stack = []
-        self.n = n
+    def __init__(self):
+        self.n = 0
+        self.mean = np.zeros(3)
+        self.m2 = np.zeros(3)
 
-    def push(self, point: GPSPoint):
-        self._stack.append(point)
-        if len(self._stack) > self.n:
-            self._stack.pop(0)
+    def add(self, x: np.ndarray):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
 
-    def __len__(self):
-        return len(self._stack)
+    def remove(self, x: np.ndarray):
+        if self.n <= 1:
+            self.__init__()
+            return
+        self.n -= 1
+        delta = x - self.mean
+        self.mean -= delta / self.n
+        self.m2 -= delta * (x - self.mean)
+        # removing samples can accumulate rounding errors below zero
+        np.maximum(self.m2, 0., out=self.m2)
 
-    def __getitem__(self, item):
-        return self._stack[item]
+    @property
+    def variance(self) -> np.ndarray:
+        """
+        population variance
+        """
+        if self.n == 0:
+            return np.full(3, np.nan)
+        return self.m2 / self.n
+
+
+def point_values(point: GPSPoint) -> np.ndarray:
+    return np.array((point.latitude, point.longitude, point.altitude), dtype=float)
+
+
+class RollingGPSStats:
+    """
+    Statistics over a rolling window of GPS points, maintained in O(1) per pushed point.
+    Subclasses define the window: a number of points or a time range.
+    """
+    _stats: RunningStats
+
+    def __init__(self):
+        self._stats = RunningStats()
+
+    def __len__(self):
+        return self._stats.n
 
     def average(self) -> GPSPoint | None:
         if len(self) == 0:
             return None
+        return GPSPoint(None, *self._stats.mean.tolist())
+
+    def std_dev(self) -> Tuple[float, float, float] | None:
+        """
+        :return: standard deviations of latitude and longitude (degrees), and altitude (meters)
+        """
+        if len(self) == 0:
+            return None
+        return tuple(np.sqrt(self._stats.variance).tolist())
+
+    def spread(self) -> float | None:
+        """
+        Horizontal spread of the points in meters, as the distance root mean square (DRMS) around their average.
+        """
+        if len(self) == 0:
+            return None
+        var_lat, var_lon, _ = self._stats.variance
+        lat_scale = METERS_PER_DEGREE
+        lon_scale = METERS_PER_DEGREE * math.cos(math.radians(self._stats.mean[0]))
+        return math.sqrt(var_lat * lat_scale ** 2 + var_lon * lon_scale ** 2)
+
 
-        avg_lat = sum(p.latitude for p in self._stack) / len(self)
-        avg_lon = sum(p.longitude for p in self._stack) / len(self)
-        avg_altitude = sum(p.altitude for p in self._stack) / len(self)
-        return GPSPoint(None, avg_lat, avg_lon, avg_altitude)
+class GPSPointFifo(RollingGPSStats):
+    """
+    The last n GPS points, in a ring buffer.
+    """
+    n: int
+
+    def __init__(self, n: int):
+        if n <= 0:
+            raise ValueError("size must be positive")
+        super().__init__()
+        self.n = n
+        self._points = [None] * n
+        self._values = np.empty((n, 3))
+        self._start = 0
+
+    def push(self, point: GPSPoint):
+        values = point_values(point)
+        if len(self) == self.n:
+            self._stats.remove(self._values[self._start])
+            self._start = (self._start + 1) % self.n
+        index = (self._start + len(self)) % self.n
+        self._points[index] = point
+        self._values[index] = values
+        self._stats.add(values)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("GPSPointFifo index out of range")
+        return self._points[(self._start + item) % self.n]
+
+
+class GPSPointTimeWindow(RollingGPSStats):
+    """
+    The GPS points of the last `seconds`, relative to the timestamp of the latest pushed point.
+    Points are expected to be pushed in chronological order.
+    """
+    seconds: float
+
+    def __init__(self, seconds: float):
+        super().__init__()
+        self.seconds = seconds
+        self._window = timedelta(seconds=seconds)
+        self._points = deque()
+
+    def push(self, point: GPSPoint):
+        values = point_values(point)
+        self._points.append((point, values))
+        self._stats.add(values)
+        while point.timestamp - self._points[0][0].timestamp > self._window:
+            _, old_values = self._points.popleft()
+            self._stats.remove(old_values)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [p for p, _ in list(self._points)[item]]
+        return self._points[item][0]
 
 
 class SolutionQuality(IntEnum):
@@ -98,15 +217,94 @@ class SolutionQuality(IntEnum):
             return None
 
 
+class GGAQuality(IntEnum):
+    """
+    GPS fix quality indicator of NMEA GGA sentences.
+    """
+    INVALID = 0
+    GPS = 1
+    DGPS = 2
+    PPS = 3
+    RTK_FIXED = 4
+    RTK_FLOAT = 5
+    ESTIMATED = 6
+    MANUAL = 7
+    SIMULATION = 8
+
+    @property
+    def label(self) -> str:
+        return {
+            GGAQuality.INVALID: "No fix",
+            GGAQuality.GPS: "SINGLE",
+            GGAQuality.DGPS: "DGPS",
+            GGAQuality.PPS: "PPS",
+            GGAQuality.RTK_FIXED: "FIX",
+            GGAQuality.RTK_FLOAT: "FLOAT",
+            GGAQuality.ESTIMATED: "ESTIMATED",
+            GGAQuality.MANUAL: "MANUAL",
+            GGAQuality.SIMULATION: "SIMULATION",
+        }[self]
+
+    def __repr__(self):
+        return self.label
+
+    @classmethod
+    def from_value(cls, value: int) -> Optional["GGAQuality"]:
+        try:
+            return cls(value)
+        except ValueError:
+            return None
+
+
+class GGAPoint(GPSPoint):
+    """
+    GPS point read from a GGA sentence, with the fix quality information.
+    """
+    quality: GGAQuality | None
+    n_satellites: int | None
+    hdop: float | None
+
+    def __init__(self, timestamp: datetime, latitude, longitude, altitude,
+                 quality: GGAQuality | None = None, n_satellites: int | None = None, hdop: float | None = None):
+        super().__init__(timestamp, latitude, longitude, altitude)
+        self.quality = quality
+        self.n_satellites = n_satellites
+        self.hdop = hdop
+
+
 class EmlidEntry:
     gps_point: GPSPoint
     std_dev: Tuple[float, float, float]
     solution_status: SolutionQuality
+    n_satellites: int | None
+    covariance: Tuple[float, float, float] | None
+    age: float | None
+    ratio: float | None
 
-    def __init__(self, gps_point: GPSPoint, std_dev: Tuple[float, float, float], solution_status: SolutionQuality):
+    def __init__(
+            self,
+            gps_point: GPSPoint,
+            std_dev: Tuple[float, float, float],
+            solution_status: SolutionQuality,
+            n_satellites: int | None = None,
+            covariance: Tuple[float, float, float] | None = None,
+            age: float | None = None,
+            ratio: float | None = None,
+    ):
+        """
+        :param std_dev: standard deviations of latitude, longitude and height (sdn, sde, sdu), in meters
+        :param n_satellites: number of satellites used in the solution
+        :param covariance: covariance terms (sdne, sdeu, sdun), in square meters
+        :param age: age of differential, in seconds
+        :param ratio: ambiguity resolution ratio factor
+        """
         self.gps_point = gps_point
         self.std_dev = std_dev
         self.solution_status = solution_status
+        self.n_satellites = n_satellites
+        self.covariance = covariance
+        self.age = age
+        self.ratio = ratio
 
     def error_horizontal(self) -> float:
         return (self.std_dev[0] + self.std_dev[1]) / 2
@@ -0,0 +1,59 @@
+"""
+Geodesic distances on the WGS84 ellipsoid.
+
+Positions are arrays of shape (N,2) or more, with latitude and longitude as first columns (as in SurveyArrays),
+and all distances are computed by vectorized calls to the cached pyproj.Geod.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pyproj
+
+
+@lru_cache(maxsize=None)
+def wgs84_geod() -> pyproj.Geod:
+    return pyproj.Geod(ellps="WGS84")
+
+
+def _lat_lon(positions) -> tuple[np.ndarray, np.ndarray]:
+    positions = np.asarray(positions, dtype=float).reshape(-1, np.shape(positions)[-1])
+    return positions[:, 0], positions[:, 1]
+
+
+def pairwise_distances(positions_a, positions_b) -> np.ndarray:
+    """
+    :return: (N,) distances in meters between positions_a[i] and positions_b[i]
+    """
+    lat_a, lon_a = _lat_lon(positions_a)
+    lat_b, lon_b = _lat_lon(positions_b)
+    if len(lat_a) != len(lat_b):
+        raise ValueError(f"Cannot pair {len(lat_a)} positions with {len(lat_b)}")
+    _, _, distances = wgs84_geod().inv(lon_a, lat_a, lon_b, lat_b)
+    return np.asarray(distances)
+
+
+def distances_from(latitude: float, longitude: float, positions) -> np.ndarray:
+    """
+    :return: (N,) distances in meters from one point to each of the positions
+    """
+    lat, lon = _lat_lon(positions)
+    _, _, distances = wgs84_geod().inv(np.full_like(lon, longitude), np.full_like(lat, latitude), lon, lat)
+    return np.asarray(distances)
+
+
+def segment_distances(positions) -> np.ndarray:
+    """
+    :return: (N-1,) distances in meters between consecutive positions along a track
+    """
+    lat, lon = _lat_lon(positions)
+    if len(lat) < 2:
+        return np.empty(0)
+    _, _, distances = wgs84_geod().inv(lon[:-1], lat[:-1], lon[1:], lat[1:])
+    return np.asarray(distances)
+
+
+def track_length(positions) -> float:
+    """
+    :return: the length of a track in meters
+    """
+    return float(np.sum(segment_distances(positions)))
@@ -0,0 +1,348 @@
+"""
+asyncio ingestion engine for survey-acquire.
+
+The serial NMEA reader, the Emlid LLH TCP stream and the BNO08x polling run as concurrent tasks on one event loop:
+    * blocking reads (serial port, BNO08x over I2C) run in worker threads, so no source stalls the others
+    * each source timestamps its own data: GPS time for GGA and LLH solutions, host clock for BNO08x reports
+    * rows are handed to BatchWriter, whose `put` never blocks, and are committed from the writer threads
+
+A failing device read is handled by its DeviceSupervisor: transient errors (e.g. an I2C NACK) are retried within
+microseconds, lost devices (e.g. the serial port unplugged) are reopened, while the other sources keep on running.
+The LLH stream is reopened after `retry_delay`. Each interruption of a source is stored in acquisition_gaps.
+"""
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Callable
+
+from serial import Serial
+
+from bok_drone_onboard_system.analysis.alignment import OrientationBuffer, to_epoch_ns, NS_PER_SECOND
+from bok_drone_onboard_system.bno.data import reports
+from bok_drone_onboard_system.metrics import Registry, stage_timer, count_error, instrument_source, \
+    instrument_writer, instrument_scheduler, instrument_supervisor
+from bok_drone_onboard_system.scheduler import FixedRateScheduler
+from bok_drone_onboard_system.storage import BatchWriter, gaps
+from bok_drone_onboard_system.storage.sqlite import open_connection, Checkpointer
+from bok_drone_onboard_system.supervisor import DeviceSupervisor, RetryPolicy, Gap, Stopped, DEVICE_LOST
+from bok_drone_onboard_system.survey.data import llh, create_table_if_not_exists, detect_schema_version, \
+    insert_statement, timestamp_param, SCHEMA_V2
+from bok_drone_onboard_system.survey.emlid_reader import parse_llh
+from bok_drone_onboard_system.survey.gps import GPSPoint
+from bok_drone_onboard_system.survey.nmea import parse_sentence, GGA
+
+logger = logging.getLogger(__name__)
+
+NO_QUATERNION = (None, None, None, None)
+
+
+class SourceStats:
+    """
+    Counters of an ingestion source, only updated from its task (or the worker thread it awaits).
+    """
+    received: int
+    errors: int
+    reconnections: int
+
+    def __init__(self):
+        self.received = 0
+        self.errors = 0
+        self.reconnections = 0
+
+    def __repr__(self):
+        return f"received={self.received} errors={self.errors} reconnections={self.reconnections}"
+
+
+class IngestEngine:
+    """
+    Acquire GGA positions, LLH solutions and BNO08x reports concurrently, and store them in sqlite.
+
+    Tables:
+        * survey_records: one row per GGA, with the BNO08x quaternion interpolated at the GGA epoch
+          (see analysis.alignment). If the BNO08x samples do not surround the epoch, the latest quaternion is used,
+          or NULL values if none was read in the last `max_quaternion_age` seconds.
+        * bno_reports: all the BNO08x reports, sampled every `bno_period` seconds
+        * llh_records: the LLH solutions, if `llh_address` is given
+        * acquisition_gaps: the intervals without data of each source, while it was failing
+
+    :param sqlite_filename: path to the sqlite database file
+    :param open_bno: open the BNO08x, e.g. `load_bno`
+    :param bno_period: time between two BNO08x reads, in seconds
+    :param open_serial: open the serial connection to the Emlid NMEA output. If None, GGA are not read.
+    :param llh_address: (host, port) of the Emlid LLH stream. If None, LLH solutions are not read.
+    :param max_quaternion_age: maximum age, in seconds, of the quaternion stored with a GGA position
+    :param latency_offset: seconds added to the GGA epochs to get the BNO08x timestamps
+    :param lookback: time span of the BNO08x samples kept for interpolation, in seconds
+    :param retry_delay: delay before reopening the LLH stream, and maximum delay before reopening a device, in seconds
+    :param retry_policy: the recovery of the BNO08x and serial reads. Default is RetryPolicy with `retry_delay`.
+    :param checkpoint_interval: seconds between two WAL checkpoints, run by a Checkpointer instead of the commits
+        of the writers. 0 leaves the checkpoints to the commits. Ignored without WAL journal.
+    :param writer_options: BatchWriter keyword arguments (batch_size, flush_interval...)
+    :param report_interval: delay between two stats logs, in seconds
+    :param registry: the metrics registry of the sources and writers. Default is a new one, see `registry`.
+    """
+
+    def __init__(
+            self,
+            sqlite_filename: str,
+            open_bno: Callable[[], object],
+            bno_period: float,
+            open_serial: Callable[[], Serial] | None = None,
+            llh_address: tuple[str, int] | None = None,
+            max_quaternion_age: float = 0.5,
+            latency_offset: float = 0.,
+            lookback: float = 2.,
+            retry_delay: float = 3.,
+            writer_options: dict | None = None,
+            report_interval: float = 60.,
+            registry: Registry | None = None,
+            retry_policy: RetryPolicy | None = None,
+            checkpoint_interval: float = 30.,
+    ):
+        self.sqlite_filename = sqlite_filename
+        self.open_bno = open_bno
+        self.bno_period = bno_period
+        self.open_serial = open_serial
+        self.llh_address = llh_address
+        self.max_quaternion_age = max_quaternion_age
+        self.latency_offset = latency_offset
+        self.retry_delay = retry_delay
+        self.retry_policy = retry_policy or RetryPolicy(max_reopen_delay=retry_delay)
+        self.writer_options = writer_options or {}
+        self.wal = self.writer_options.get("wal", True)
+        self.checkpoint_interval = checkpoint_interval if self.wal else 0.
+        if self.checkpoint_interval > 0:
+            self.writer_options = {"wal_autocheckpoint": 0, **self.writer_options}
+        self.report_interval = report_interval
+        self.stats = {"bno": SourceStats(), "gga": SourceStats(), "llh": SourceStats()}
+        self.registry = registry or Registry()
+        self.schema_version = SCHEMA_V2
+        self._latest_quaternion = NO_QUATERNION
+        self._latest_quaternion_at = None
+        self._orientations = OrientationBuffer(lookback, max_gap=max_quaternion_age)
+        self._writers: dict[str, BatchWriter] = {}
+        self._gaps_writer = None
+        self._supervisors: dict[str, DeviceSupervisor] = {}
+        self._stopping = asyncio.Event()
+
+    def create_tables(self):
+        conn = open_connection(self.sqlite_filename, wal=self.wal)
+        try:
+            create_table_if_not_exists(conn)
+            self.schema_version = detect_schema_version(conn)
+            if self.schema_version != SCHEMA_V2:
+                logger.warning(f"{self.sqlite_filename} uses the legacy text timestamp schema. "
+                               f"Convert it with survey-migrate.")
+            reports.create_table_if_not_exists(conn)
+            gaps.create_table_if_not_exists(conn)
+            if self.llh_address:
+                llh.create_table_if_not_exists(conn)
+        finally:
+            conn.close()
+
+    def stop(self):
+        """
+        Stop the engine. To be called from the event loop.
+        """
+        self._stopping.set()
+
+    async def run(self):
+        """
+        Run the sources until `stop` is called or the task is cancelled. Pending rows are written before returning.
+        """
+        self.create_tables()
+        self._writers = {"bno": BatchWriter(self.sqlite_filename, reports.INSERT_STMT, **self.writer_options)}
+        sources = [self._bno_task(), self._report_task()]
+        if self.open_serial:
+            self._writers["gga"] = BatchWriter(
+                self.sqlite_filename, insert_statement(self.schema_version, or_ignore=True), **self.writer_options
+            )
+            sources.append(self._gga_task())
+        if self.llh_address:
+            self._writers["llh"] = BatchWriter(self.sqlite_filename, llh.INSERT_STMT, **self.writer_options)
+            sources.append(self._llh_task())
+        self._gaps_writer = BatchWriter(self.sqlite_filename, gaps.INSERT_STMT, **self.writer_options)
+        self._instrument()
+
+        with contextlib.ExitStack() as stack:
+            # stopped last, with a final checkpoint of the rows flushed by the writers
+            if self.checkpoint_interval > 0:
+                stack.enter_context(Checkpointer(self.sqlite_filename, self.checkpoint_interval))
+            for writer in [*self._writers.values(), self._gaps_writer]:
+                stack.enter_context(writer)
+            tasks = [asyncio.create_task(source) for source in sources]
+            try:
+                await self._stopping.wait()
+            finally:
+                # interrupt the reopening delays of the worker threads
+                for supervisor in self._supervisors.values():
+                    supervisor.stop()
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                self._log_stats()
+
+    def _instrument(self):
+        for name, writer in self._writers.items():
+            instrument_source(self.registry, name, self.stats[name])
+            instrument_writer(self.registry, name, writer)
+
+    def _fresh_quaternion(self) -> tuple:
+        at = self._latest_quaternion_at
+        if at is None or time.monotonic() - at > self.max_quaternion_age:
+            return NO_QUATERNION
+        return self._latest_quaternion
+
+    def _orientation_at(self, gps_point: GPSPoint) -> tuple:
+        timestamp_ns = to_epoch_ns(gps_point.timestamp) + round(self.latency_offset * NS_PER_SECOND)
+        quaternion = self._orientations.at(timestamp_ns)
+        return quaternion if quaternion is not None else self._fresh_quaternion()
+
+    def _survey_row(self, gps_point: GPSPoint) -> tuple:
+        return (
+            timestamp_param(gps_point.timestamp, self.schema_version),
+            *self._orientation_at(gps_point),
+            gps_point.latitude, gps_point.longitude, gps_point.altitude,
+        )
+
+    def _count_error(self, name: str, e: Exception):
+        self.stats[name].errors += 1
+        count_error(self.registry, name, e)
+
+    def _record_gap(self, gap: Gap):
+        self._gaps_writer.put(gaps.gap_row(gap))
+
+    def _supervisor(self, name: str, open_device: Callable[[], object],
+                    on_reconnect: Callable[[], None] | None = None) -> DeviceSupervisor:
+        stats = self.stats[name]
+
+        def reconnected():
+            stats.reconnections += 1
+            if on_reconnect is not None:
+                on_reconnect()
+
+        supervisor = DeviceSupervisor(
+            name, open_device, self.retry_policy,
+            on_error=lambda e: self._count_error(name, e),
+            on_reconnect=reconnected,
+            on_gap=self._record_gap,
+        )
+        instrument_supervisor(self.registry, name, supervisor)
+        self._supervisors[name] = supervisor
+        return supervisor
+
+    async def _source_failed(self, name: str, e: Exception):
+        self._count_error(name, e)
+        logger.error(f"{name} source error: {e}. Retrying in {self.retry_delay}s")
+        await asyncio.sleep(self.retry_delay)
+        self.stats[name].reconnections += 1
+
+    async def _bno_task(self):
+        stats = self.stats["bno"]
+        writer = self._writers["bno"]
+        scheduler = FixedRateScheduler(self.bno_period)
+        instrument_scheduler(self.registry, "bno", scheduler)
+        read_timer = stage_timer(self.registry, "bno", "read")
+        supervisor = self._supervisor("bno", self.open_bno, on_reconnect=scheduler.reset)
+        while True:
+            await scheduler.wait_async()
+            t0 = time.perf_counter_ns()
+            try:
+                values = await asyncio.to_thread(supervisor.read, reports.read_reports)
+            except Stopped:
+                return
+            read_timer.observe_since(t0)
+            timestamp_us = reports.now_us()
+            stats.received += 1
+            self._latest_quaternion = values[-4:]
+            self._latest_quaternion_at = time.monotonic()
+            self._orientations.push(timestamp_us * 1000, self._latest_quaternion)
+            writer.put(reports.report_row(values, timestamp_us))
+
+    async def _gga_task(self):
+        stats = self.stats["gga"]
+        writer = self._writers["gga"]
+        parse_timer = stage_timer(self.registry, "gga", "parse")
+        supervisor = self._supervisor("gga", self.open_serial)
+        latest_date = None
+        try:
+            while True:
+                try:
+                    raw = await asyncio.to_thread(supervisor.read, _readline)
+                except Stopped:
+                    return
+
+                t0 = time.perf_counter_ns()
+                line = raw.decode('ascii', errors='replace').strip()
+                parsed = parse_sentence(line) if line else None
+                parse_timer.observe_since(t0)
+                if parsed is None:
+                    continue
+                kind, value = parsed
+                if kind != GGA:
+                    latest_date = value or latest_date
+                elif latest_date and value:
+                    stats.received += 1
+                    writer.put(self._survey_row(value.to_point(latest_date)))
+        finally:
+            supervisor.close()
+
+    async def _llh_task(self):
+        stats = self.stats["llh"]
+        writer = self._writers["llh"]
+        parse_timer = stage_timer(self.registry, "llh", "parse")
+        host, port = self.llh_address
+        # the current gap: its start (the last received solution), its number of failures and the last error
+        last_received_at = None
+        gap_start, failures, error = None, 0, None
+        while True:
+            try:
+                reader, stream = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=3)
+            except (OSError, asyncio.TimeoutError) as e:
+                gap_start, failures, error = gap_start or last_received_at or time.time(), failures + 1, e
+                await self._source_failed("llh", e)
+                continue
+            try:
+                while raw := await reader.readline():
+                    line = raw.decode('ascii', errors='replace').strip()
+                    if not line or line.startswith('%'):
+                        continue
+                    t0 = time.perf_counter_ns()
+                    try:
+                        entry = parse_llh(line)
+                    except ValueError as e:
+                        stats.errors += 1
+                        count_error(self.registry, "llh", e)
+                        logger.debug(e)
+                        continue
+                    finally:
+                        parse_timer.observe_since(t0)
+                    stats.received += 1
+                    writer.put(llh.llh_row(entry))
+                    last_received_at = time.time()
+                    if failures:
+                        self._record_gap(Gap("llh", gap_start, last_received_at, failures, DEVICE_LOST, str(error)))
+                        gap_start, failures = None, 0
+                error = ConnectionError(f"LLH stream {host}:{port} closed")
+            except OSError as e:
+                error = e
+            finally:
+                stream.close()
+            gap_start, failures = gap_start or last_received_at or time.time(), failures + 1
+            await self._source_failed("llh", error)
+
+    async def _report_task(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self._log_stats()
+
+    def _log_stats(self):
+        for name, writer in self._writers.items():
+            supervisor = self._supervisors.get(name)
+            device = f" device({supervisor.stats})" if supervisor is not None else ""
+            logger.info(f"{name}: {self.stats[name]} writer({writer.stats}){device}")
+
+
+def _readline(connection: Serial) -> bytes:
+    return connection.readline()
@@ -0,0 +1,189 @@
+"""
+Fast path NMEA parser for the sentences used by read_from_emlid.
+
+Unwanted sentence types (GSV, GSA, VTG...) are rejected on their prefix, before any other work.
+GGA, RMC and ZDA sentences are checksum validated and only the needed fields are converted.
+pynmea2 is only used as a fallback, for wanted sentences the fast path cannot handle.
+"""
+import functools
+import logging
+import operator
+from datetime import date, datetime, time, timezone
+
+import pynmea2
+
+from bok_drone_onboard_system.survey.gps import GGAPoint, GGAQuality
+
+logger = logging.getLogger(__name__)
+
+GGA = "GGA"
+RMC = "RMC"
+ZDA = "ZDA"
+WANTED_SENTENCES = frozenset((GGA, RMC, ZDA))
+
+_GGA_QUALITIES = {q.value: q for q in GGAQuality}
+_UTC = timezone.utc
+
+
+class GGAFix:
+    """
+    Content of a GGA sentence. The date is not part of it, see RMC and ZDA sentences.
+    """
+    time: time
+    latitude: float
+    longitude: float
+    altitude: float | None
+    quality: GGAQuality | None
+    n_satellites: int | None
+    hdop: float | None
+
+    def __init__(self, time_of_day: time, latitude: float, longitude: float, altitude: float | None,
+                 quality: GGAQuality | None, n_satellites: int | None, hdop: float | None):
+        self.time = time_of_day
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        self.quality = quality
+        self.n_satellites = n_satellites
+        self.hdop = hdop
+
+    def to_point(self, day: date) -> GGAPoint:
+        return GGAPoint(datetime.combine(day, self.time), self.latitude, self.longitude, self.altitude,
+                        self.quality, self.n_satellites, self.hdop)
+
+
+def sentence_type(line: str) -> str:
+    """
+    "$GPGGA,..." -> "GGA", whatever the talker
+    """
+    return line[3:6]
+
+
+def checksum_ok(line: str) -> bool:
+    """
+    The checksum is optional in NMEA: sentences without one are accepted.
+    """
+    star = line.rfind('*')
+    if star < 0:
+        return True
+    try:
+        return _xor_bytes(line[1:star].encode()) == int(line[star + 1:star + 3], 16)
+    except ValueError:
+        return False
+
+
+def with_checksum(body: str) -> str:
+    """
+    "GPGGA,..." -> "$GPGGA,...*hh"
+    """
+    return f"${body}*{_xor_bytes(body.encode('ascii')):02X}"
+
+
+def _xor_bytes(data: bytes) -> int:
+    return functools.reduce(operator.xor, data, 0)
+
+
+def _fields(line: str) -> list[str]:
+    star = line.rfind('*')
+    return line[1:star if star >= 0 else len(line)].split(',')
+
+
+def _parse_time(s: str) -> time:
+    """
+    "hhmmss[.ss]" to an UTC time
+    """
+    hhmmss = int(s[:6])
+    microseconds = round(float(s[6:]) * 1e6) if len(s) > 7 else 0
+    return time(hhmmss // 10000, hhmmss // 100 % 100, hhmmss % 100, microseconds, _UTC)
+
+
+def _parse_coordinate(dm: str, hemisphere: str) -> float:
+    """
+    "dddmm.mmmm" and hemisphere to signed decimal degrees
+    """
+    dot = dm.find('.')
+    if dot < 0:
+        dot = len(dm)
+    value = float(dm[:dot - 2]) + float(dm[dot - 2:]) / 60
+    return -value if hemisphere in ('S', 'W') else value
+
+
+def _parse_year(yy: str) -> int:
+    """
+    Two digits years, with the strptime %y convention: 69-99 are 1969-1999, 00-68 are 2000-2068
+    """
+    year = int(yy)
+    return year + (1900 if year >= 69 else 2000)
+
+
+def parse_gga(fields: list[str]) -> GGAFix | None:
+    """
+    :return: None when the GGA has no position
+    """
+    if not fields[2] or not fields[4]:
+        return None
+    return GGAFix(
+        _parse_time(fields[1]),
+        _parse_coordinate(fields[2], fields[3]),
+        _parse_coordinate(fields[4], fields[5]),
+        float(fields[9]) if fields[9] else None,
+        _GGA_QUALITIES.get(int(fields[6])) if fields[6] else None,
+        int(fields[7]) if fields[7] else None,
+        float(fields[8]) if fields[8] else None,
+    )
+
+
+def parse_rmc(fields: list[str]) -> date | None:
+    d = fields[9]
+    if not d:
+        return None
+    return date(_parse_year(d[4:6]), int(d[2:4]), int(d[0:2]))
+
+
+def parse_zda(fields: list[str]) -> date | None:
+    if not fields[2] or not fields[3] or not fields[4]:
+        return None
+    return date(int(fields[4]), int(fields[3]), int(fields[2]))
+
+
+_PARSERS = {GGA: parse_gga, RMC: parse_rmc, ZDA: parse_zda}
+
+
+def _parse_with_pynmea2(line: str):
+    msg = pynmea2.parse(line)
+    if isinstance(msg, pynmea2.GGA):
+        if not msg.lat:
+            return None
+        quality = _GGA_QUALITIES.get(int(msg.gps_qual)) if msg.gps_qual not in (None, '') else None
+        n_satellites = int(msg.num_sats) if msg.num_sats else None
+        hdop = float(msg.horizontal_dil) if msg.horizontal_dil else None
+        return GGAFix(msg.timestamp, msg.latitude, msg.longitude, msg.altitude, quality, n_satellites, hdop)
+    if isinstance(msg, (pynmea2.RMC, pynmea2.ZDA)):
+        return msg.datestamp
+    return None
+
+
+def parse_sentence(line: str) -> tuple[str, GGAFix | date | None] | None:
+    """
+    Parse a GGA, RMC or ZDA NMEA sentence.
+
+    :param line: the NMEA sentence, e.g. "$GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*47"
+    :return: None for other sentences and invalid ones. Otherwise, the sentence type and
+        * for GGA: a GGAFix, or None if there is no position
+        * for RMC and ZDA: the date, or None if unknown
+    """
+    kind = sentence_type(line)
+    if kind not in WANTED_SENTENCES or not line.startswith('$'):
+        return None
+    if not checksum_ok(line):
+        logger.debug(f"Invalid checksum: {line}")
+        return None
+    try:
+        return kind, _PARSERS[kind](_fields(line))
+    except (ValueError, IndexError):
+        pass
+    try:
+        return kind, _parse_with_pynmea2(line)
+    except (pynmea2.ParseError, ValueError, AttributeError, TypeError):
+        logger.debug(f"Cannot parse: {line}")
+        return None
@@ -1,17 +1,29 @@
 import argparse
+import asyncio
 import logging
-import time
 
 from serial import Serial
 
 from bok_drone_onboard_system.bno import load_bno
-from bok_drone_onboard_system.survey.data import db_conn, create_table_if_not_exists, append_measure
-from bok_drone_onboard_system.survey.emlid_reader import find_emlid_device, read_from_emlid
-from bok_drone_onboard_system.survey.gps import GPSPoint
+from bok_drone_onboard_system.metrics import Registry, serve_metrics
+from bok_drone_onboard_system.replay import ReplayBNO08X, ReplayClock
+from bok_drone_onboard_system.supervisor import RetryPolicy
+from bok_drone_onboard_system.survey.emlid_reader import find_emlid_device
+from bok_drone_onboard_system.survey.ingest import IngestEngine
 
 logger = logging.getLogger(__name__)
 
 
+def open_emlid_serial(device: str | None = None) -> Serial:
+    """
+    :param device: the serial device. If None, the Emlid one is looked for.
+    """
+    emlid_device = device or find_emlid_device()
+    if not emlid_device:
+        raise OSError("EMLID device not found")
+    return Serial(emlid_device, 115200, timeout=1)
+
+
 def main():
     logging.basicConfig(level=logging.INFO)
     parser = argparse.ArgumentParser(description="acquire data from survey with emlid + BNO08x and store in sqllite DB.")
@@ -26,6 +38,90 @@ def main():
         action="store_true",
         help="Do not read on BNO08x, but generate random data. "
     )
+    parser.add_argument(
+        "--replay-bno",
+        type=str,
+        help="Do not read on BNO08x, but replay the bno_reports (or bno_data) of this sqlite database."
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=1.,
+        help="Speed factor of --replay-bno. 0 replays one report per read, as fast as possible. "
+             "Default is 1."
+    )
+    parser.add_argument(
+        "--serial-port",
+        type=str,
+        help="the Emlid serial device (e.g. the pseudo terminal of survey-replay). Default is to look for it."
+    )
+    parser.add_argument(
+        "--bno-rate",
+        type=float,
+        default=50.,
+        help="BNO08x reports sampling rate in Hz, independent of the GPS rate. Default is 50."
+    )
+    parser.add_argument(
+        "--latency-offset",
+        type=float,
+        default=0.,
+        help="Seconds added to the GPS epochs to interpolate the BNO08x orientation. Default is 0."
+    )
+    parser.add_argument(
+        "--llh-host",
+        type=str,
+        help="the emlid rover LLH stream host. If given, the LLH solutions are stored in llh_records."
+    )
+    parser.add_argument(
+        "--llh-port",
+        type=int,
+        default=9001,
+        help="the emlid rover LLH stream port. Default is 9001"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Maximum number of rows written in one transaction. Default is 100."
+    )
+    parser.add_argument(
+        "--flush-interval",
+        type=float,
+        default=0.5,
+        help="Maximum delay in seconds before a row is committed. Default is 0.5."
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=30.,
+        help="Seconds between two WAL checkpoints, run in the background rather than by the commits. "
+             "0 leaves them to the commits. Default is 30."
+    )
+    parser.add_argument(
+        "--read-retries",
+        type=int,
+        default=5,
+        help="Number of retries of a failed BNO08x or serial read, with a sub-millisecond backoff, "
+             "before reopening the device. Default is 5."
+    )
+    parser.add_argument(
+        "--max-reopen-delay",
+        type=float,
+        default=3.,
+        help="Maximum delay in seconds between two attempts to reopen a lost device or stream. Default is 3."
+    )
+    parser.add_argument(
+        "--metrics-address",
+        type=str,
+        help="serve the metrics in the Prometheus text format on /metrics, at host:port (e.g. 127.0.0.1:9100) "
+             "or on a unix socket path"
+    )
+    parser.add_argument(
+        "--status-interval",
+        type=float,
+        default=60.,
+        help="Seconds between two JSON status lines of the metrics in the log, 0 to disable. Default is 60."
+    )
     parser.add_argument(
         "--log-level",
         type=str,
@@ -34,35 +130,32 @@ def main():
     )
     args = parser.parse_args()
 
-    db_connection = db_conn(args.db)
-    create_table_if_not_exists(db_connection)
-    emlid_device = find_emlid_device()
-    emlid_ser = Serial(emlid_device, 115200, timeout=1)
-
-    def angle_and_save(gps_point: GPSPoint):
-        quat = bno.quaternion
-        append_measure(quat, gps_point, db_connection)
+    if args.replay_bno:
+        def open_bno():
+            return ReplayBNO08X.from_db(args.replay_bno, clock=ReplayClock(args.replay_speed))
+    else:
+        def open_bno():
+            return load_bno(args.mock)
 
-    bno = None
-    i = 0
-    while True:
-        try:
-            if not bno:
-                bno = load_bno(args.mock)
-                db_connection.close()
-                db_connection = db_conn(args.db)
-            if not emlid_device:
-                emlid_device = find_emlid_device()
-                emlid_ser = Serial(emlid_device, 115200, timeout=1)
-
-            read_from_emlid(emlid_ser, angle_and_save)
-        except Exception as e:
-            logger.error(f"Error: {e}")
-            time.sleep(3)
-            bno = None
-            if emlid_device and emlid_ser.is_open:
-                emlid_ser.close()
-                emlid_device = None
+    registry = Registry()
+    engine = IngestEngine(
+        args.db,
+        open_bno=open_bno,
+        bno_period=1 / args.bno_rate,
+        open_serial=lambda: open_emlid_serial(args.serial_port),
+        llh_address=(args.llh_host, args.llh_port) if args.llh_host else None,
+        latency_offset=args.latency_offset,
+        writer_options={"batch_size": args.batch_size, "flush_interval": args.flush_interval},
+        registry=registry,
+        retry_delay=args.max_reopen_delay,
+        retry_policy=RetryPolicy(read_retries=args.read_retries, max_reopen_delay=args.max_reopen_delay),
+        checkpoint_interval=args.checkpoint_interval,
+    )
+    try:
+        with serve_metrics(registry, args.metrics_address, args.status_interval):
+            asyncio.run(engine.run())
+    except KeyboardInterrupt:
+        logger.info("Stopping acquisition")
 
 
 if __name__ == "__main__":
@@ -1,17 +1,39 @@
 import argparse
 import logging
+import sys
 from datetime import datetime
-from typing import Tuple
+from typing import Tuple, Iterable, Generator, TextIO
 
+import numpy as np
 from matplotlib.collections import LineCollection
 
-from bok_drone_onboard_system.analysis.gps import wgs84_to_utm34n
-from bok_drone_onboard_system.positioner.projector import calculate_pole_end_position
+from bok_drone_onboard_system.analysis.alignment import align_survey
+from bok_drone_onboard_system.analysis.clock_offset import ClockOffset
+from bok_drone_onboard_system.analysis.gps import wgs84_to_utm34n, wgs84_to_utm_array, utm_epsg, utm_epsg_for
+from bok_drone_onboard_system.positioner.calibration import PoleCalibration
+from bok_drone_onboard_system.positioner.projector import calculate_pole_end_position, calculate_pole_end_positions
 from bok_drone_onboard_system.survey import SurveyMeasure
-from bok_drone_onboard_system.survey.data import db_conn, load_data
+from bok_drone_onboard_system.bno.data import reports
+from bok_drone_onboard_system.survey.data import db_conn, load_arrays, iter_arrays, median_position, SurveyArrays
+from bok_drone_onboard_system.survey.data.archive import archive_path, iter_survey_archive, \
+    iter_reports_archive_around, load_archive_metadata, median_position_archive
+from bok_drone_onboard_system.survey.data.metadata import get_metadata, CLOCK_OFFSET_KEY, POLE_AXIS_KEY
 
 logger = logging.getLogger(__name__)
 
+MIN_CLOCK_OFFSET_CONFIDENCE = 0.3
+
+OUTPUT_COLUMNS = ("timestamp", "tutm_x", "utm_y", "utm_z", "proj_x", "proj_y", "proj_z")
+OUTPUT_DELIMITERS = {"tsv": "\t", "csv": ","}
+# number of survey records read, projected and written at once by the streaming output
+CHUNK_SIZE = 10000
+# plot: up to this number of measures, points are drawn as dots, above as pixels
+PLOT_MARKER_POINTS = 2000
+# plot: above this number of measures, points are drawn as density maps and the segments are decimated
+PLOT_MAX_POINTS = 50000
+# plot: number of cells of the density maps along each axis
+PLOT_DENSITY_BINS = 500
+
 
 def parse_timestamp(timestamp_str):
     return datetime.fromisoformat(timestamp_str)
@@ -38,7 +60,169 @@ def project_measure(survey_measures: list[SurveyMeasure], pole_length) -> list[T
     return ret
 
 
-def plot_projected_measures(projected_measures: list[Tuple[datetime, Tuple[float, float, float], Tuple[float, float, float]]], png_file: str):
+def project_arrays(
+        survey_arrays: SurveyArrays, pole_length: float, epsg: int | None = None, v_nat=None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Batch version of project_measure, on defined survey measures.
+    :param epsg: EPSG code of the UTM zone. If None, picked from the data.
+    :param v_nat: direction of the pole in the BNO08x frame. If None, (1, 0, 0).
+    :return: (N,3) arrays of the GPS positions and of the pole end positions, in UTM coordinates
+    """
+    if len(survey_arrays) == 0:
+        return np.empty((0, 3)), np.empty((0, 3))
+    utm_coords = wgs84_to_utm_array(survey_arrays.positions, epsg)
+    projections = calculate_pole_end_positions(survey_arrays.quaternions, utm_coords, pole_length, v_nat)
+    return utm_coords, projections
+
+
+def load_aligned_arrays(
+        conn, start: datetime | None, end: datetime | None, latency_offset: float = 0., margin: float = 1.
+) -> SurveyArrays:
+    """
+    Load the survey measures, with the orientation interpolated from the BNO08x reports at the GPS epochs,
+    when the database holds a bno_reports table. Otherwise, the defined measures as stored.
+
+    :param latency_offset: seconds added to the GPS timestamps to get the BNO08x timestamps
+    :param margin: seconds of BNO08x reports loaded before and after the survey measures
+    """
+    if not reports.table_exists(conn):
+        return load_arrays(conn, start, end, only_defined=True)
+
+    survey_arrays = load_arrays(conn, start, end, only_defined=False)
+    if len(survey_arrays) == 0:
+        return survey_arrays
+    bno_reports = reports.load_reports_around(conn, survey_arrays.timestamps_ns, latency_offset, margin)
+    return align_survey(survey_arrays, bno_reports, latency_offset)
+
+
+def iter_aligned_arrays(
+        conn, start: datetime | None, end: datetime | None, latency_offset: float = 0., margin: float = 1.,
+        chunk_size: int = CHUNK_SIZE
+) -> Generator[SurveyArrays, None, None]:
+    """
+    Streaming version of load_aligned_arrays: each chunk of survey measures is aligned on the BNO08x reports
+    loaded around it only.
+    """
+    if not reports.table_exists(conn):
+        yield from iter_arrays(conn, start, end, only_defined=True, chunk_size=chunk_size)
+        return
+
+    for survey_arrays in iter_arrays(conn, start, end, only_defined=False, chunk_size=chunk_size):
+        bno_reports = reports.load_reports_around(conn, survey_arrays.timestamps_ns, latency_offset, margin)
+        yield align_survey(survey_arrays, bno_reports, latency_offset)
+
+
+def iter_aligned_archive(
+        directory: str, start: datetime | None, end: datetime | None, latency_offset: float = 0., margin: float = 1.,
+        chunk_size: int = CHUNK_SIZE
+) -> Generator[SurveyArrays, None, None]:
+    """
+    iter_aligned_arrays, from a session archived by survey-export
+    """
+    if archive_path(directory, reports.TABLE_NAME) is None:
+        yield from iter_survey_archive(directory, start, end, only_defined=True, chunk_size=chunk_size)
+        return
+
+    chunks = iter_survey_archive(directory, start, end, only_defined=False, chunk_size=chunk_size)
+    aligned = iter_reports_archive_around(directory, chunks, latency_offset, margin, chunk_size)
+    for survey_arrays, bno_reports in aligned:
+        yield align_survey(survey_arrays, bno_reports, latency_offset)
+
+
+def latency_offset_from(stored: dict | None, min_confidence: float = MIN_CLOCK_OFFSET_CONFIDENCE) -> float:
+    """
+    :param stored: the clock offset estimated by survey-clock-offset, as stored in the session metadata
+    :return: its offset, or 0 if there is none or it is not confident enough
+    """
+    if stored is None:
+        return 0.
+    clock_offset = ClockOffset.from_dict(stored)
+    if clock_offset.confidence < min_confidence:
+        logger.warning(f"Ignoring the stored clock offset, not confident enough: {clock_offset}")
+        return 0.
+    logger.info(f"Using the stored clock offset: {clock_offset}")
+    return clock_offset.offset
+
+
+def stored_latency_offset(conn, min_confidence: float = MIN_CLOCK_OFFSET_CONFIDENCE) -> float:
+    """
+    :return: the clock offset estimated by survey-clock-offset, or 0 if there is none or it is not confident enough
+    """
+    return latency_offset_from(get_metadata(conn, CLOCK_OFFSET_KEY), min_confidence)
+
+
+def pole_axis_from(stored: dict | None) -> np.ndarray | None:
+    """
+    :param stored: the pole calibration of survey-calibrate, as stored in the session metadata
+    :return: its axis, or None if there is none
+    """
+    if stored is None:
+        return None
+    calibration = PoleCalibration.from_dict(stored)
+    logger.info(f"Using the stored pole calibration: {calibration}")
+    return calibration.axis
+
+
+def stored_pole_axis(conn) -> np.ndarray | None:
+    """
+    :return: the pole axis calibrated by survey-calibrate, or None if there is none
+    """
+    return pole_axis_from(get_metadata(conn, POLE_AXIS_KEY))
+
+
+def iter_projected(
+        chunks: Iterable[SurveyArrays], pole_length: float, epsg: int | None = None, v_nat=None
+) -> Generator[Tuple[np.ndarray, np.ndarray, np.ndarray], None, None]:
+    """
+    Project each chunk of survey measures, as project_arrays.
+    :param epsg: EPSG code of the UTM zone. If None, picked from the first non empty chunk: see survey_utm_epsg
+        to pick it from the whole survey.
+    :return: for each non empty chunk, the timestamps in ns and the (N,3) arrays of the GPS and pole end positions
+    """
+    for survey_arrays in chunks:
+        if len(survey_arrays) == 0:
+            continue
+        if epsg is None:
+            epsg = utm_epsg_for(survey_arrays.positions)
+            logger.info(f"Projecting into EPSG:{epsg}")
+        utm_coords, projections = project_arrays(survey_arrays, pole_length, epsg, v_nat)
+        yield survey_arrays.timestamps_ns, utm_coords, projections
+
+
+def survey_utm_epsg(median: tuple[float, float] | None) -> int | None:
+    """
+    :param median: the median position of the survey, from median_position or median_position_archive
+    :return: the EPSG code of its UTM zone, or None without position
+    """
+    if median is None:
+        return None
+    epsg = utm_epsg(*median)
+    logger.info(f"Projecting into EPSG:{epsg}, the UTM zone of the median survey position")
+    return epsg
+
+
+def format_timestamps(timestamps_ns: np.ndarray) -> np.ndarray:
+    """
+    :return: ISO formatted UTC timestamps, with milliseconds
+    """
+    iso = np.datetime_as_string(timestamps_ns.astype('datetime64[ns]').astype('datetime64[ms]'), unit='ms')
+    return np.char.add(iso, '+00:00')
+
+
+def projected_measures_from_arrays(
+        timestamps_ns: np.ndarray, utm_coords: np.ndarray, projections: np.ndarray
+) -> list[Tuple[str, Tuple[float, float, float], Tuple[float, float, float]]]:
+    """
+    :return: the projected measures, as returned by project_measure
+    """
+    return list(zip(format_timestamps(timestamps_ns).tolist(),
+                    map(tuple, utm_coords.tolist()),
+                    map(tuple, projections.tolist())))
+
+
+def plot_projected_measures(projected_measures: list[Tuple[datetime, Tuple[float, float, float], Tuple[float, float, float]]], png_file: str,
+                            max_points: int = PLOT_MAX_POINTS):
     """
     Plot the projected measures, which are in metrics coordinates, into a png_image
     Each projected measures element contains
@@ -52,72 +236,101 @@ def plot_projected_measures(projected_measures: list[Tuple[datetime, Tuple[float
     * blue dots for the pole end positions
     * a scale to indicate to represent either 10cm, 1m or 10 meters. Whatever is the most relevant
     :param projected_measures:
+    :param max_points: above this number of measures, the points are plotted as density maps. See plot_survey.
     :return: None
     """
-    import matplotlib.pyplot as plt
-    from matplotlib.patches import Rectangle
-    import numpy as np
-    from datetime import datetime
-    
     # Check if there are any measures to plot
     if not projected_measures or len(projected_measures) == 0:
         logger.warning("No projected measures to plot")
         return
-    
-    # Extract data points
-    gps_points = []
-    pole_ends = []
-    timestamps = []
-    
-    for timestamp_str, utm_coords, projection in projected_measures:
-        if isinstance(timestamp_str, str):
-            timestamp = datetime.fromisoformat(timestamp_str)
-        else:
-            timestamp = timestamp_str
-        timestamps.append(timestamp)
-        gps_points.append(utm_coords)
-        pole_ends.append(projection)
-    
-    # Convert to numpy arrays for easier manipulation
-    gps_points = np.array(gps_points)
-    pole_ends = np.array(pole_ends)
-    
+
+    timestamps = [datetime.fromisoformat(t) if isinstance(t, str) else t for t, _, _ in projected_measures]
+    gps_points = np.array([m[1] for m in projected_measures], dtype=float)
+    pole_ends = np.array([m[2] for m in projected_measures], dtype=float)
+    time_range = (min(timestamps).isoformat(timespec='milliseconds'),
+                  max(timestamps).isoformat(timespec='milliseconds'))
+    plot_survey(gps_points, pole_ends, time_range, png_file, max_points)
+
+
+def plot_projected_arrays(timestamps_ns: np.ndarray, utm_coords: np.ndarray, projections: np.ndarray, png_file: str,
+                          max_points: int = PLOT_MAX_POINTS):
+    """
+    plot_projected_measures, on the arrays returned by project_arrays
+    """
+    if len(timestamps_ns) == 0:
+        logger.warning("No projected measures to plot")
+        return
+    first, last = format_timestamps(np.array([timestamps_ns.min(), timestamps_ns.max()])).tolist()
+    plot_survey(utm_coords, projections, (first, last), png_file, max_points)
+
+
+def plot_survey(gps_points: np.ndarray, pole_ends: np.ndarray, time_range: Tuple[str, str], png_file: str,
+                max_points: int = PLOT_MAX_POINTS, dpi: int = 300):
+    """
+    Plot the (N,3) GPS points and pole end positions, in UTM coordinates, as described in plot_projected_measures.
+    The rendering time is bounded whatever the survey size:
+    * the artists are rasterized, so the cost of saving does not depend on their number of elements
+    * up to PLOT_MARKER_POINTS measures, points are drawn as dots; above, as single pixels
+    * above max_points measures, the points are binned into red and blue density maps of PLOT_DENSITY_BINS cells,
+      and only max_points evenly spaced GPS to pole end segments are drawn
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Rectangle
+
+    n = len(gps_points)
+    gps_xy = np.asarray(gps_points, dtype=float)[:, :2]
+    pole_xy = np.asarray(pole_ends, dtype=float)[:, :2]
+
+    # the bounds of both point sets, computed once
+    x_min, y_min = np.minimum(gps_xy.min(axis=0), pole_xy.min(axis=0))
+    x_max, y_max = np.maximum(gps_xy.max(axis=0), pole_xy.max(axis=0))
+    x_range, y_range = x_max - x_min, y_max - y_min
+    # Add some padding to the plot
+    padding = max(x_range, y_range) * 0.05
+
     # Create figure and axis
     fig, ax = plt.subplots(figsize=(10, 8))
-    
-    # Plot GPS points (red) and pole end positions (blue)
-    ax.scatter(gps_points[:, 0], gps_points[:, 1], color='red', label='GPS Points', s=30)
-    ax.scatter(pole_ends[:, 0], pole_ends[:, 1], color='blue', label='Pole End Positions', s=30)
-    segments = np.array([[[p[1][0], p[1][1]], [p[2][0], p[2][1]]] for p in projected_measures])
-    lc = LineCollection(segments, colors='grey', linewidths=1)
-    ax.add_collection(lc)
+
+    step = max(1, -(-n // max_points))
+    segments = np.stack((gps_xy[::step], pole_xy[::step]), axis=1)
+    ax.add_collection(LineCollection(segments, colors='grey', linewidths=1 if n <= PLOT_MARKER_POINTS else 0.2,
+                                     rasterized=True))
+
+    if n > max_points:
+        extent = (x_min - padding, x_max + padding, y_min - padding, y_max + padding)
+        for xy, cmap, label in ((gps_xy, 'Reds', 'GPS Points'), (pole_xy, 'Blues', 'Pole End Positions')):
+            counts, _, _ = np.histogram2d(xy[:, 0], xy[:, 1], bins=PLOT_DENSITY_BINS,
+                                          range=(extent[0:2], extent[2:4]))
+            ax.imshow(np.ma.masked_equal(counts.T, 0), extent=extent, origin='lower', cmap=cmap, alpha=0.7,
+                      interpolation='nearest', aspect='auto')
+            # an empty artist, for the legend
+            ax.plot([], [], 's', color=plt.get_cmap(cmap)(0.8), label=f"{label} (density)")
+    elif n <= PLOT_MARKER_POINTS:
+        # Plot GPS points (red) and pole end positions (blue)
+        ax.scatter(gps_xy[:, 0], gps_xy[:, 1], color='red', label='GPS Points', s=30, rasterized=True)
+        ax.scatter(pole_xy[:, 0], pole_xy[:, 1], color='blue', label='Pole End Positions', s=30, rasterized=True)
+    else:
+        ax.plot(gps_xy[:, 0], gps_xy[:, 1], ',', color='red', label='GPS Points', rasterized=True)
+        ax.plot(pole_xy[:, 0], pole_xy[:, 1], ',', color='blue', label='Pole End Positions', rasterized=True)
 
     # Set equal aspect to ensure distances are represented correctly
     ax.set_aspect('equal')
-    
+
     # Add labels
     ax.set_xlabel('UTM Easting (m)')
     ax.set_ylabel('UTM Northing (m)')
-    
-    # Determine min and max timestamps
-    min_timestamp = min(timestamps)
-    max_timestamp = max(timestamps)
-    
+
     # Create title with number of points and timestamp range
-    title = f"Survey Points: {len(projected_measures)}\n"
-    title += f"Time Range: {min_timestamp.isoformat(timespec='milliseconds')} to {max_timestamp.isoformat(timespec='milliseconds')}"
+    title = f"Survey Points: {n}\n"
+    title += f"Time Range: {time_range[0]} to {time_range[1]}"
     ax.set_title(title)
-    
+
     # Add legend
     ax.legend()
-    
-    # Determine appropriate scale bar size
-    x_range = np.max(np.concatenate([gps_points[:, 0], pole_ends[:, 0]])) - np.min(np.concatenate([gps_points[:, 0], pole_ends[:, 0]]))
-    y_range = np.max(np.concatenate([gps_points[:, 1], pole_ends[:, 1]])) - np.min(np.concatenate([gps_points[:, 1], pole_ends[:, 1]]))
-    
+
     # Choose scale based on the size of the plot area
     max_range = max(x_range, y_range)
-    
+
     if max_range < 1:
         scale_size = 0.1  # 10 cm
         scale_text = "10 cm"
@@ -127,31 +340,23 @@ def plot_projected_measures(projected_measures: list[Tuple[datetime, Tuple[float
     else:
         scale_size = 10.0  # 10 m
         scale_text = "10 m"
-    
-    # Calculate scale bar position (bottom right corner)
-    x_min = np.min(np.concatenate([gps_points[:, 0], pole_ends[:, 0]]))
-    y_min = np.min(np.concatenate([gps_points[:, 1], pole_ends[:, 1]]))
-    x_max = np.max(np.concatenate([gps_points[:, 0], pole_ends[:, 0]]))
-    y_max = np.max(np.concatenate([gps_points[:, 1], pole_ends[:, 1]]))
-    
-    # Add some padding to the plot
-    padding = max(x_range, y_range) * 0.05
+
     ax.set_xlim(x_min - padding, x_max + padding)
     ax.set_ylim(y_min - padding, y_max + padding)
-    
+
     # Position scale bar in the bottom right corner
     scale_x = x_max - scale_size - padding
     scale_y = y_min + padding
-    
+
     # Draw scale bar
     ax.add_patch(Rectangle((scale_x, scale_y), scale_size, scale_size/10, color='black'))
-    ax.text(scale_x + scale_size/2, scale_y + scale_size/5, scale_text, 
+    ax.text(scale_x + scale_size/2, scale_y + scale_size/5, scale_text,
             horizontalalignment='center', verticalalignment='bottom')
-    
+
     # Save the plot to the specified file
-    plt.savefig(png_file, dpi=300, bbox_inches='tight')
+    plt.savefig(png_file, dpi=dpi, bbox_inches='tight')
     plt.close(fig)
-    
+
     logger.info(f"Plot saved to {png_file}")
 
 
@@ -170,7 +375,7 @@ def format_tsv_output(projected_measures: list[Tuple[datetime, Tuple[float, floa
 
     # Add header if requested
     if include_header:
-        lines.append("timestamp\ttutm_x\tutm_y\tutm_z\tproj_x\tproj_y\tproj_z")
+        lines.append("\t".join(OUTPUT_COLUMNS))
 
     for d in projected_measures:
         timestamp, utm_coords, projection = d
@@ -179,6 +384,33 @@ def format_tsv_output(projected_measures: list[Tuple[datetime, Tuple[float, floa
     return "\n".join(lines)
 
 
+def write_projected(
+        projected: Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]], out: TextIO,
+        delimiter: str = "\t", precision: int | None = None, include_header: bool = True
+) -> int:
+    """
+    Write the projected chunks as they come, one line per measure, with the columns of format_tsv_output.
+    Each chunk is formatted at once with a row template, so that only one chunk is in memory at a time.
+
+    :param projected: chunks of (timestamps in ns, (N,3) GPS positions, (N,3) pole end positions)
+    :param precision: number of decimals of the coordinates. If None, the shortest exact representation,
+        as format_tsv_output.
+    :return: the number of written measures
+    """
+    value_format = "%r" if precision is None else f"%.{precision}f"
+    row_template = delimiter.join(["%s"] + [value_format] * 6) + "\n"
+    if include_header:
+        out.write(delimiter.join(OUTPUT_COLUMNS) + "\n")
+
+    count = 0
+    for timestamps_ns, utm_coords, projections in projected:
+        rows = zip(format_timestamps(timestamps_ns).tolist(), *np.hstack((utm_coords, projections)).T.tolist())
+        out.write("".join([row_template % row for row in rows]))
+        out.flush()
+        count += len(timestamps_ns)
+    return count
+
+
 def main():
     """
     Main function to analyze survey data and output as TSV.
@@ -187,13 +419,17 @@ def main():
     logging.basicConfig(level=logging.INFO)
 
     # Parse command line arguments
-    parser = argparse.ArgumentParser(description="Analyze survey data and output as TSV.")
+    parser = argparse.ArgumentParser(description="Analyze survey data and output as TSV or CSV.")
 
-    parser.add_argument(
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
         "--db",
-        required=True,
         help="the path to the sqlite database file"
     )
+    source.add_argument(
+        "--archive",
+        help="the directory of a session exported by survey-export, read instead of a sqlite database"
+    )
     parser.add_argument(
         "--start",
         type=str,
@@ -204,11 +440,56 @@ def main():
         type=str,
         help="End timestamp in ISO format (e.g., 2023-01-01T23:59:59)"
     )
+    parser.add_argument(
+        "--utm-epsg",
+        type=int,
+        help="EPSG code of the UTM zone to project into (e.g. 32634 for 34N). "
+             "Default is the zone of the median position of the selected survey measures."
+    )
+    parser.add_argument(
+        "--latency-offset",
+        type=float,
+        help="Seconds added to the GPS timestamps to interpolate the BNO08x orientation. "
+             "Default is the offset estimated by survey-clock-offset, if any, else 0."
+    )
+    parser.add_argument(
+        "--no-align",
+        action="store_true",
+        help="Use the quaternions stored with the GPS positions, instead of interpolating the BNO08x reports."
+    )
+    parser.add_argument(
+        "--no-calibration",
+        action="store_true",
+        help="Project along the (1, 0, 0) BNO08x axis, ignoring the pole axis stored by survey-calibrate."
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="the file to write the projected measures to. Default is the standard output."
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(OUTPUT_DELIMITERS),
+        default="tsv",
+        help="the output format. Default is tsv."
+    )
+    parser.add_argument(
+        "--precision",
+        type=int,
+        help="number of decimals of the output coordinates. Default is the full precision."
+    )
     parser.add_argument(
         "--image",
         type=str,
         help="png image file"
     )
+    parser.add_argument(
+        "--plot-max-points",
+        type=int,
+        default=PLOT_MAX_POINTS,
+        help=f"above this number of measures, the image shows density maps and decimated segments. "
+             f"Default is {PLOT_MAX_POINTS}."
+    )
     parser.add_argument(
         "--log-level",
         type=str,
@@ -222,26 +503,60 @@ def main():
     log_level = getattr(logging, args.log_level.upper())
     logging.basicConfig(level=log_level)
 
-    # Connect to database
-    db_connection = db_conn(args.db)
-
     # Parse timestamps if provided
     start = parse_timestamp(args.start) if args.start else None
     end = parse_timestamp(args.end) if args.end else None
 
-    # Load data from database
-    logger.info(f"Loading data from {args.db}")
-    logger.info(f"Start: {start}, End: {end}")
-    measures = load_data(db_connection, start, end, True)
-    logger.info(f"Loaded {len(measures)} survey measures")
+    if args.archive:
+        logger.info(f"Loading data from the archive {args.archive}")
+        logger.info(f"Start: {start}, End: {end}")
+        metadata = load_archive_metadata(args.archive)
+        if args.no_align:
+            chunks = iter_survey_archive(args.archive, start, end, only_defined=True, chunk_size=CHUNK_SIZE)
+        else:
+            latency_offset = args.latency_offset
+            if latency_offset is None:
+                latency_offset = latency_offset_from(metadata.get(CLOCK_OFFSET_KEY))
+            chunks = iter_aligned_archive(args.archive, start, end, latency_offset)
+        v_nat = None if args.no_calibration else pole_axis_from(metadata.get(POLE_AXIS_KEY))
+        epsg = args.utm_epsg or survey_utm_epsg(median_position_archive(args.archive, start, end))
+    else:
+        # Connect to database
+        db_connection = db_conn(args.db)
+
+        # Load data from database
+        logger.info(f"Loading data from {args.db}")
+        logger.info(f"Start: {start}, End: {end}")
+        if args.no_align:
+            chunks = iter_arrays(db_connection, start, end, only_defined=True, chunk_size=CHUNK_SIZE)
+        else:
+            latency_offset = args.latency_offset
+            if latency_offset is None:
+                latency_offset = stored_latency_offset(db_connection)
+            chunks = iter_aligned_arrays(db_connection, start, end, latency_offset)
+        v_nat = None if args.no_calibration else stored_pole_axis(db_connection)
+        epsg = args.utm_epsg or survey_utm_epsg(median_position(db_connection, start, end))
 
-    # Format and print TSV output
-    proj_measures = project_measure(measures, pole_length=2.57)
-    tsv_output = format_tsv_output(proj_measures)
-    print(tsv_output)
+    projected = iter_projected(chunks, pole_length=2.57, epsg=epsg, v_nat=v_nat)
 
+    # the image needs all the projected measures: keep them only then
     if args.image:
-        plot_projected_measures(proj_measures, args.image)
+        projected = list(projected)
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        count = write_projected(projected, out, OUTPUT_DELIMITERS[args.format], args.precision)
+    finally:
+        if args.output:
+            out.close()
+    logger.info(f"Wrote {count} projected survey measures")
+
+    if args.image:
+        if projected:
+            timestamps_ns, utm_coords, projections = (np.concatenate(arrays) for arrays in zip(*projected))
+            plot_projected_arrays(timestamps_ns, utm_coords, projections, args.image, args.plot_max_points)
+        else:
+            logger.warning("No projected measures to plot")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,104 @@
+import argparse
+import logging
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from bok_drone_onboard_system.bno import data as bno_data
+from bok_drone_onboard_system.bno.data import reports
+from bok_drone_onboard_system.positioner.calibration import calibrate
+from bok_drone_onboard_system.storage.sqlite import table_exists
+from bok_drone_onboard_system.survey.data import db_conn, load_arrays
+from bok_drone_onboard_system.survey.data.metadata import set_metadata, POLE_AXIS_KEY
+
+logger = logging.getLogger(__name__)
+
+
+def load_bno_reports_quaternions(conn, start: datetime | None, end: datetime | None) -> np.ndarray:
+    return reports.load_reports(conn, start, end).quaternion
+
+
+def load_survey_quaternions(conn, start: datetime | None, end: datetime | None) -> np.ndarray:
+    return load_arrays(conn, start, end, only_defined=True).quaternions
+
+
+# for each table holding quaternions: how to load them between two timestamps
+QUATERNION_SOURCES = {
+    reports.TABLE_NAME: load_bno_reports_quaternions,
+    bno_data.TABLE_NAME: bno_data.load_quaternions,
+    "survey_records": load_survey_quaternions,
+}
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="calibrate the pole axis in the BNO08x frame, from quaternions measured while turning the pole "
+                    "around its axis, and store it in the sqlite DB for survey-analyse."
+    )
+
+    parser.add_argument(
+        "--db",
+        required=True,
+        help="the path to the sqlite database file"
+    )
+    parser.add_argument(
+        "--start",
+        type=str,
+        help="Start timestamp of the calibration in ISO format (e.g., 2023-01-01T00:00:00)"
+    )
+    parser.add_argument(
+        "--end",
+        type=str,
+        help="End timestamp of the calibration in ISO format (e.g., 2023-01-01T23:59:59)"
+    )
+    parser.add_argument(
+        "--source",
+        choices=sorted(QUATERNION_SOURCES),
+        default=reports.TABLE_NAME,
+        help=f"The table to read the quaternions from. Default is {reports.TABLE_NAME}."
+    )
+    parser.add_argument(
+        "--output-db",
+        type=str,
+        help="the sqlite database file where the calibration is stored (e.g. the survey one). Default is --db."
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the calibration without storing it."
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default="INFO",
+        help="the log level. Default is INFO. Options are: DEBUG, INFO, WARNING, ERROR, CRITICAL"
+    )
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.start) if args.start else None
+    end = datetime.fromisoformat(args.end) if args.end else None
+
+    db_connection = db_conn(args.db)
+    if not table_exists(db_connection, args.source):
+        logger.error(f"No {args.source} table in {args.db}: choose another --source")
+        sys.exit(1)
+    quaternions = QUATERNION_SOURCES[args.source](db_connection, start, end)
+    logger.info(f"Loaded {len(quaternions)} quaternions from {args.source}")
+
+    try:
+        calibration = calibrate(quaternions)
+    except ValueError as e:
+        logger.error(f"Cannot calibrate: {e}")
+        sys.exit(1)
+    print(calibration)
+
+    if not args.dry_run:
+        output_connection = db_conn(args.output_db) if args.output_db else db_connection
+        set_metadata(output_connection, POLE_AXIS_KEY, calibration.to_dict())
+        logger.info(f"Pole axis stored in {args.output_db or args.db}")
+
+
+if __name__ == "__main__":
+    main()
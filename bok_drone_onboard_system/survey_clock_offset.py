@@ -0,0 +1,92 @@
+import argparse
+import logging
+import sys
+from datetime import datetime
+
+from bok_drone_onboard_system.analysis.clock_offset import estimate_clock_offset
+from bok_drone_onboard_system.bno.data import reports
+from bok_drone_onboard_system.survey.data import db_conn, load_arrays
+from bok_drone_onboard_system.survey.data.metadata import set_metadata, CLOCK_OFFSET_KEY
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="estimate the clock offset between the GPS and the BNO08x timestamps of a survey, "
+                    "and store it in the sqlite DB for survey-analyse."
+    )
+
+    parser.add_argument(
+        "--db",
+        required=True,
+        help="the path to the sqlite database file"
+    )
+    parser.add_argument(
+        "--start",
+        type=str,
+        help="Start timestamp in ISO format (e.g., 2023-01-01T00:00:00)"
+    )
+    parser.add_argument(
+        "--end",
+        type=str,
+        help="End timestamp in ISO format (e.g., 2023-01-01T23:59:59)"
+    )
+    parser.add_argument(
+        "--max-offset",
+        type=float,
+        default=2.,
+        help="Maximum absolute offset searched, in seconds. Default is 2."
+    )
+    parser.add_argument(
+        "--resolution",
+        type=float,
+        default=0.01,
+        help="Time step of the signals resampling, in seconds. Default is 0.01."
+    )
+    parser.add_argument(
+        "--min-speed",
+        type=float,
+        default=0.2,
+        help="Horizontal speed in m/s under which the GPS heading is ignored. Default is 0.2."
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the estimated offset without storing it."
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default="INFO",
+        help="the log level. Default is INFO. Options are: DEBUG, INFO, WARNING, ERROR, CRITICAL"
+    )
+    args = parser.parse_args()
+
+    db_connection = db_conn(args.db)
+    if not reports.table_exists(db_connection):
+        logger.error(f"No {reports.TABLE_NAME} table in {args.db}: the clock offset cannot be estimated")
+        sys.exit(1)
+
+    start = datetime.fromisoformat(args.start) if args.start else None
+    end = datetime.fromisoformat(args.end) if args.end else None
+    survey_arrays = load_arrays(db_connection, start, end, only_defined=False)
+    bno_reports = reports.load_reports_around(db_connection, survey_arrays.timestamps_ns, margin=args.max_offset)
+
+    try:
+        clock_offset = estimate_clock_offset(
+            survey_arrays, bno_reports, args.max_offset, args.resolution, args.min_speed
+        )
+    except ValueError as e:
+        logger.error(f"Cannot estimate the clock offset: {e}")
+        sys.exit(1)
+    print(clock_offset)
+
+    if not args.dry_run:
+        set_metadata(db_connection, CLOCK_OFFSET_KEY, clock_offset.to_dict())
+        logger.info(f"Clock offset stored in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
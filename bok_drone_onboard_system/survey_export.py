@@ -0,0 +1,148 @@
+import argparse
+import itertools
+import logging
+import os
+from datetime import datetime
+
+from bok_drone_onboard_system.analysis.gps import utm_epsg_for
+from bok_drone_onboard_system.bno import data as bno_data
+from bok_drone_onboard_system.bno.data import reports
+from bok_drone_onboard_system.storage.archive import FORMATS, DEFAULT_COMPRESSION
+from bok_drone_onboard_system.storage.sqlite import table_exists
+from bok_drone_onboard_system.survey.data import db_conn, median_position, TABLE_NAME
+from bok_drone_onboard_system.survey.data.archive import PROJECTED_TABLE_NAME, export_survey_records, \
+    export_bno_data, export_bno_reports, export_projected
+from bok_drone_onboard_system.survey_analyse import iter_aligned_arrays, iter_projected, stored_latency_offset, \
+    stored_pole_axis, survey_utm_epsg
+
+logger = logging.getLogger(__name__)
+
+POLE_LENGTH = 2.57
+
+# table: exporter from the sqlite database
+TABLE_EXPORTERS = {
+    TABLE_NAME: export_survey_records,
+    bno_data.TABLE_NAME: export_bno_data,
+    reports.TABLE_NAME: export_bno_reports,
+}
+
+
+def export_projected_survey(
+        conn, directory: str, fmt: str, compression: str | None,
+        start: datetime | None, end: datetime | None, epsg: int | None = None
+) -> int:
+    """
+    Project the survey as survey-analyse does, and export the result
+    :return: the number of exported projected measures
+    """
+    latency_offset = stored_latency_offset(conn)
+    v_nat = stored_pole_axis(conn)
+    chunks = (c for c in iter_aligned_arrays(conn, start, end, latency_offset) if len(c) > 0)
+    # the UTM zone is stored in the metadata, which is written first: pick it before streaming, as survey-analyse
+    first = next(chunks, None)
+    if first is None:
+        logger.warning("No survey measures to project")
+        return 0
+    if epsg is None:
+        epsg = survey_utm_epsg(median_position(conn, start, end)) or utm_epsg_for(first.positions)
+    metadata = {
+        "epsg": epsg,
+        "pole_length": POLE_LENGTH,
+        "latency_offset": latency_offset,
+        "pole_axis": None if v_nat is None else v_nat.tolist(),
+    }
+    projected = iter_projected(itertools.chain([first], chunks), POLE_LENGTH, epsg, v_nat)
+    return export_projected(projected, directory, fmt, compression, metadata)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="export a survey session, raw records and projected results, to typed and compressed Parquet "
+                    "or Arrow IPC files, one per table, readable by survey-analyse --archive."
+    )
+
+    parser.add_argument(
+        "--db",
+        required=True,
+        help="the path to the sqlite database file"
+    )
+    parser.add_argument(
+        "--bno-db",
+        type=str,
+        help=f"the sqlite database file holding the {bno_data.TABLE_NAME} table of bno08x-acquire. Default is --db."
+    )
+    parser.add_argument(
+        "--output-dir",
+        required=True,
+        help="the directory where the files are written, as <table>.parquet or <table>.arrow"
+    )
+    parser.add_argument(
+        "--start",
+        type=str,
+        help="Start timestamp in ISO format (e.g., 2023-01-01T00:00:00)"
+    )
+    parser.add_argument(
+        "--end",
+        type=str,
+        help="End timestamp in ISO format (e.g., 2023-01-01T23:59:59)"
+    )
+    parser.add_argument(
+        "--tables",
+        nargs="+",
+        choices=[*TABLE_EXPORTERS, PROJECTED_TABLE_NAME],
+        default=[*TABLE_EXPORTERS, PROJECTED_TABLE_NAME],
+        help="The tables to export. Default is all of them. Missing tables are skipped."
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(FORMATS),
+        default="parquet",
+        help="the file format. Default is parquet."
+    )
+    parser.add_argument(
+        "--compression",
+        type=str,
+        default=DEFAULT_COMPRESSION,
+        help=f"the compression codec (e.g. zstd, lz4, snappy for Parquet, none). Default is {DEFAULT_COMPRESSION}."
+    )
+    parser.add_argument(
+        "--utm-epsg",
+        type=int,
+        help="EPSG code of the UTM zone of the projected results. Default is the zone of the first survey measures."
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default="INFO",
+        help="the log level. Default is INFO. Options are: DEBUG, INFO, WARNING, ERROR, CRITICAL"
+    )
+    args = parser.parse_args()
+    logging.getLogger().setLevel(getattr(logging, args.log_level.upper()))
+
+    start = datetime.fromisoformat(args.start) if args.start else None
+    end = datetime.fromisoformat(args.end) if args.end else None
+    compression = None if args.compression == "none" else args.compression
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    db_connection = db_conn(args.db)
+    bno_connection = db_conn(args.bno_db) if args.bno_db else db_connection
+
+    for table_name in args.tables:
+        if table_name == PROJECTED_TABLE_NAME:
+            if not table_exists(db_connection, TABLE_NAME):
+                logger.warning(f"No {TABLE_NAME} table to project, skipping {table_name}")
+                continue
+            count = export_projected_survey(db_connection, args.output_dir, args.format, compression, start, end,
+                                            args.utm_epsg)
+        else:
+            conn = bno_connection if table_name == bno_data.TABLE_NAME else db_connection
+            if not table_exists(conn, table_name):
+                logger.warning(f"No {table_name} table, skipping it")
+                continue
+            count = TABLE_EXPORTERS[table_name](conn, args.output_dir, args.format, compression, start, end)
+        logger.info(f"Exported {count} rows of {table_name}")
+
+
+if __name__ == "__main__":
+    main()
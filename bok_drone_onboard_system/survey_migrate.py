@@ -0,0 +1,55 @@
+import argparse
+import logging
+import sys
+
+from bok_drone_onboard_system.storage.sqlite import table_exists
+from bok_drone_onboard_system.survey.data import db_conn, TABLE_NAME
+from bok_drone_onboard_system.survey.data.migrate import upgrade
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="migrate a survey sqlite DB, in place, to the integer timestamp schema.")
+
+    parser.add_argument(
+        "--db",
+        required=True,
+        help="the path to the sqlite database file"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=10000,
+        help="Number of records converted per transaction. Default is 10000."
+    )
+    parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="Reclaim the space freed by the migration. Requires as much free disk space as the DB size."
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default="INFO",
+        help="the log level. Default is INFO. Options are: DEBUG, INFO, WARNING, ERROR, CRITICAL"
+    )
+    args = parser.parse_args()
+    logging.getLogger().setLevel(getattr(logging, args.log_level.upper()))
+
+    db_connection = db_conn(args.db)
+    if not table_exists(db_connection, TABLE_NAME):
+        logger.error(f"No {TABLE_NAME} table in {args.db}: nothing to migrate")
+        db_connection.close()
+        sys.exit(1)
+    version = upgrade(db_connection, chunk_size=args.chunk_size)
+    logger.info(f"{args.db} is in schema v{version}")
+    if args.vacuum:
+        logger.info("Vacuuming")
+        db_connection.execute("VACUUM")
+    db_connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+from bok_drone_onboard_system.replay import FakeSerialPort, LLHServer, ReplayClock, FaultInjector, \
+    survey_sentences, read_nmea_log, llh_records_lines, read_llh_log
+from bok_drone_onboard_system.storage.sqlite import table_exists
+from bok_drone_onboard_system.survey.data import llh, detect_schema_version
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="replay a recorded survey as the Emlid devices: NMEA sentences on a pseudo terminal, to be "
+                    "opened by survey-acquire --serial-port, and LLH solutions on a local TCP server. "
+                    "The BNO08x is replayed by survey-acquire --replay-bno."
+    )
+
+    parser.add_argument(
+        "--db",
+        help="the sqlite database of a recorded survey: NMEA sentences are generated from survey_records, "
+             "and LLH solutions read from llh_records"
+    )
+    parser.add_argument(
+        "--nmea-log",
+        type=str,
+        help="a raw NMEA log to replay, instead of the survey_records of --db"
+    )
+    parser.add_argument(
+        "--llh-log",
+        type=str,
+        help="an Emlid LLH log to replay, instead of the llh_records of --db"
+    )
+    parser.add_argument(
+        "--start",
+        type=str,
+        help="Start timestamp of the replay in ISO format (e.g., 2023-01-01T00:00:00), for --db"
+    )
+    parser.add_argument(
+        "--end",
+        type=str,
+        help="End timestamp of the replay in ISO format (e.g., 2023-01-01T23:59:59), for --db"
+    )
+    parser.add_argument(
+        "--llh-host",
+        type=str,
+        default="127.0.0.1",
+        help="the LLH server host. Default is 127.0.0.1"
+    )
+    parser.add_argument(
+        "--llh-port",
+        type=int,
+        default=9001,
+        help="the LLH server port. Default is 9001"
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.,
+        help="replay speed factor, e.g. 10 for ten times faster than recorded. 0 is as fast as possible. "
+             "Default is 1."
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.,
+        help="standard deviation in seconds of a random delay added to each line. Default is 0."
+    )
+    parser.add_argument(
+        "--fail-rate",
+        type=float,
+        default=0.,
+        help="probability for each line to be a failure: truncated sentence on the serial port, "
+             "closed connection on the LLH server. Default is 0."
+    )
+    parser.add_argument(
+        "--drop-rate",
+        type=float,
+        default=0.,
+        help="probability for each line to be dropped. Default is 0."
+    )
+    parser.add_argument(
+        "--corrupt-rate",
+        type=float,
+        default=0.,
+        help="probability for each line to have a corrupted byte. Default is 0."
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="random seed of the jitter and of the faults, to reproduce a replay"
+    )
+    parser.add_argument(
+        "--loop",
+        action="store_true",
+        help="restart the replay at the end of the recording, until interrupted"
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default="INFO",
+        help="the log level. Default is INFO. Options are: DEBUG, INFO, WARNING, ERROR, CRITICAL"
+    )
+    args = parser.parse_args()
+    logging.getLogger().setLevel(getattr(logging, args.log_level.upper()))
+
+    start = datetime.fromisoformat(args.start) if args.start else None
+    end = datetime.fromisoformat(args.end) if args.end else None
+    conn = sqlite3.connect(args.db) if args.db else None
+
+    if args.nmea_log:
+        nmea_lines = read_nmea_log(args.nmea_log)
+    elif conn and detect_schema_version(conn) is not None:
+        nmea_lines = survey_sentences(conn, start, end)
+    else:
+        nmea_lines = []
+    if args.llh_log:
+        llh_lines = read_llh_log(args.llh_log)
+    elif conn and table_exists(conn, llh.TABLE_NAME):
+        llh_lines = llh_records_lines(conn, start, end)
+    else:
+        llh_lines = []
+    if conn:
+        conn.close()
+    if not nmea_lines and not llh_lines:
+        parser.error("nothing to replay: give --db, --nmea-log or --llh-log")
+
+    def faults(offset: int) -> FaultInjector:
+        seed = None if args.seed is None else args.seed + offset
+        return FaultInjector(args.fail_rate, args.drop_rate, args.corrupt_rate, seed)
+
+    serial_port = None
+    llh_server = None
+    try:
+        if nmea_lines:
+            serial_port = FakeSerialPort(nmea_lines, ReplayClock(args.speed, args.jitter, args.seed), faults(0),
+                                         args.loop).start()
+            logger.info(f"Replaying {len(nmea_lines)} NMEA sentences on {serial_port.port}")
+        if llh_lines:
+            llh_server = LLHServer(llh_lines, args.llh_host, args.llh_port, args.speed, args.jitter, faults(1),
+                                   args.loop).start()
+            logger.info(f"Serving {len(llh_lines)} LLH solutions on {llh_server.address}")
+        if serial_port is not None:
+            serial_port.join()
+            logger.info("NMEA replay done")
+        # the LLH server replays for each new client: serve until interrupted
+        if llh_server is not None:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        logger.info("Stopping replay")
+    finally:
+        if serial_port is not None:
+            serial_port.stop()
+        if llh_server is not None:
+            llh_server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+from scipy.spatial.transform import Rotation as R
+
+from bok_drone_onboard_system.analysis.alignment import slerp_quaternions, align_survey, OrientationBuffer
+from bok_drone_onboard_system.bno.data import reports
+from bok_drone_onboard_system.bno.data.reports import BNOReports
+from bok_drone_onboard_system.survey.data import SurveyArrays, create_table_if_not_exists, append_measure, \
+    from_epoch_ms
+from bok_drone_onboard_system.survey.gps import GPSPoint
+from bok_drone_onboard_system.survey_analyse import load_aligned_arrays
+
+T0_NS = 1_756_033_153_000_000_000
+
+
+def yaw_quaternions(degrees) -> np.ndarray:
+    return R.from_euler('z', np.reshape(degrees, (-1, 1)), degrees=True).as_quat()
+
+
+def yaw_degrees(quaternions) -> np.ndarray:
+    return R.from_quat(quaternions).as_euler('zyx', degrees=True)[:, 0]
+
+
+class TestSlerpQuaternions(unittest.TestCase):
+    # one sample every 10ms, rotating 1 degree per sample around z
+    SOURCE_NS = T0_NS + np.arange(0, 100) * 10_000_000
+    SOURCE_QUATERNIONS = yaw_quaternions(np.arange(0, 100))
+
+    @parameterized.expand([
+        ("on_sample", 20_000_000, 2.),
+        ("between_samples", 25_000_000, 2.5),
+        ("last_sample", 990_000_000, 99.),
+    ])
+    def test_interpolated(self, name, offset_ns, expected_yaw):
+        result = slerp_quaternions(self.SOURCE_NS, self.SOURCE_QUATERNIONS, np.array([T0_NS + offset_ns]))
+        self.assertAlmostEqual(yaw_degrees(result)[0], expected_yaw, places=6)
+
+    def test_outside_range(self):
+        targets = np.array([T0_NS - 1, T0_NS + 1_000_000_000])
+        result = slerp_quaternions(self.SOURCE_NS, self.SOURCE_QUATERNIONS, targets)
+        self.assertTrue(np.all(np.isnan(result)))
+
+    def test_gap(self):
+        """Targets between samples too far apart are not interpolated"""
+        keep = np.r_[0:20, 80:100]
+        targets = T0_NS + np.array([105_000_000, 500_000_000, 805_000_000])
+        result = slerp_quaternions(self.SOURCE_NS[keep], self.SOURCE_QUATERNIONS[keep], targets, max_gap=0.1)
+        self.assertTrue(np.all(np.isfinite(result[[0, 2]])))
+        self.assertTrue(np.all(np.isnan(result[1])))
+
+    def test_undefined_and_unordered_samples(self):
+        quaternions = self.SOURCE_QUATERNIONS.copy()
+        quaternions[5] = np.nan
+        order = np.random.default_rng(0).permutation(len(self.SOURCE_NS))
+        result = slerp_quaternions(self.SOURCE_NS[order], quaternions[order], np.array([T0_NS + 50_000_000]))
+        self.assertAlmostEqual(yaw_degrees(result)[0], 5., places=6)
+
+    def test_not_enough_samples(self):
+        result = slerp_quaternions(self.SOURCE_NS[:1], self.SOURCE_QUATERNIONS[:1], np.array([T0_NS]))
+        self.assertTrue(np.all(np.isnan(result)))
+
+
+class TestAlignSurvey(unittest.TestCase):
+    # one report every 10ms, rotating 0.5 degree per report around z
+    TIMESTAMPS_US = (T0_NS + np.arange(0, 200) * 10_000_000) // 1000
+    VALUES = np.zeros((200, len(reports.VALUE_COLUMNS)))
+    VALUES[:, 9:13] = yaw_quaternions(np.arange(0, 200) * 0.5)
+
+    def bno_reports(self) -> BNOReports:
+        return BNOReports(self.TIMESTAMPS_US, self.VALUES)
+
+    @parameterized.expand([
+        ("no_offset", 0., [5., 25.]),
+        ("offset", 0.105, [10.25, 30.25]),
+    ])
+    def test_latency_offset(self, name, latency_offset, expected_yaws):
+        survey = SurveyArrays(
+            T0_NS + np.array([100_000_000, 500_000_000]),
+            np.full((2, 4), np.nan),
+            np.array([[43.7, 5.4, 300.], [43.7, 5.4, 300.]]),
+        )
+        aligned = align_survey(survey, self.bno_reports(), latency_offset)
+        np.testing.assert_allclose(yaw_degrees(aligned.quaternions), expected_yaws, atol=1e-6)
+
+    def test_fallback_to_stored_quaternion(self):
+        """Out of the BNO08x reports, the stored quaternion is kept, and undefined measures are dropped"""
+        stored = np.vstack([yaw_quaternions([42.]), [[np.nan] * 4]])
+        survey = SurveyArrays(
+            T0_NS + np.array([5_000_000_000, 6_000_000_000]),
+            stored,
+            np.array([[43.7, 5.4, 300.], [43.7, 5.4, 300.]]),
+        )
+        aligned = align_survey(survey, self.bno_reports())
+        self.assertEqual(len(aligned), 1)
+        np.testing.assert_allclose(yaw_degrees(aligned.quaternions), [42.], atol=1e-6)
+
+    def test_load_aligned_arrays(self):
+        """survey_analyse interpolates the stored BNO08x reports at the GPS epochs"""
+        db = os.path.join(tempfile.mkdtemp(), "survey.db")
+        conn = sqlite3.connect(db)
+        create_table_if_not_exists(conn)
+        reports.create_table_if_not_exists(conn)
+        conn.executemany(reports.INSERT_STMT, [
+            reports.report_row(tuple(v), int(t)) for t, v in zip(self.TIMESTAMPS_US, self.VALUES.tolist())
+        ])
+        conn.commit()
+        for ms in (150, 250):
+            timestamp = from_epoch_ms(T0_NS // 1_000_000 + ms)
+            append_measure((None, None, None, None), GPSPoint(timestamp, 43.7, 5.4, 300.), conn)
+
+        aligned = load_aligned_arrays(conn, None, None, latency_offset=0.)
+
+        np.testing.assert_allclose(yaw_degrees(aligned.quaternions), [7.5, 12.5], atol=1e-6)
+
+
+class TestOrientationBuffer(unittest.TestCase):
+    def buffer(self, lookback: float = 2.) -> OrientationBuffer:
+        buffer = OrientationBuffer(lookback, max_gap=0.1)
+        for i, q in enumerate(yaw_quaternions(np.arange(0, 100))):
+            buffer.push(T0_NS + i * 10_000_000, tuple(q))
+        return buffer
+
+    @parameterized.expand([
+        ("on_sample", 20_000_000, 2.),
+        ("between_samples", 25_000_000, 2.5),
+    ])
+    def test_at(self, name, offset_ns, expected_yaw):
+        quaternion = self.buffer().at(T0_NS + offset_ns)
+        self.assertAlmostEqual(yaw_degrees([quaternion])[0], expected_yaw, places=6)
+
+    @parameterized.expand([
+        ("before", -1),
+        ("after", 990_000_001),
+    ])
+    def test_not_surrounded(self, name, offset_ns):
+        self.assertIsNone(self.buffer().at(T0_NS + offset_ns))
+
+    def test_lookback(self):
+        buffer = self.buffer(lookback=0.5)
+        self.assertEqual(len(buffer), 51)
+        self.assertIsNone(buffer.at(T0_NS + 100_000_000))
+
+
+if __name__ == '__main__':
+    unittest.main()
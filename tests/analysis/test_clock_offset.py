@@ -0,0 +1,101 @@
+import sqlite3
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+from scipy.spatial.transform import Rotation as R
+
+from bok_drone_onboard_system.analysis.clock_offset import estimate_clock_offset, cross_correlation_offset, \
+    ClockOffset
+from bok_drone_onboard_system.bno.data.reports import BNOReports
+from bok_drone_onboard_system.survey.data import SurveyArrays
+from bok_drone_onboard_system.survey.data.metadata import set_metadata, CLOCK_OFFSET_KEY
+from bok_drone_onboard_system.survey_analyse import stored_latency_offset
+
+T0_NS = 1_756_033_153_000_000_000
+DT = 0.001
+
+
+def walk(duration: float = 120., seed: int = 1) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    A 1 m/s walk with a smoothly varying turning rate, sampled every DT
+    :return: times, heading (clockwise from north) and (x, y) in meters
+    """
+    rng = np.random.default_rng(seed)
+    times = np.arange(0, duration, DT)
+    knots = np.arange(0, duration + 2, 2.)
+    heading = np.cumsum(np.interp(times, knots, rng.normal(0, 0.6, len(knots)))) * DT
+    xy = np.column_stack((np.cumsum(np.sin(heading)), np.cumsum(np.cos(heading)))) * DT
+    return times, heading, xy
+
+
+def survey_and_reports(offset: float) -> tuple[SurveyArrays, BNOReports]:
+    """
+    GPS at 10Hz, BNO08x at 100Hz, with BNO08x timestamps late by offset seconds
+    """
+    times, heading, xy = walk()
+    gps = np.arange(0, len(times), 100)
+    positions = np.column_stack((
+        43.7 + xy[gps, 1] / 111_000,
+        5.4 + xy[gps, 0] / (111_000 * np.cos(np.radians(43.7))),
+        np.full(len(gps), 300.),
+    ))
+    survey = SurveyArrays(T0_NS + np.rint(times[gps] * 1e9).astype(np.int64), np.zeros((len(gps), 4)), positions)
+
+    imu = np.arange(0, len(times), 10)
+    values = np.zeros((len(imu), 13))
+    values[:, 9:13] = R.from_euler('z', -heading[imu, None]).as_quat()
+    timestamps_us = (T0_NS + np.rint((times[imu] + offset) * 1e9).astype(np.int64)) // 1000
+    return survey, BNOReports(timestamps_us, values)
+
+
+class TestClockOffset(unittest.TestCase):
+    @parameterized.expand([
+        ("late_imu", 0.37),
+        ("early_imu", -0.255),
+        ("synchronized", 0.),
+    ])
+    def test_estimate_clock_offset(self, name, offset):
+        survey, bno_reports = survey_and_reports(offset)
+
+        clock_offset = estimate_clock_offset(survey, bno_reports)
+
+        self.assertAlmostEqual(clock_offset.offset, offset, delta=0.005)
+        self.assertGreater(clock_offset.confidence, 0.9)
+
+    @parameterized.expand([("nan", np.nan), ("zero", 0.)])
+    def test_undefined_quaternions_ignored(self, name, value):
+        survey, bno_reports = survey_and_reports(0.37)
+        bno_reports.quaternion[:5] = value
+
+        clock_offset = estimate_clock_offset(survey, bno_reports)
+
+        self.assertAlmostEqual(clock_offset.offset, 0.37, delta=0.005)
+
+    def test_uncorrelated_signals(self):
+        rng = np.random.default_rng(0)
+        timestamps_ns = T0_NS + np.arange(0, 10_000) * 10_000_000
+        clock_offset = cross_correlation_offset(
+            timestamps_ns, rng.normal(size=10_000), timestamps_ns, rng.normal(size=10_000)
+        )
+        self.assertLess(clock_offset.confidence, 0.1)
+
+    def test_not_enough_samples(self):
+        with self.assertRaises(ValueError):
+            cross_correlation_offset(np.array([T0_NS]), np.array([1.]), np.array([T0_NS]), np.array([1.]))
+
+    @parameterized.expand([
+        ("confident", 0.8, 0.12),
+        ("not_confident", 0.1, 0.),
+    ])
+    def test_stored_latency_offset(self, name, confidence, expected):
+        conn = sqlite3.connect(":memory:")
+        self.assertEqual(stored_latency_offset(conn), 0.)
+
+        set_metadata(conn, CLOCK_OFFSET_KEY, ClockOffset(0.12, confidence).to_dict())
+
+        self.assertEqual(stored_latency_offset(conn), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,10 @@ import unittest
 from parameterized import parameterized
 import pyproj
 from bok_drone_onboard_system.survey.gps import GPSPoint
-from bok_drone_onboard_system.analysis.gps import wgs84_to_utm34n
+import numpy as np
+from bok_drone_onboard_system.analysis.gps import (
+    wgs84_to_utm34n, wgs84_to_utm34n_array, wgs84_to_utm, wgs84_to_utm_array, get_transformer, utm_epsg, utm_epsg_for
+)
 
 
 class TestGPSConversion(unittest.TestCase):
@@ -59,6 +62,69 @@ class TestGPSConversion(unittest.TestCase):
             self.assertAlmostEqual(y1, y2, delta=0.001)  # Should be very close
             self.assertEqual(z1, point.altitude)  # Altitude should remain unchanged
 
+    def test_wgs84_to_utm34n_array_matches_single(self):
+        """Test that the array conversion matches the single point one."""
+        positions = np.array([
+            (60.0, 20.0, 100.0),
+            (55.0, 25.0, 200.0),
+            (50.0, 30.0, 300.0),
+        ])
+
+        results = wgs84_to_utm34n_array(positions)
+
+        self.assertEqual(results.shape, (3, 3))
+        for (lat, lon, alt), result in zip(positions, results):
+            expected = wgs84_to_utm34n(GPSPoint(timestamp=0, latitude=lat, longitude=lon, altitude=alt))
+            np.testing.assert_array_almost_equal(result, expected, decimal=6)
+
+
+class TestTransformerRegistry(unittest.TestCase):
+    """Test cases for the cached, zone aware, transformers."""
+
+    def test_get_transformer_is_cached(self):
+        self.assertIs(get_transformer(4326, 32634), get_transformer(4326, 32634))
+        self.assertIsNot(get_transformer(4326, 32634), get_transformer(4326, 32635))
+
+    @parameterized.expand([
+        # latitude, longitude, expected EPSG
+        ("athens", 37.98, 23.73, 32634),
+        ("marseille", 43.30, 5.37, 32631),
+        ("zone_edge", 45.0, 24.0, 32635),
+        ("antimeridian", 10.0, 180.0, 32601),
+        ("santiago", -33.45, -70.67, 32719),
+    ])
+    def test_utm_epsg(self, name, latitude, longitude, expected):
+        self.assertEqual(utm_epsg(latitude, longitude), expected)
+
+    def test_utm_epsg_for_data_set(self):
+        positions = np.array([(43.7, 5.46, 300.), (43.7, 5.47, 300.), (43.7, 6.01, 300.)])
+        self.assertEqual(utm_epsg_for(positions), 32631)
+
+    def test_utm_epsg_for_empty_data_set(self):
+        with self.assertRaises(ValueError):
+            utm_epsg_for(np.empty((0, 3)))
+
+    def test_wgs84_to_utm_auto_zone(self):
+        """Test that the automatic zone matches a direct pyproj conversion."""
+        point = GPSPoint(timestamp=0, latitude=43.737672206, longitude=5.462569945, altitude=307.6388)
+        transformer = pyproj.Transformer.from_crs(4326, 32631, always_xy=True)
+
+        x, y, z = wgs84_to_utm(point)
+        expected_x, expected_y = transformer.transform(point.longitude, point.latitude)
+
+        self.assertAlmostEqual(x, expected_x, delta=0.001)
+        self.assertAlmostEqual(y, expected_y, delta=0.001)
+        self.assertEqual(z, point.altitude)
+
+    def test_wgs84_to_utm_array_auto_zone(self):
+        positions = np.array([(43.7376, 5.4625, 307.6), (43.7377, 5.4626, 307.7)])
+
+        results = wgs84_to_utm_array(positions)
+
+        for (lat, lon, alt), result in zip(positions, results):
+            expected = wgs84_to_utm(GPSPoint(timestamp=0, latitude=lat, longitude=lon, altitude=alt), 32631)
+            np.testing.assert_array_almost_equal(result, expected, decimal=6)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+import unittest
+
+from parameterized import parameterized
+
+from benchmarks.compare import compare, load_stats, main, Comparison
+
+
+def write_report(path: str, medians: dict[str, float]) -> str:
+    benchmarks = [{"fullname": name, "stats": {"min": m * 0.9, "max": m * 1.5, "mean": m * 1.1, "median": m}}
+                  for name, m in medians.items()]
+    with open(path, "w") as f:
+        json.dump({"benchmarks": benchmarks}, f)
+    return path
+
+
+class TestCompare(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.baseline = write_report(os.path.join(self.test_dir, "baseline.json"),
+                                     {"test_parse_llh[1k]": 0.004, "test_load_data[1k]": 0.010,
+                                      "test_append_measure[1k]": 0.007})
+
+    def test_load_stats(self):
+        self.assertEqual(load_stats(self.baseline)["test_load_data[1k]"], 0.010)
+        self.assertAlmostEqual(load_stats(self.baseline, "mean")["test_load_data[1k]"], 0.011)
+
+    def test_compare_new_and_missing(self):
+        report = compare({"a": 1., "b": 2.}, {"b": 3., "c": 1.})
+        self.assertEqual(report.comparisons, [Comparison("b", 2., 3.)])
+        self.assertEqual(report.new, ["c"])
+        self.assertEqual(report.missing, ["a"])
+        self.assertAlmostEqual(report.comparisons[0].change, 0.5)
+
+    @parameterized.expand([
+        ("unchanged", 1.0, 0),
+        ("within_threshold", 1.15, 0),
+        ("faster", 0.5, 0),
+        ("slower", 1.3, 1),
+    ])
+    def test_main(self, _, factor, expected):
+        current = write_report(os.path.join(self.test_dir, "current.json"),
+                               {"test_parse_llh[1k]": 0.004 * factor, "test_load_data[1k]": 0.010,
+                                "test_project_measure[1k]": 0.009})
+        self.assertEqual(main([self.baseline, current, "--threshold", "0.2"]), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
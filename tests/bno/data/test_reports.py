@@ -0,0 +1,66 @@
+import sqlite3
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from parameterized import parameterized
+
+from bok_drone_onboard_system.bno import MockBNO08X
+from bok_drone_onboard_system.bno.data.reports import (
+    create_table_if_not_exists, read_reports, report_row, load_reports, to_epoch_us, INSERT_STMT, VALUE_COLUMNS
+)
+
+
+class TestReports(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        create_table_if_not_exists(self.conn)
+        self.t0 = datetime(2025, 8, 24, 10, 59, 13, tzinfo=timezone.utc)
+        rows = []
+        for i in range(10):
+            values = tuple(float(i * 100 + c) for c in range(len(VALUE_COLUMNS)))
+            rows.append(report_row(values, to_epoch_us(self.t0 + timedelta(milliseconds=10 * i))))
+        self.conn.executemany(INSERT_STMT, rows)
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_read_reports_from_mock(self):
+        values = read_reports(MockBNO08X())
+        self.assertEqual(len(values), len(VALUE_COLUMNS))
+
+    @parameterized.expand([
+        ("naive", datetime(1970, 1, 1, 0, 0, 1, 5), 1_000_005),
+        ("utc", datetime(1970, 1, 1, 0, 0, 1, 5, tzinfo=timezone.utc), 1_000_005),
+        ("offset", datetime(1970, 1, 1, 1, 0, 1, 5, tzinfo=timezone(timedelta(hours=1))), 1_000_005),
+    ])
+    def test_to_epoch_us(self, name, timestamp, expected):
+        self.assertEqual(to_epoch_us(timestamp), expected)
+
+    def test_load_all_reports(self):
+        reports = load_reports(self.conn)
+        self.assertEqual(len(reports), 10)
+        self.assertEqual(reports.timestamps_us[1] - reports.timestamps_us[0], 10_000)
+        self.assertEqual(reports.acceleration.shape, (10, 3))
+        self.assertEqual(tuple(reports.gyro[1]), (103., 104., 105.))
+        self.assertEqual(tuple(reports.quaternion[2]), (209., 210., 211., 212.))
+
+    @parameterized.expand([
+        ("start_only", 30, None, 7),
+        ("end_only", None, 30, 3),
+        ("start_and_end", 25, 55, 3),
+    ])
+    def test_load_reports_between(self, name, start_ms, end_ms, expected_count):
+        start = None if start_ms is None else self.t0 + timedelta(milliseconds=start_ms)
+        end = None if end_ms is None else self.t0 + timedelta(milliseconds=end_ms)
+        self.assertEqual(len(load_reports(self.conn, start, end)), expected_count)
+
+    def test_duplicated_timestamp_is_ignored(self):
+        row = report_row(tuple([0.] * len(VALUE_COLUMNS)), to_epoch_us(self.t0))
+        self.conn.executemany(INSERT_STMT, [row])
+        self.assertEqual(len(load_reports(self.conn)), 10)
+        self.assertEqual(load_reports(self.conn).acceleration[0, 0], 0.)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import http.client
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+from parameterized import parameterized
+
+from bok_drone_onboard_system.metrics import Registry, Timer, prometheus_text, snapshot, StatusReporter, \
+    MetricsServer, stage_timer, count_error, instrument_writer
+from bok_drone_onboard_system.storage import BatchWriter
+
+
+def sample_registry() -> Registry:
+    registry = Registry()
+    registry.counter("bok_samples_total", "Acquired samples", ("source",)).labels("bno").inc(3)
+    count_error(registry, "gga", OSError("unplugged"))
+    count_error(registry, "gga", OSError("unplugged"))
+    registry.gauge("bok_depth", "Queue depth").labels().set_function(lambda: 7)
+    stage_timer(registry, "bno", "read").observe_ns(2_000_000)
+    stage_timer(registry, "bno", "read").observe_ns(4_000_000)
+    return registry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRegistry(unittest.TestCase):
+    def test_timer(self):
+        timer = Timer()
+        with timer.time():
+            pass
+        timer.observe_ns(3_000_000)
+        self.assertEqual(timer.count, 2)
+        self.assertAlmostEqual(timer.max, 0.003)
+        self.assertGreater(timer.total, 0.003)
+
+    def test_labels_are_cached(self):
+        registry = Registry()
+        family = registry.counter("c", "a counter", ("source",))
+        self.assertIs(family.labels("bno"), family.labels("bno"))
+        self.assertIs(registry.counter("c", "a counter", ("source",)), family)
+
+    @parameterized.expand([
+        ("wrong_kind", lambda r: r.gauge("c", "", ("source",))),
+        ("wrong_labels", lambda r: r.counter("c", "", ("source", "type"))),
+        ("missing_label", lambda r: r.counter("c", "", ("source",)).labels()),
+        ("wrong_child", lambda r: r.counter("c", "", ("source",)).add(Timer(), "bno")),
+    ])
+    def test_inconsistent_registration(self, _, register):
+        registry = Registry()
+        registry.counter("c", "a counter", ("source",))
+        with self.assertRaises(ValueError):
+            register(registry)
+
+    def test_prometheus_text(self):
+        text = prometheus_text(sample_registry())
+        self.assertIn('# TYPE bok_samples_total counter\nbok_samples_total{source="bno"} 3\n', text)
+        self.assertIn('bok_errors_total{source="gga",type="OSError"} 2\n', text)
+        self.assertIn('# TYPE bok_depth gauge\nbok_depth 7\n', text)
+        self.assertIn('# TYPE bok_stage_seconds summary\n', text)
+        self.assertIn('bok_stage_seconds_count{source="bno",stage="read"} 2\n', text)
+        self.assertIn('bok_stage_seconds_sum{source="bno",stage="read"} 0.006\n', text)
+        self.assertIn('bok_stage_seconds_max{source="bno",stage="read"} 0.004\n', text)
+
+    def test_label_escaping(self):
+        registry = Registry()
+        registry.counter("c", "a counter", ("path",)).labels('a"b\\c').inc()
+        self.assertIn('c{path="a\\"b\\\\c"} 1\n', prometheus_text(registry))
+
+    def test_snapshot(self):
+        self.assertEqual(snapshot(sample_registry()), {
+            "bok_samples_total{source=bno}": 3.,
+            "bok_errors_total{source=gga,type=OSError}": 2.,
+            "bok_depth": 7,
+            "bok_stage_seconds{source=bno,stage=read}": {"count": 2, "mean_ms": 3., "max_ms": 4.},
+        })
+
+
+class TestStatusReporter(unittest.TestCase):
+    def test_rates(self):
+        registry = sample_registry()
+        clock = FakeClock()
+        reporter = StatusReporter(registry, clock=clock)
+        self.assertEqual(reporter.status()["rates"], {})
+
+        registry.counter("bok_samples_total", "Acquired samples", ("source",)).labels("bno").inc(20)
+        clock.now += 10
+        status = json.loads(reporter.status_line())
+        self.assertEqual(status["rates"]["bok_samples_total{source=bno}"], 2.)
+        self.assertEqual(status["rates"]["bok_errors_total{source=gga,type=OSError}"], 0.)
+        self.assertEqual(status["metrics"]["bok_samples_total{source=bno}"], 23.)
+
+    def test_emits_periodically(self):
+        lines = []
+        with StatusReporter(sample_registry(), interval=0.01, emit=lines.append):
+            while len(lines) < 2:
+                time.sleep(0.005)
+        self.assertIn("bok_depth", json.loads(lines[0])["metrics"])
+
+
+class TestMetricsServer(unittest.TestCase):
+    def test_http(self):
+        with MetricsServer(sample_registry(), "127.0.0.1:0") as server:
+            url = f"http://{server.address}"
+            with urllib.request.urlopen(f"{url}/metrics") as response:
+                self.assertTrue(response.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+                self.assertIn('bok_samples_total{source="bno"} 3', response.read().decode())
+            with urllib.request.urlopen(f"{url}/status") as response:
+                self.assertEqual(json.load(response)["bok_depth"], 7)
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{url}/other")
+
+    def test_unix_socket(self):
+        path = os.path.join(tempfile.mkdtemp(), "metrics.sock")
+        with MetricsServer(sample_registry(), path):
+            connection = http.client.HTTPConnection("localhost")
+            connection.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.sock.connect(path)
+            connection.request("GET", "/metrics")
+            response = connection.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertIn("bok_stage_seconds_count", response.read().decode())
+            connection.close()
+        self.assertFalse(os.path.exists(path))
+
+
+class TestWriterMetrics(unittest.TestCase):
+    def test_instrument_writer(self):
+        db = os.path.join(tempfile.mkdtemp(), "metrics.db")
+        sqlite3.connect(db).execute("CREATE TABLE t (a INTEGER)").connection.close()
+        registry = Registry()
+        writer = BatchWriter(db, "INSERT INTO t VALUES (?)", batch_size=10, flush_interval=0.01)
+        instrument_writer(registry, "bno", writer)
+        with writer:
+            for i in range(25):
+                writer.put((i,))
+
+        metrics = snapshot(registry)
+        self.assertEqual(metrics["bok_writer_rows_total{writer=bno,state=written}"], 25)
+        self.assertEqual(metrics["bok_writer_rows_total{writer=bno,state=dropped}"], 0)
+        self.assertEqual(metrics["bok_writer_queue_depth{writer=bno}"], 0)
+        self.assertEqual(metrics["bok_stage_seconds{source=bno,stage=insert}"]["count"], writer.stats.flushes)
+        self.assertEqual(metrics["bok_stage_seconds{source=bno,stage=commit}"]["count"], writer.stats.flushes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import sqlite3
+from unittest import TestCase
+
+import numpy as np
+from parameterized import parameterized
+from scipy.spatial.transform import Rotation as R
+
+from bok_drone_onboard_system.experiments.vector_error import optimal_v_nat
+from bok_drone_onboard_system.positioner import Vector
+from bok_drone_onboard_system.positioner.calibration import calibrate, rotation_matrices, axis_residual
+from bok_drone_onboard_system.positioner.projector import calculate_pole_end_positions
+from bok_drone_onboard_system.survey.data.metadata import set_metadata, POLE_AXIS_KEY
+from bok_drone_onboard_system.survey_analyse import stored_pole_axis
+from tests.positioner.test_resources import load_quaternions
+
+
+def turning_pole(axis, world_direction, n: int = 500, noise_deg: float = 0.5, seed: int = 0) -> np.ndarray:
+    """
+    Quaternions of a BNO08x on a pole turned around its axis, which keeps pointing to world_direction
+    """
+    rng = np.random.default_rng(seed)
+    axis = np.asarray(axis, dtype=float) / np.linalg.norm(axis)
+    world_direction = np.asarray(world_direction, dtype=float) / np.linalg.norm(world_direction)
+    to_world, _ = R.align_vectors([world_direction], [axis])
+    spins = R.from_rotvec(world_direction * rng.uniform(0, 2 * np.pi, (n, 1)))
+    noise = R.from_rotvec(np.radians(rng.normal(0, noise_deg, (n, 3))))
+    return (noise * spins * to_world).as_quat()
+
+
+class CalibrationTest(TestCase):
+    @parameterized.expand([
+        ("x_axis", (1, 0, 0), (0, 0, 1)),
+        ("tilted", (0.9, 0.1, -0.3), (0.2, 0.5, 0.8)),
+        ("z_axis", (0, 0, 1), (1, 1, 0)),
+    ])
+    def test_calibrate(self, name, axis, world_direction):
+        calibration = calibrate(turning_pole(axis, world_direction), v_init=axis)
+
+        expected = np.array(axis) / np.linalg.norm(axis)
+        self.assertGreater(np.dot(calibration.axis, expected), np.cos(np.radians(0.5)))
+        self.assertAlmostEqual(np.linalg.norm(calibration.axis), 1.)
+        self.assertLess(calibration.residual, 2.)
+        self.assertEqual(calibration.n_quaternions, 500)
+
+    def test_axis_sign_follows_v_init(self):
+        quaternions = turning_pole((1, 0, 0), (0, 0, 1))
+        self.assertGreater(calibrate(quaternions, v_init=(1, 0, 0)).axis[0], 0)
+        self.assertLess(calibrate(quaternions, v_init=(-1, 0, 0)).axis[0], 0)
+
+    @parameterized.expand([("nan", np.nan), ("zero", 0.)])
+    def test_undefined_quaternions_ignored(self, name, value):
+        quaternions = np.vstack([[[value] * 4], turning_pole((1, 0, 0), (0, 0, 1), n=100)])
+        self.assertEqual(calibrate(quaternions).n_quaternions, 100)
+
+    def test_no_quaternions(self):
+        with self.assertRaises(ValueError):
+            calibrate(np.empty((0, 4)))
+
+    def test_reduces_residual_on_sample(self):
+        """On a recorded sample, the calibrated axis spreads less than the default (1, 0, 0)"""
+        quaternions = np.array(load_quaternions("90-north.txt"))
+        matrices = rotation_matrices(quaternions)
+        calibration = calibrate(quaternions)
+        self.assertLessEqual(calibration.residual, axis_residual(matrices, np.array([1., 0., 0.])))
+
+    def test_optimal_v_nat(self):
+        quaternions = turning_pole((0.9, 0.1, -0.3), (0.2, 0.5, 0.8))
+        v_nat = optimal_v_nat(quaternions.tolist(), v_init=Vector(1, 0, 0))
+        np.testing.assert_allclose(v_nat.np, calibrate(quaternions).axis)
+
+    def test_projection_with_calibrated_axis(self):
+        """With the calibrated axis, all the projections of the turning pole end at the same point"""
+        quaternions = turning_pole((0.9, 0.1, -0.3), (0, 0, 1), noise_deg=0.)
+        positions = np.zeros((len(quaternions), 3))
+        calibration = calibrate(quaternions, v_init=(1, 0, 0))
+
+        projections = calculate_pole_end_positions(quaternions, positions, 2., v_nat=calibration.axis)
+
+        np.testing.assert_allclose(projections, np.tile([0., 0., 2.], (len(quaternions), 1)), atol=1e-9)
+
+    def test_stored_pole_axis(self):
+        conn = sqlite3.connect(":memory:")
+        self.assertIsNone(stored_pole_axis(conn))
+
+        calibration = calibrate(turning_pole((0, 1, 0), (0, 0, 1)), v_init=(0, 1, 0))
+        set_metadata(conn, POLE_AXIS_KEY, calibration.to_dict())
+
+        np.testing.assert_allclose(stored_pole_axis(conn), calibration.axis)
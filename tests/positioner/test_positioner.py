@@ -2,8 +2,10 @@ from unittest import TestCase
 
 import numpy as np
 from parameterized import parameterized
+from scipy.spatial.transform import Rotation as R
 
-from bok_drone_onboard_system.positioner import Vector, vector_from_quaternion
+from bok_drone_onboard_system.positioner import Vector, vector_from_quaternion, VectorArray, Position, PositionArray, \
+    vectors_from_quaternions, rotate_by_quaternions, rotate_vector
 from tests.positioner.test_resources import load_quaternions
 
 
@@ -45,3 +47,106 @@ class PositionerTest(TestCase):
 
         for i in range(3):
             self.assertLessEqual(self.average_from_sample(fname)['stddevs'][i], 0.05)
+
+
+class VectorArrayTest(TestCase):
+    VECTORS = [Vector(1, 0, 0), Vector(0, 2, 0), Vector(1, 1, 1), Vector(-3, 0, 4)]
+
+    def test_same_results_as_vectors(self):
+        """Each array operation gives the per object results"""
+        vectors = VectorArray.from_vectors(self.VECTORS)
+        other = Vector(0.5, -1, 2)
+
+        np.testing.assert_allclose(vectors.norm(), [v.norm() for v in self.VECTORS])
+        np.testing.assert_allclose(vectors.dot(other), [v.dot(other) for v in self.VECTORS])
+        np.testing.assert_allclose(vectors.colinearity(other), [v.colinearity(other) for v in self.VECTORS])
+        np.testing.assert_allclose((vectors + other).values, [(v + other).np for v in self.VECTORS])
+        np.testing.assert_allclose((vectors * 2.5).values, [(v * 2.5).np for v in self.VECTORS])
+        np.testing.assert_allclose((vectors / 2).values, [(v / 2).np for v in self.VECTORS])
+        np.testing.assert_allclose(vectors.mean().np, (sum(self.VECTORS) / len(self.VECTORS)).np)
+
+    def test_element_wise(self):
+        vectors = VectorArray.from_vectors(self.VECTORS)
+        np.testing.assert_allclose((vectors + vectors).values, vectors.values * 2)
+        np.testing.assert_allclose(vectors.colinearity(vectors), np.zeros(4), atol=1e-12)
+        np.testing.assert_allclose((vectors * np.array([1, 2, 3, 4])).norm(), vectors.norm() * [1, 2, 3, 4])
+
+    def test_container(self):
+        vectors = VectorArray.from_vectors(self.VECTORS)
+        self.assertEqual(len(vectors), 4)
+        self.assertIsInstance(vectors[1], Vector)
+        self.assertEqual((vectors[1].x, vectors[1].y, vectors[1].z), (0, 2, 0))
+        self.assertEqual(len(vectors[1:3]), 2)
+        self.assertEqual([v.norm() for v in vectors], [v.norm() for v in self.VECTORS])
+        self.assertIs(sum([vectors]), vectors)
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            Vector(1, 0, 0).w = 1
+        with self.assertRaises(AttributeError):
+            Position(1, 0, 0).w = 1
+
+
+class PositionArrayTest(TestCase):
+    def test_plus_and_distance(self):
+        p_0 = Position(1, 2, 3)
+        vectors = VectorArray([[1, 0, 0], [0, 3, 4]])
+
+        positions = p_0 + vectors
+
+        self.assertIsInstance(positions, PositionArray)
+        np.testing.assert_allclose(positions.distance_to(p_0), [1, 5])
+        np.testing.assert_allclose((positions + Vector(1, 1, 1)).values, [[3, 3, 4], [2, 6, 8]])
+        np.testing.assert_allclose(positions.distance_to(positions), [0, 0])
+        np.testing.assert_allclose(positions.mean().np, [1.5, 3.5, 5])
+        self.assertEqual(positions[1].distance_to(p_0), 5)
+
+
+class BatchRotationTest(TestCase):
+    @parameterized.expand([
+        ("scipy_single", 1),
+        ("scipy_batch", 10),
+        ("numpy_batch", 300),
+    ])
+    def test_vectors_from_quaternions(self, name, n):
+        """Same results as scipy, for one or several local directions, on both kernels"""
+        rng = np.random.default_rng(n)
+        quaternions = rng.normal(size=(n, 4))
+        directions = np.array([[1., 0., 0.], [0., 0.5, 2.]])
+        rotations = R.from_quat(quaternions)
+
+        single = vectors_from_quaternions(quaternions, directions[1])
+        several = vectors_from_quaternions(quaternions, directions)
+
+        self.assertEqual(single.shape, (n, 3))
+        self.assertEqual(several.shape, (n, 2, 3))
+        np.testing.assert_allclose(single, rotations.apply(directions[1]), atol=1e-12)
+        for k in range(2):
+            np.testing.assert_allclose(several[:, k], rotations.apply(directions[k]), atol=1e-12)
+
+    def test_empty(self):
+        self.assertEqual(vectors_from_quaternions(np.empty((0, 4)), [1., 0., 0.]).shape, (0, 3))
+
+    def test_rotate_by_quaternions_per_vector(self):
+        rng = np.random.default_rng(0)
+        quaternions, vectors = rng.normal(size=(5, 4)), rng.normal(size=(5, 3))
+        expected = [R.from_quat(q).apply(v) for q, v in zip(quaternions, vectors)]
+        np.testing.assert_allclose(rotate_by_quaternions(quaternions, vectors), expected, atol=1e-12)
+
+    @parameterized.expand([
+        ("scipy_batch", 10),
+        ("numpy_batch", 300),
+    ])
+    def test_zero_quaternion(self, name, n):
+        quaternions = np.tile([0.1, -0.4, 0.3, 0.8], (n, 1))
+        quaternions[n // 2] = 0.
+        with self.assertRaises(ValueError):
+            vectors_from_quaternions(quaternions, [1., 0., 0.])
+        with self.assertRaises(ValueError):
+            vector_from_quaternion((0., 0., 0., 0.), Vector(1., 0., 0.))
+
+    def test_vector_from_quaternion(self):
+        q = (0.1, -0.4, 0.3, 0.8)
+        v = vector_from_quaternion(q, Vector(0.5, 1, -2))
+        np.testing.assert_allclose(v.np, R.from_quat(q).apply([0.5, 1, -2]), atol=1e-12)
+        np.testing.assert_allclose(rotate_vector(q, (0.5, 1, -2)), v.np)
@@ -4,7 +4,7 @@ import numpy as np
 from parameterized import parameterized
 
 from bok_drone_onboard_system.positioner import Vector, Position
-from bok_drone_onboard_system.positioner.projector import calculate_pole_end_position
+from bok_drone_onboard_system.positioner.projector import calculate_pole_end_position, calculate_pole_end_positions
 from tests.positioner.test_resources import load_quaternions
 
 
@@ -83,4 +83,27 @@ class ProjectorTest(TestCase):
             
             # Check that the distance is close to the pole length
             self.assertAlmostEqual(distance, pole_length, delta=0.01,
-                                  msg=f"Distance between A and B should be {pole_length} for {fname}")
\ No newline at end of file
+                                  msg=f"Distance between A and B should be {pole_length} for {fname}")
+
+    @parameterized.expand([
+        "flat-east.txt",
+        "45-north.txt",
+        "135-north.txt",
+    ])
+    def test_calculate_pole_end_positions_matches_single(self, fname):
+        """The batch version gives the same positions as the single one"""
+        quaternions = np.array(load_quaternions(fname))
+        utm_positions = np.column_stack((
+            100.0 + np.arange(len(quaternions)),
+            np.full(len(quaternions), 200.0),
+            np.full(len(quaternions), 50.0),
+        ))
+
+        results = calculate_pole_end_positions(quaternions, utm_positions, 2.57)
+
+        self.assertEqual(results.shape, (len(quaternions), 3))
+        for q, p, r in zip(quaternions, utm_positions, results):
+            np.testing.assert_array_almost_equal(r, calculate_pole_end_position(tuple(q), tuple(p), 2.57))
+
+    def test_calculate_pole_end_positions_empty(self):
+        self.assertEqual(calculate_pole_end_positions(np.empty((0, 4)), np.empty((0, 3)), 2.0).shape, (0, 3))
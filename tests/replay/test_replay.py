@@ -0,0 +1,334 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from parameterized import parameterized
+from serial import Serial
+
+from bok_drone_onboard_system.bno.data import reports
+from bok_drone_onboard_system.replay import ReplayClock, FaultInjector, ReplayBNO08X, FakeSerialPort, LLHServer, \
+    survey_sentences, read_nmea_log, llh_records_lines, read_llh_log
+from bok_drone_onboard_system.replay.nmea import gga_sentence
+from bok_drone_onboard_system.replay.timing import replay_lines
+from bok_drone_onboard_system.survey.data import create_table_if_not_exists, append_measure, llh, TABLE_NAME
+from bok_drone_onboard_system.survey.emlid_reader import parse_llh, stream_from_emlid_llh
+from bok_drone_onboard_system.survey.gps import GPSPoint, GGAQuality
+from bok_drone_onboard_system.survey.ingest import IngestEngine
+from bok_drone_onboard_system.survey.nmea import parse_sentence, GGA, RMC
+from tests.survey.test_ingest import LLH_LINES
+from tests.survey.test_nmea import GGA_FIX, ZDA_SENTENCE, GSV_SENTENCE
+
+T0 = datetime(2025, 8, 24, 10, 59, 13, 800000, tzinfo=timezone.utc)
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 100.
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def recorded_db(path: str, n: int = 50):
+    """
+    n survey records at 10Hz, with their LLH solutions, and BNO08x reports at 100Hz
+    """
+    conn = sqlite3.connect(path)
+    create_table_if_not_exists(conn)
+    llh.create_table_if_not_exists(conn)
+    reports.create_table_if_not_exists(conn)
+    for i in range(n):
+        timestamp = T0 + timedelta(milliseconds=100 * i)
+        append_measure((0., 0., 0., 1.), GPSPoint(timestamp, 43.7 + i * 1e-6, -5.46, 307.6), conn)
+        conn.execute(llh.INSERT_STMT, (int(timestamp.timestamp() * 1000), 43.7 + i * 1e-6, -5.46, 307.6,
+                                       1, 11, 0.068, 0.11, 0.24, 1.8, 0.))
+    t0_us = reports.to_epoch_us(T0)
+    for i in range(n * 10):
+        conn.execute(reports.INSERT_STMT, reports.report_row((float(i),) * 9 + (0., 0., 0., 1.), t0_us + i * 10_000))
+    conn.commit()
+    conn.close()
+
+
+class TestReplayClock(unittest.TestCase):
+    @parameterized.expand([
+        ("real_time", 1., 0.5),
+        ("accelerated", 10., 0.05),
+        ("unthrottled", 0., 0.),
+    ])
+    def test_delay(self, name, speed, expected):
+        fake_time = FakeTime()
+        clock = ReplayClock(speed, clock=fake_time)
+        clock.start(1_000_000_000)
+
+        self.assertAlmostEqual(clock.delay(1_500_000_000), expected)
+        fake_time.now += 1.
+        self.assertEqual(clock.delay(1_500_000_000), 0.)
+
+    def test_recorded_ns(self):
+        fake_time = FakeTime()
+        clock = ReplayClock(4., clock=fake_time)
+        clock.start(1_000_000_000)
+        fake_time.now += 0.5
+        self.assertEqual(clock.recorded_ns(), 3_000_000_000)
+
+    def test_jitter_delays(self):
+        clock = ReplayClock(1., jitter=0.01, seed=1, clock=FakeTime())
+        clock.start(0)
+        delays = [clock.delay(0) for _ in range(1000)]
+        self.assertGreater(min(delays), -1e-12)
+        self.assertAlmostEqual(float(np.mean(delays)), 0.01 * np.sqrt(2 / np.pi), delta=0.001)
+
+
+class TestFaultInjector(unittest.TestCase):
+    def test_no_faults(self):
+        faults = FaultInjector()
+        line = b"$GNGGA,1*00\r\n"
+        self.assertFalse(any(faults.fails() or faults.drops() for _ in range(1000)))
+        self.assertEqual(faults.corrupt(line), line)
+
+    def test_rates(self):
+        faults = FaultInjector(fail_rate=0.1, drop_rate=0.2, seed=3)
+        for _ in range(10000):
+            faults.fails()
+            faults.drops()
+        self.assertAlmostEqual(faults.stats.failures / 10000, 0.1, delta=0.01)
+        self.assertAlmostEqual(faults.stats.drops / 10000, 0.2, delta=0.01)
+
+    def test_corrupt_keeps_line_ending(self):
+        faults = FaultInjector(corrupt_rate=1., seed=0)
+        corrupted = faults.corrupt(GGA_FIX.encode('ascii') + b"\r\n")
+
+        self.assertTrue(corrupted.endswith(b"\r\n"))
+        self.assertEqual(len(corrupted), len(GGA_FIX) + 2)
+        self.assertIsNone(parse_sentence(corrupted.decode('ascii').strip()))
+
+    def test_reproducible(self):
+        def draws(seed):
+            faults = FaultInjector(fail_rate=0.5, seed=seed)
+            return [faults.fails() for _ in range(100)]
+        self.assertEqual(draws(7), draws(7))
+
+    def test_replay_lines(self):
+        lines = [(i * 1_000_000, f"{i}\n".encode()) for i in range(100)]
+        written, failed = [], []
+
+        count = replay_lines(lines, written.append, failed.append, ReplayClock(0.),
+                             FaultInjector(fail_rate=0.1, drop_rate=0.1, seed=0))
+
+        self.assertEqual(count, len(written))
+        self.assertGreater(len(failed), 0)
+        self.assertLess(len(written) + len(failed), 100)
+
+
+class TestReplayBNO08X(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.test_dir, "recorded.db")
+        recorded_db(self.db)
+
+    def test_from_db_follows_clock(self):
+        fake_time = FakeTime()
+        bno = ReplayBNO08X.from_db(self.db, clock=ReplayClock(1., clock=fake_time))
+
+        self.assertEqual(len(bno), 500)
+        self.assertEqual(bno.acceleration, (0., 0., 0.))
+        fake_time.now += 0.105
+        self.assertEqual(bno.gyro, (10., 10., 10.))
+        self.assertEqual(bno.quaternion, (0., 0., 0., 1.))
+
+    @parameterized.expand([("loop", True), ("no_loop", False)])
+    def test_end_of_recording(self, name, loop):
+        fake_time = FakeTime()
+        bno = ReplayBNO08X.from_db(self.db, clock=ReplayClock(1., clock=fake_time), loop=loop)
+        bno.magnetic
+        fake_time.now += 5.02
+
+        if loop:
+            self.assertEqual(bno.magnetic, (2., 2., 2.))
+        else:
+            with self.assertRaises(OSError):
+                bno.magnetic
+
+    @parameterized.expand([("loop", True), ("no_loop", False)])
+    def test_unthrottled(self, name, loop):
+        """At speed 0, each sample returns the next recorded report"""
+        bno = ReplayBNO08X.from_db(self.db, clock=ReplayClock(0), loop=loop)
+
+        self.assertEqual([bno.acceleration[0] for _ in range(3)], [0., 1., 2.])
+        # the first gyro read completes the third sample
+        for _ in range(len(bno) - 2):
+            bno.gyro
+        if loop:
+            self.assertEqual(bno.gyro, (0., 0., 0.))
+        else:
+            with self.assertRaises(OSError):
+                bno.gyro
+
+    def test_unthrottled_reads_one_report_per_row(self):
+        """read_reports takes the four reports of an acquired row from the same recorded report"""
+        bno = ReplayBNO08X.from_db(self.db, clock=ReplayClock(0))
+
+        rows = [reports.read_reports(bno) for _ in range(3)]
+
+        self.assertEqual(rows, [(float(i),) * 9 + (0., 0., 0., 1.) for i in range(3)])
+
+    def test_from_bno_data(self):
+        from bok_drone_onboard_system.bno import data as bno_data
+        db = os.path.join(self.test_dir, "bno.db")
+        conn = sqlite3.connect(db)
+        bno_data.create_table_if_not_exists(conn)
+        conn.execute(bno_data.INSERT_STMT, ("2025-08-24T10:59:13.800+00:00", 0.1, 0.2, 0.3, 0.9))
+        conn.commit()
+        conn.close()
+
+        bno = ReplayBNO08X.from_db(db)
+
+        self.assertEqual(bno.quaternion, (0.1, 0.2, 0.3, 0.9))
+        self.assertTrue(np.all(np.isnan(bno.acceleration)))
+
+    def test_injected_failures(self):
+        bno = ReplayBNO08X.from_db(self.db, faults=FaultInjector(fail_rate=1.))
+        with self.assertRaises(OSError):
+            bno.quaternion
+
+
+class TestNMEAReplay(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def test_gga_sentence_round_trip(self):
+        kind, fix = parse_sentence(gga_sentence(T0, -33.45, -70.67, 545.4))
+
+        self.assertEqual(kind, GGA)
+        self.assertAlmostEqual(fix.latitude, -33.45)
+        self.assertAlmostEqual(fix.longitude, -70.67)
+        self.assertEqual(fix.altitude, 545.4)
+        self.assertEqual(fix.quality, GGAQuality.RTK_FIXED)
+        self.assertEqual(fix.time, T0.timetz())
+
+    def test_survey_sentences(self):
+        db = os.path.join(self.test_dir, "recorded.db")
+        recorded_db(db, n=3)
+
+        lines = survey_sentences(sqlite3.connect(db))
+
+        self.assertEqual(len(lines), 6)
+        self.assertEqual([parse_sentence(line.decode().strip())[0] for _, line in lines[:2]], [RMC, GGA])
+        self.assertEqual(lines[2][0] - lines[0][0], 100_000_000)
+
+    def test_read_nmea_log(self):
+        log = os.path.join(self.test_dir, "emlid.nmea")
+        with open(log, "w") as f:
+            f.write("\r\n".join([GSV_SENTENCE, ZDA_SENTENCE, GGA_FIX, GSV_SENTENCE, gga_sentence(
+                T0 + timedelta(seconds=1), 43.7, 5.4, 300.)]) + "\r\n")
+
+        lines = read_nmea_log(log)
+
+        self.assertEqual(len(lines), 5)
+        self.assertEqual([t for t, _ in lines][:3], [lines[2][0]] * 3)
+        self.assertEqual(lines[4][0] - lines[3][0], 1_000_000_000)
+
+    def test_fake_serial_port(self):
+        sentences = [gga_sentence(T0 + timedelta(milliseconds=100 * i), 43.7, 5.4, 300.) for i in range(20)]
+        lines = [(i * 100_000_000, (s + "\r\n").encode('ascii')) for i, s in enumerate(sentences)]
+
+        fake_port = FakeSerialPort(lines, ReplayClock(100.))
+        # opening the port flushes its input, as with a real device: open it before replaying
+        with Serial(fake_port.port, 115200, timeout=1) as serial:
+            fake_port.start()
+            received = [serial.readline().decode('ascii').strip() for _ in range(20)]
+        fake_port.stop()
+
+        self.assertEqual(received, sentences)
+
+
+class TestLLHReplay(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def test_llh_records_lines(self):
+        db = os.path.join(self.test_dir, "recorded.db")
+        recorded_db(db, n=3)
+
+        lines = llh_records_lines(sqlite3.connect(db))
+
+        entry = parse_llh(lines[1][1].decode())
+        self.assertEqual(entry.gps_point.timestamp, (T0 + timedelta(milliseconds=100)).replace(tzinfo=None))
+        self.assertAlmostEqual(entry.gps_point.latitude, 43.700001)
+        self.assertEqual(entry.n_satellites, 11)
+
+    def test_read_llh_log(self):
+        log = os.path.join(self.test_dir, "solution.LLH")
+        with open(log, "w") as f:
+            f.write("% RTKLIB header\n" + "\n".join(LLH_LINES) + "\n")
+
+        lines = read_llh_log(log)
+
+        self.assertEqual([line.decode().strip() for _, line in lines], LLH_LINES)
+        self.assertEqual(lines[1][0] - lines[0][0], 200_000_000)
+
+    def test_llh_server(self):
+        lines = [(i * 200_000_000, (line + "\n").encode('ascii')) for i, line in enumerate(LLH_LINES)]
+
+        with LLHServer(lines, speed=100.) as server:
+            entries = list(stream_from_emlid_llh(*server.address))
+
+        self.assertEqual([e.gps_point.timestamp for e in entries], [parse_llh(line).gps_point.timestamp
+                                                                   for line in LLH_LINES])
+
+    def test_llh_server_injected_failure(self):
+        lines = [(i * 200_000_000, (line + "\n").encode('ascii')) for i, line in enumerate(LLH_LINES)]
+
+        with LLHServer(lines, speed=0., faults=FaultInjector(fail_rate=1.)) as server:
+            entries = list(stream_from_emlid_llh(*server.address))
+
+        self.assertEqual(entries, [])
+
+
+class TestReplayIngestion(unittest.TestCase):
+    def test_ingest_replayed_session(self):
+        """The ingestion engine stores a replayed session, with no hardware"""
+        test_dir = tempfile.mkdtemp()
+        recorded = os.path.join(test_dir, "recorded.db")
+        recorded_db(recorded)
+        replayed = os.path.join(test_dir, "replayed.db")
+        conn = sqlite3.connect(recorded)
+        nmea_lines = survey_sentences(conn)
+        llh_lines = llh_records_lines(conn)
+        conn.close()
+
+        async def scenario(fake_port: FakeSerialPort, server: LLHServer):
+            engine = IngestEngine(
+                replayed,
+                open_bno=lambda: ReplayBNO08X.from_db(recorded, clock=ReplayClock(10.)),
+                bno_period=0.01,
+                open_serial=lambda: Serial(fake_port.port, 115200, timeout=0.1),
+                llh_address=server.address,
+                retry_delay=0.05,
+                writer_options={"flush_interval": 0.05},
+            )
+            task = asyncio.create_task(engine.run())
+            await asyncio.to_thread(fake_port.join, 5.)
+            await asyncio.sleep(0.3)
+            engine.stop()
+            await task
+
+        with FakeSerialPort(nmea_lines, ReplayClock(10.)) as fake_port, \
+                LLHServer(llh_lines, speed=10.) as server:
+            asyncio.run(scenario(fake_port, server))
+
+        conn = sqlite3.connect(replayed)
+        try:
+            self.assertGreater(conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0], 40)
+            self.assertEqual(conn.execute(f"SELECT COUNT(*) FROM {llh.TABLE_NAME}").fetchone()[0], 50)
+            self.assertGreater(conn.execute(f"SELECT COUNT(*) FROM {reports.TABLE_NAME}").fetchone()[0], 50)
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+
+from parameterized import parameterized
+
+from bok_drone_onboard_system.scheduler import FixedRateScheduler
+
+
+class FakeClock:
+    def __init__(self, now: float = 100.):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, duration: float):
+        self.now += duration
+
+
+class TestFixedRateScheduler(unittest.TestCase):
+    def scheduler(self, period: float, catch_up: bool = False) -> tuple[FixedRateScheduler, FakeClock]:
+        clock = FakeClock()
+        return FixedRateScheduler(period, catch_up=catch_up, clock=clock, sleep=clock.sleep), clock
+
+    def test_no_drift(self):
+        """Ticks are released on absolute deadlines, whatever the work duration"""
+        scheduler, clock = self.scheduler(0.01)
+        release_times = []
+        for i in range(100):
+            scheduler.wait()
+            release_times.append(clock.now)
+            clock.now += 0.003 + (i % 3) * 0.002
+
+        for i, t in enumerate(release_times):
+            self.assertAlmostEqual(t, 100. + i * 0.01, places=9)
+        self.assertAlmostEqual(scheduler.stats.achieved_hz(), 100., places=6)
+        self.assertEqual(scheduler.stats.overruns, 0)
+
+    @parameterized.expand([
+        ("skip", False, [0, 1, 4, 5], 2),
+        ("catch_up", True, [0, 1, 2, 3], 0),
+    ])
+    def test_overrun(self, name, catch_up, expected_ticks, expected_missed):
+        """A long piece of work either skips or catches up the missed ticks"""
+        scheduler, clock = self.scheduler(0.01, catch_up=catch_up)
+        ticks = [scheduler.wait(), scheduler.wait()]
+        clock.now += 0.035
+        ticks += [scheduler.wait(), scheduler.wait()]
+
+        self.assertEqual(ticks, expected_ticks)
+        self.assertEqual(scheduler.stats.overruns, 1 if not catch_up else 2)
+        self.assertEqual(scheduler.stats.missed_ticks, expected_missed)
+
+    def test_jitter_percentiles(self):
+        """Late releases are reported in the jitter percentiles"""
+        scheduler, clock = self.scheduler(0.01)
+        scheduler.wait()
+        for i in range(99):
+            clock.now += 0.0105 if i % 10 == 0 else 0.
+            scheduler.wait()
+
+        jitter = scheduler.stats.jitter_percentiles((50, 99))
+        self.assertAlmostEqual(jitter[50], 0., places=9)
+        self.assertAlmostEqual(jitter[99], 0.0005, places=6)
+
+    def test_reset(self):
+        """After a reset, the schedule restarts from the current time"""
+        scheduler, clock = self.scheduler(0.01)
+        scheduler.wait()
+        clock.now += 3
+        scheduler.reset()
+        self.assertEqual(scheduler.wait(), 0)
+        self.assertEqual(scheduler.wait(), 1)
+        self.assertAlmostEqual(clock.now, 103.01, places=9)
+        self.assertEqual(scheduler.stats.missed_ticks, 0)
+
+    def test_invalid_period(self):
+        with self.assertRaises(ValueError):
+            FixedRateScheduler(0)
+
+    def test_wait_async(self):
+        """In a task, ticks are released on the same schedule, without blocking the event loop"""
+        clock = FakeClock()
+        scheduler = FixedRateScheduler(0.01, clock=clock)
+
+        async def run():
+            ticks = [await scheduler.wait_async()]
+            clock.now += 0.035
+            ticks.append(await scheduler.wait_async())
+            return ticks
+
+        self.assertEqual(asyncio.run(run()), [0, 3])
+        self.assertEqual(scheduler.stats.overruns, 1)
+        self.assertEqual(scheduler.stats.missed_ticks, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
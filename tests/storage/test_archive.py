@@ -0,0 +1,83 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+from bok_drone_onboard_system.storage.archive import write_archive, iter_archive, read_archive, \
+    read_archive_metadata, read_archive_columns, detect_format, ArchiveWriter
+
+COLUMNS = ("timestamp_ns", "a", "b")
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    @staticmethod
+    def chunks(n: int = 25, chunk_size: int = 10) -> list[tuple[np.ndarray, np.ndarray]]:
+        timestamps = 1_756_033_153_000_000_000 + np.arange(n, dtype=np.int64) * 100_000_000
+        values = np.column_stack((np.arange(n) * 0.1, np.arange(n) * -2.))
+        values[3, 1] = np.nan
+        return [(timestamps[i:i + chunk_size], values[i:i + chunk_size]) for i in range(0, n, chunk_size)]
+
+    @parameterized.expand([
+        ("parquet", "parquet", "zstd"),
+        ("parquet_uncompressed", "parquet", None),
+        ("arrow", "arrow", "zstd"),
+        ("arrow_lz4", "arrow", "lz4"),
+    ])
+    def test_round_trip(self, name, fmt, compression):
+        path = os.path.join(self.test_dir, f"{name}.{fmt}")
+        chunks = self.chunks()
+
+        count = write_archive(path, COLUMNS, chunks, fmt, compression, metadata={"epsg": 32634, "axis": [1, 0, 0]})
+
+        self.assertEqual(count, 25)
+        self.assertEqual(detect_format(path), fmt)
+        self.assertEqual(read_archive_columns(path), list(COLUMNS))
+        self.assertEqual(read_archive_metadata(path), {"epsg": 32634, "axis": [1, 0, 0]})
+        timestamps, values = read_archive(path)
+        self.assertEqual(timestamps.dtype, np.int64)
+        np.testing.assert_array_equal(timestamps, np.concatenate([c[0] for c in chunks]))
+        np.testing.assert_array_equal(values, np.concatenate([c[1] for c in chunks]))
+
+    def test_chunks_are_row_groups(self):
+        import pyarrow.parquet as pq
+        path = os.path.join(self.test_dir, "chunks.parquet")
+        write_archive(path, COLUMNS, self.chunks(), "parquet")
+
+        self.assertEqual(pq.ParquetFile(path).num_row_groups, 3)
+        self.assertEqual([len(t) for t, _ in iter_archive(path, chunk_size=8)], [8, 8, 8, 1])
+
+    def test_chunks_are_record_batches(self):
+        path = os.path.join(self.test_dir, "chunks.arrow")
+        write_archive(path, COLUMNS, self.chunks(), "arrow")
+
+        self.assertEqual([len(t) for t, _ in iter_archive(path)], [10, 10, 5])
+
+    @parameterized.expand([("parquet",), ("arrow",)])
+    def test_empty(self, fmt):
+        path = os.path.join(self.test_dir, f"empty.{fmt}")
+        self.assertEqual(write_archive(path, COLUMNS, [], fmt), 0)
+
+        timestamps, values = read_archive(path)
+        self.assertEqual(values.shape, (0, 2))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            ArchiveWriter(os.path.join(self.test_dir, "x.csv"), COLUMNS, "csv")
+
+    def test_not_an_archive(self):
+        path = os.path.join(self.test_dir, "x.txt")
+        with open(path, "w") as f:
+            f.write("timestamp\n")
+        with self.assertRaises(ValueError):
+            detect_format(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
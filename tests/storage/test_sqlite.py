@@ -0,0 +1,209 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from parameterized import parameterized
+
+from bok_drone_onboard_system.storage.sqlite import (
+    open_connection, checkpoint, Checkpointer, table_exists, user_version, set_user_version, upgrade_schema
+)
+
+
+class TestOpenConnection(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.test_dir, "test.db")
+
+    def pragma(self, conn: sqlite3.Connection, name: str):
+        return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def test_pragmas(self):
+        conn = open_connection(self.db)
+        try:
+            self.assertEqual(self.pragma(conn, "journal_mode"), "wal")
+            self.assertEqual(self.pragma(conn, "synchronous"), 1)
+            self.assertEqual(self.pragma(conn, "temp_store"), 2)
+            self.assertEqual(self.pragma(conn, "cache_size"), -8192)
+            self.assertEqual(self.pragma(conn, "wal_autocheckpoint"), 1000)
+            conn.execute("CREATE TABLE t (x INTEGER)")
+            conn.commit()
+            self.assertEqual(self.pragma(conn, "page_size"), 4096)
+        finally:
+            conn.close()
+
+    @parameterized.expand([
+        ("off", "off", 0),
+        ("full", "FULL", 2),
+    ])
+    def test_synchronous(self, name, synchronous, expected):
+        conn = open_connection(self.db, synchronous=synchronous)
+        try:
+            self.assertEqual(self.pragma(conn, "synchronous"), expected)
+        finally:
+            conn.close()
+
+    def test_invalid_synchronous(self):
+        with self.assertRaises(ValueError):
+            open_connection(self.db, synchronous="SOMETIMES")
+
+    def test_without_wal(self):
+        conn = open_connection(self.db, wal=False)
+        try:
+            self.assertEqual(self.pragma(conn, "journal_mode"), "delete")
+        finally:
+            conn.close()
+
+    def test_page_size_of_existing_database_is_kept(self):
+        conn = open_connection(self.db, page_size=1024)
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.close()
+
+        conn = open_connection(self.db)
+        try:
+            self.assertEqual(self.pragma(conn, "page_size"), 1024)
+        finally:
+            conn.close()
+
+    def test_table_exists(self):
+        conn = open_connection(self.db)
+        try:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+            conn.execute("CREATE VIEW v AS SELECT x FROM t")
+            self.assertTrue(table_exists(conn, "t"))
+            self.assertFalse(table_exists(conn, "v"))
+            self.assertFalse(table_exists(conn, "missing"))
+        finally:
+            conn.close()
+
+    def test_invalid_checkpoint_mode(self):
+        conn = open_connection(self.db)
+        try:
+            with self.assertRaises(ValueError):
+                checkpoint(conn, "EVENTUALLY")
+        finally:
+            conn.close()
+
+
+class TestCheckpointer(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.test_dir, "test.db")
+
+    def wal_size(self) -> int:
+        wal = self.db + "-wal"
+        return os.path.getsize(wal) if os.path.exists(wal) else 0
+
+    def test_writer_commits_do_not_checkpoint(self):
+        conn = open_connection(self.db, wal_autocheckpoint=0)
+        conn.execute("CREATE TABLE t (x BLOB)")
+        for _ in range(60):
+            conn.executemany("INSERT INTO t VALUES (?)", [(b"x" * 1000,) for _ in range(100)])
+            conn.commit()
+        try:
+            # beyond the default autocheckpoint of 1000 pages, which would have reset the WAL
+            _, wal_pages, checkpointed = checkpoint(conn, "PASSIVE")
+            self.assertGreater(wal_pages, 1000)
+            self.assertEqual(checkpointed, wal_pages)
+        finally:
+            conn.close()
+
+    def test_final_checkpoint_truncates_wal(self):
+        conn = open_connection(self.db, wal_autocheckpoint=0)
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        with Checkpointer(self.db, interval=60) as checkpointer:
+            conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(1000)])
+            conn.commit()
+            self.assertGreater(self.wal_size(), 0)
+        try:
+            self.assertEqual(checkpointer.stats.checkpoints, 1)
+            self.assertEqual(checkpointer.stats.busy, 0)
+            self.assertEqual(self.wal_size(), 0)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone()[0], 1000)
+        finally:
+            conn.close()
+
+    def test_periodic_checkpoints(self):
+        conn = open_connection(self.db, wal_autocheckpoint=0)
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        checkpointer = Checkpointer(self.db, interval=0.01).start()
+        try:
+            for i in range(20):
+                conn.execute("INSERT INTO t VALUES (?)", (i,))
+                conn.commit()
+                checkpointer._stopped.wait(0.005)
+        finally:
+            checkpointer.stop()
+            conn.close()
+        self.assertGreater(checkpointer.stats.checkpoints, 1)
+
+    def test_journal_mode_kept(self):
+        conn = open_connection(self.db, wal=False)
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        try:
+            with Checkpointer(self.db, interval=0.01):
+                conn.execute("INSERT INTO t VALUES (1)")
+                conn.commit()
+        finally:
+            conn.close()
+        conn = sqlite3.connect(self.db)
+        try:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+        finally:
+            conn.close()
+
+    def test_stop_without_start(self):
+        Checkpointer(self.db).stop()
+
+
+class TestUpgradeSchema(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.calls = []
+
+    def tearDown(self):
+        self.conn.close()
+
+    def migrations(self, *versions: int) -> dict:
+        return {v: (lambda conn, v=v: self.calls.append((v, user_version(conn)))) for v in versions}
+
+    def test_migrations_run_in_order(self):
+        self.assertEqual(upgrade_schema(self.conn, self.migrations(3, 1, 2)), 3)
+
+        self.assertEqual(self.calls, [(1, 0), (2, 1), (3, 2)])
+        self.assertEqual(user_version(self.conn), 3)
+
+    def test_only_newer_migrations_run(self):
+        set_user_version(self.conn, 2)
+
+        self.assertEqual(upgrade_schema(self.conn, self.migrations(1, 2, 3)), 3)
+
+        self.assertEqual(self.calls, [(3, 2)])
+
+    @parameterized.expand([
+        ("current_is_latest", 2, []),
+        ("current_is_older", 1, [(2, 0)]),
+    ])
+    def test_current_version(self, name, current, expected_calls):
+        self.assertEqual(upgrade_schema(self.conn, self.migrations(2), current=current), 2)
+
+        self.assertEqual(self.calls, expected_calls)
+        self.assertEqual(user_version(self.conn), 2)
+
+    def test_stored_version_wins(self):
+        set_user_version(self.conn, 2)
+
+        self.assertEqual(upgrade_schema(self.conn, self.migrations(2), current=1), 2)
+
+        self.assertEqual(self.calls, [])
+
+    def test_empty_database(self):
+        self.assertEqual(upgrade_schema(self.conn, {}), 0)
+        self.assertEqual(user_version(self.conn), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from parameterized import parameterized
+
+from bok_drone_onboard_system.bno.data import create_table_if_not_exists, measure_row, INSERT_STMT, TABLE_NAME
+from bok_drone_onboard_system.storage import BatchWriter
+
+
+class TestBatchWriter(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.test_dir, "bno.db")
+        conn = sqlite3.connect(self.db)
+        create_table_if_not_exists(conn)
+        conn.close()
+
+    def count_rows(self) -> int:
+        conn = sqlite3.connect(self.db)
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def row(i: int) -> tuple:
+        return f"2025-08-24T10:59:{i // 1000:02d}.{i % 1000:03d}+00:00", 0.1, 0.2, 0.3, 0.4
+
+    @parameterized.expand([
+        ("single_batch", 10, 100),
+        ("several_batches", 250, 100),
+        ("batch_of_one", 5, 1),
+    ])
+    def test_all_rows_written_on_close(self, name, n_rows, batch_size):
+        """All queued rows are committed once the writer is closed"""
+        with BatchWriter(self.db, INSERT_STMT, batch_size=batch_size, flush_interval=10) as writer:
+            for i in range(n_rows):
+                self.assertTrue(writer.put(self.row(i)))
+
+        self.assertEqual(self.count_rows(), n_rows)
+        self.assertEqual(writer.stats.written, n_rows)
+        self.assertEqual(writer.stats.dropped, 0)
+        self.assertGreaterEqual(writer.stats.flushes, -(-n_rows // batch_size))
+
+    def test_flush_interval(self):
+        """Rows are committed after the flush interval, even if the batch is not full"""
+        writer = BatchWriter(self.db, INSERT_STMT, batch_size=1000, flush_interval=0.05).start()
+        try:
+            writer.put(measure_row((0.1, 0.2, 0.3, 0.4)))
+            deadline = time.monotonic() + 2
+            while writer.stats.written == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(self.count_rows(), 1)
+        finally:
+            writer.close()
+
+    def test_full_queue_drops(self):
+        """put never blocks, and counts rows that do not fit into the queue"""
+        writer = BatchWriter(self.db, INSERT_STMT, max_queue=3)
+        for i in range(5):
+            writer.put(self.row(i))
+        self.assertEqual(writer.queue_depth, 3)
+        self.assertEqual(writer.stats.enqueued, 3)
+        self.assertEqual(writer.stats.dropped, 2)
+
+        writer.start().close()
+        self.assertEqual(self.count_rows(), 3)
+
+    def test_failed_batch_does_not_stop_writer(self):
+        """A failing batch is counted and the writer keeps going"""
+        with BatchWriter(self.db, INSERT_STMT, batch_size=1) as writer:
+            writer.put(self.row(1))
+            writer.put(self.row(1))
+            writer.put(self.row(2))
+
+        self.assertEqual(self.count_rows(), 2)
+        self.assertEqual(writer.stats.failed, 1)
+
+    def test_close_after_writer_died_with_full_queue(self):
+        """close neither hangs nor hides the error when the writer thread died and the queue is full"""
+        conn = MagicMock()
+        conn.__exit__.return_value = False
+        conn.executemany.side_effect = RuntimeError("disk gone")
+        writer = BatchWriter(self.db, INSERT_STMT, batch_size=1, max_queue=3)
+        with patch.object(writer, "_connect", return_value=conn), self.assertLogs(level="ERROR"):
+            writer.start()
+            writer.put(self.row(0))
+            writer._thread.join(2)
+            self.assertFalse(writer._thread.is_alive())
+            for i in range(1, 5):
+                writer.put(self.row(i))
+            self.assertEqual(writer.queue_depth, 3)
+
+            with self.assertRaisesRegex(RuntimeError, "disk gone"):
+                writer.close()
+
+        conn.close.assert_called_once()
+        self.assertEqual(writer.stats.dropped, 1)
+
+    def test_wal_mode(self):
+        """The writer switches the database to WAL journal mode"""
+        with BatchWriter(self.db, INSERT_STMT, wal=True):
+            pass
+        conn = sqlite3.connect(self.db)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        conn.close()
+
+    def test_invalid_synchronous(self):
+        with self.assertRaises(ValueError):
+            BatchWriter(self.db, INSERT_STMT, synchronous="SOMETIMES")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+import errno
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from parameterized import parameterized
+from serial import SerialException
+
+from bok_drone_onboard_system.storage import gaps
+from bok_drone_onboard_system.supervisor import DeviceSupervisor, RetryPolicy, Gap, Stopped, classify_failure, \
+    TRANSIENT, DEVICE_LOST
+
+NO_DELAY = RetryPolicy(read_retries=3, reopen_delay=0., max_reopen_delay=0.)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_756_033_153.
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RecordingEvent(threading.Event):
+    """
+    A stop event recording the reopening delays instead of waiting for them
+    """
+    def __init__(self):
+        super().__init__()
+        self.waits = []
+
+    def wait(self, timeout: float | None = None) -> bool:
+        self.waits.append(timeout)
+        return self.is_set()
+
+
+class FlakyDevice:
+    """
+    Fail the reads with the given errors, then return the number of successful reads
+    """
+    def __init__(self, errors: list[Exception], clock: FakeClock):
+        self.errors = list(errors)
+        self.clock = clock
+        self.reads = 0
+        self.closed = False
+
+    def read(self) -> int:
+        self.clock.now += 0.01
+        if self.errors:
+            raise self.errors.pop(0)
+        self.reads += 1
+        return self.reads
+
+    def close(self):
+        self.closed = True
+
+
+class TestClassifyFailure(unittest.TestCase):
+    @parameterized.expand([
+        ("i2c_nack", OSError(errno.EREMOTEIO, "Remote I/O error"), TRANSIENT),
+        ("io_error", OSError(errno.EIO, "Input/output error"), TRANSIENT),
+        ("no_errno", OSError("injected failure"), TRANSIENT),
+        ("driver_packet", RuntimeError("No packet available"), TRANSIENT),
+        ("garbled", ValueError("bad line"), TRANSIENT),
+        ("no_device", OSError(errno.ENODEV, "No such device"), DEVICE_LOST),
+        ("no_address", OSError(errno.ENXIO, "No such device or address"), DEVICE_LOST),
+        ("unplugged", FileNotFoundError(errno.ENOENT, "No such file"), DEVICE_LOST),
+        ("serial", SerialException("device reports readiness to read but returned no data"), DEVICE_LOST),
+        ("unknown", KeyError("x"), DEVICE_LOST),
+    ])
+    def test_classify(self, _, error, expected):
+        self.assertEqual(classify_failure(error), expected)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_backoff(self):
+        policy = RetryPolicy(initial_backoff=100e-6, max_backoff=1e-3, reopen_delay=0.1, max_reopen_delay=0.3)
+        self.assertEqual([policy.read_backoff(i) for i in range(5)], [100e-6, 200e-6, 400e-6, 800e-6, 1e-3])
+        self.assertEqual([policy.reopen_backoff(i) for i in range(3)], [0.1, 0.2, 0.3])
+
+
+class TestDeviceSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sleeps = []
+        self.gaps = []
+        self.errors = []
+        self.reconnections = 0
+
+    def supervisor(self, devices: list[FlakyDevice | Exception], policy: RetryPolicy = NO_DELAY) -> DeviceSupervisor:
+        def open_device():
+            device = devices.pop(0)
+            if isinstance(device, Exception):
+                raise device
+            return device
+
+        def reconnected():
+            self.reconnections += 1
+
+        return DeviceSupervisor("bno", open_device, policy, on_error=self.errors.append, on_reconnect=reconnected,
+                                on_gap=self.gaps.append, clock=self.clock, sleep=self.sleeps.append)
+
+    def test_transient_failures_retried_in_place(self):
+        device = FlakyDevice([OSError(errno.EREMOTEIO, "Remote I/O error")] * 2, self.clock)
+        supervisor = self.supervisor([device])
+        self.assertEqual(supervisor.read(FlakyDevice.read), 1)
+
+        self.assertEqual(self.sleeps, [100e-6, 200e-6])
+        self.assertEqual(self.reconnections, 0)
+        self.assertEqual(len(self.errors), 2)
+        # no read succeeded before: the gap starts at the first failure
+        self.assertEqual(len(self.gaps), 1)
+        self.assertEqual(self.gaps[0].kind, TRANSIENT)
+        self.assertEqual(self.gaps[0].failures, 2)
+        self.assertAlmostEqual(self.gaps[0].duration, 0.02)
+        self.assertEqual(supervisor.stats.retries, 2)
+
+    def test_persistent_transient_failures_reopen(self):
+        first = FlakyDevice([OSError(errno.EIO, "Input/output error")] * 10, self.clock)
+        second = FlakyDevice([], self.clock)
+        supervisor = self.supervisor([first, second])
+        self.assertEqual(supervisor.read(FlakyDevice.read), 1)
+
+        self.assertIs(supervisor.device, second)
+        self.assertTrue(first.closed)
+        self.assertEqual(len(self.sleeps), NO_DELAY.read_retries)
+        self.assertEqual(self.reconnections, 1)
+        self.assertEqual(self.gaps[0].kind, DEVICE_LOST)
+        self.assertEqual(self.gaps[0].failures, NO_DELAY.read_retries + 1)
+
+    def test_lost_device_reopened_without_retry(self):
+        first = FlakyDevice([], self.clock)
+        second = FlakyDevice([], self.clock)
+        supervisor = self.supervisor([first, OSError(errno.ENODEV, "No such device"), second])
+        self.assertEqual(supervisor.read(FlakyDevice.read), 1)
+        last_read_at = self.clock.now
+
+        first.errors = [OSError(errno.ENODEV, "No such device")]
+        self.assertEqual(supervisor.read(FlakyDevice.read), 1)
+
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(self.reconnections, 1)
+        self.assertEqual(len(self.errors), 2)
+        # the gap spans from the last successful read
+        self.assertEqual(self.gaps,
+                         [Gap("bno", last_read_at, self.clock.now, 2, DEVICE_LOST, "[Errno 19] No such device")])
+        self.assertEqual(supervisor.stats.gaps, 1)
+
+    def test_failing_reads_delay_reopening(self):
+        """A device which opens but never reads is reopened after the doubling delays, not in a tight loop"""
+        policy = RetryPolicy(read_retries=0, reopen_delay=0.1, max_reopen_delay=0.3)
+        failing = [FlakyDevice([SerialException("returned no data")], self.clock) for _ in range(4)]
+        working = FlakyDevice([], self.clock)
+        supervisor = self.supervisor([*failing, working], policy)
+        supervisor.stopped = RecordingEvent()
+        self.assertEqual(supervisor.read(FlakyDevice.read), 1)
+
+        self.assertEqual(supervisor.stopped.waits, [0.1, 0.2, 0.3, 0.3])
+        self.assertEqual(self.reconnections, 4)
+        self.assertTrue(all(device.closed for device in failing))
+
+        # the delays start again from reopen_delay after a successful read
+        working.errors = [SerialException("returned no data")]
+        supervisor.stopped.waits.clear()
+        supervisor.open_device = [FlakyDevice([], self.clock)].pop
+        self.assertEqual(supervisor.read(FlakyDevice.read), 1)
+        self.assertEqual(supervisor.stopped.waits, [0.1])
+
+    def test_stop_interrupts_reopening(self):
+        supervisor = DeviceSupervisor("gga", lambda: (_ for _ in ()).throw(OSError(errno.ENOENT, "unplugged")),
+                                      RetryPolicy(reopen_delay=10., max_reopen_delay=10.))
+        result = []
+
+        def read():
+            try:
+                supervisor.read(FlakyDevice.read)
+            except Stopped as e:
+                result.append(e)
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        supervisor.stop()
+        thread.join(timeout=2)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(result), 1)
+
+
+class TestGapsStorage(unittest.TestCase):
+    def test_round_trip(self):
+        conn = gaps.create_table_if_not_exists(sqlite3.connect(os.path.join(tempfile.mkdtemp(), "gaps.db")))
+        stored = [
+            Gap("llh", 1_756_033_160.5, 1_756_033_163.25, 3, DEVICE_LOST, "closed"),
+            Gap("bno", 1_756_033_153.1, 1_756_033_153.102, 2, TRANSIENT, "[Errno 121] Remote I/O error"),
+        ]
+        with conn:
+            conn.executemany(gaps.INSERT_STMT, [gaps.gap_row(g) for g in stored])
+
+        self.assertEqual(gaps.load_gaps(conn), stored[::-1])
+        self.assertEqual(gaps.load_gaps(conn, "llh"), stored[:1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import functools
+import importlib.util
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import numpy as np
+from parameterized import parameterized
+
+from bok_drone_onboard_system.analysis.clock_offset import ClockOffset
+from bok_drone_onboard_system.bno import data as bno_data
+from bok_drone_onboard_system.bno.data import reports
+from bok_drone_onboard_system.storage.archive import read_archive, read_archive_metadata
+from bok_drone_onboard_system.survey.data import create_table_if_not_exists, append_measure, load_arrays, \
+    median_position
+from bok_drone_onboard_system.survey.data.archive import export_survey_records, export_bno_data, \
+    export_bno_reports, iter_survey_archive, iter_reports_archive_around, load_reports_archive, load_archive_metadata, \
+    archive_path, median_position_archive
+from bok_drone_onboard_system.survey.data.metadata import set_metadata, CLOCK_OFFSET_KEY
+from bok_drone_onboard_system.survey.gps import GPSPoint
+from bok_drone_onboard_system.survey_analyse import iter_aligned_arrays, iter_aligned_archive
+from bok_drone_onboard_system.survey_export import export_projected_survey
+
+T0 = datetime(2025, 8, 24, 10, 59, 13, 800000, tzinfo=timezone.utc)
+
+
+def session_db() -> sqlite3.Connection:
+    """
+    20 survey records at 10Hz, one undefined, with BNO08x reports and quaternions at 100Hz
+    """
+    conn = sqlite3.connect(":memory:")
+    create_table_if_not_exists(conn)
+    for i in range(20):
+        quat = (None, None, None, None) if i == 3 else (0., 0.3826834, 0., 0.9238795)
+        append_measure(quat, GPSPoint(T0 + timedelta(milliseconds=100 * i), 43.7 + i * 1e-6, 5.46, 307.6), conn)
+
+    reports.create_table_if_not_exists(conn)
+    bno_data.create_table_if_not_exists(conn)
+    t0_us = reports.to_epoch_us(T0)
+    for i in range(-100, 300):
+        angle = i * 0.001
+        quaternion = (0., 0., np.sin(angle), np.cos(angle))
+        conn.execute(reports.INSERT_STMT, reports.report_row((0.,) * 9 + quaternion, t0_us + i * 10_000))
+        timestamp = (T0 + timedelta(milliseconds=10 * i)).isoformat(timespec='milliseconds')
+        conn.execute(bno_data.INSERT_STMT, (timestamp, *quaternion))
+    conn.commit()
+    set_metadata(conn, CLOCK_OFFSET_KEY, ClockOffset(0.05, 0.9).to_dict())
+    return conn
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+class TestSessionArchive(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.conn = session_db()
+
+    @parameterized.expand([("parquet",), ("arrow",)])
+    def test_survey_records(self, fmt):
+        self.assertEqual(export_survey_records(self.conn, self.test_dir, fmt, chunk_size=7), 20)
+
+        archived = list(iter_survey_archive(self.test_dir, chunk_size=7))
+        expected = load_arrays(self.conn)
+        np.testing.assert_array_equal(np.concatenate([a.timestamps_ns for a in archived]), expected.timestamps_ns)
+        np.testing.assert_array_equal(np.concatenate([a.quaternions for a in archived]), expected.quaternions)
+        np.testing.assert_array_equal(np.concatenate([a.positions for a in archived]), expected.positions)
+        self.assertEqual(load_archive_metadata(self.test_dir), {CLOCK_OFFSET_KEY: {"offset": 0.05, "confidence": 0.9}})
+
+    def test_median_position(self):
+        export_survey_records(self.conn, self.test_dir, chunk_size=7)
+
+        latitude, longitude = median_position_archive(self.test_dir, chunk_size=7)
+        expected_latitude, expected_longitude = median_position(self.conn)
+        self.assertAlmostEqual(latitude, expected_latitude, places=5)
+        self.assertAlmostEqual(longitude, expected_longitude)
+        self.assertIsNone(median_position_archive(self.test_dir, T0 + timedelta(hours=1)))
+
+    def test_survey_records_between(self):
+        export_survey_records(self.conn, self.test_dir)
+
+        archived = list(iter_survey_archive(self.test_dir, T0 + timedelta(milliseconds=200),
+                                            T0 + timedelta(milliseconds=600), only_defined=False))
+
+        self.assertEqual(sum(len(a) for a in archived), 4)
+
+    @parameterized.expand([("parquet",), ("arrow",)])
+    def test_bno_tables(self, fmt):
+        self.assertEqual(export_bno_reports(self.conn, self.test_dir, fmt), 400)
+        self.assertEqual(export_bno_data(self.conn, self.test_dir, fmt), 400)
+
+        bno_reports = load_reports_archive(self.test_dir)
+        expected = reports.load_reports(self.conn)
+        np.testing.assert_array_equal(bno_reports.timestamps_us, expected.timestamps_us)
+        np.testing.assert_array_equal(bno_reports.quaternion, expected.quaternion)
+
+        timestamps_ns, quaternions = read_archive(archive_path(self.test_dir, bno_data.TABLE_NAME))
+        self.assertEqual(timestamps_ns[100], int(T0.timestamp() * 1000) * 1_000_000)
+        np.testing.assert_array_equal(quaternions, bno_data.load_quaternions(self.conn))
+
+    def test_no_reports_archive(self):
+        self.assertIsNone(load_reports_archive(self.test_dir))
+
+    def test_aligned_archive_matches_db(self):
+        export_survey_records(self.conn, self.test_dir)
+        export_bno_reports(self.conn, self.test_dir)
+
+        archived = list(iter_aligned_archive(self.test_dir, None, None, latency_offset=0.05))
+        expected = list(iter_aligned_arrays(self.conn, None, None, latency_offset=0.05))
+
+        np.testing.assert_array_equal(np.concatenate([a.timestamps_ns for a in archived]),
+                                      np.concatenate([a.timestamps_ns for a in expected]))
+        np.testing.assert_allclose(np.concatenate([a.quaternions for a in archived]),
+                                   np.concatenate([a.quaternions for a in expected]))
+
+    @parameterized.expand([
+        ("small_report_chunks", 7, 30),
+        ("large_report_chunks", 5, 1000),
+    ])
+    def test_reports_around_match_db(self, name, survey_chunk_size, reports_chunk_size):
+        export_survey_records(self.conn, self.test_dir, chunk_size=survey_chunk_size)
+        export_bno_reports(self.conn, self.test_dir)
+
+        chunks = iter_survey_archive(self.test_dir, only_defined=False, chunk_size=survey_chunk_size)
+        windows = list(iter_reports_archive_around(self.test_dir, chunks, 0.05, 0.2, reports_chunk_size))
+
+        self.assertEqual(len(windows), 3 if survey_chunk_size == 7 else 4)
+        for survey_arrays, bno_reports in windows:
+            expected = reports.load_reports_around(self.conn, survey_arrays.timestamps_ns, 0.05, 0.2)
+            np.testing.assert_array_equal(bno_reports.timestamps_us, expected.timestamps_us)
+            np.testing.assert_array_equal(bno_reports.quaternion, expected.quaternion)
+
+    def test_projected(self):
+        self.assertEqual(export_projected_survey(self.conn, self.test_dir, "parquet", "zstd", None, None), 20)
+
+        path = archive_path(self.test_dir, "projected")
+        timestamps_ns, values = read_archive(path)
+        self.assertEqual(values.shape, (20, 6))
+        metadata = read_archive_metadata(path)
+        self.assertEqual(metadata["epsg"], 32631)
+        self.assertEqual(metadata["latency_offset"], 0.05)
+
+    def test_projected_zone_of_whole_survey(self):
+        """The UTM zone is the one of the median position, not of the first chunk"""
+        conn = sqlite3.connect(":memory:")
+        create_table_if_not_exists(conn)
+        for i in range(20):
+            longitude = -0.001 if i < 2 else 0.001
+            gps_point = GPSPoint(T0 + timedelta(milliseconds=100 * i), 43.7, longitude, 307.6)
+            append_measure((0., 0., 0., 1.), gps_point, conn)
+
+        with patch("bok_drone_onboard_system.survey_export.iter_aligned_arrays",
+                   functools.partial(iter_aligned_arrays, chunk_size=2)):
+            self.assertEqual(export_projected_survey(conn, self.test_dir, "parquet", None, None, None), 20)
+
+        self.assertEqual(read_archive_metadata(archive_path(self.test_dir, "projected"))["epsg"], 32631)
+
+
+if __name__ == '__main__':
+    unittest.main()
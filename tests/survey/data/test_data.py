@@ -1,12 +1,14 @@
 import sqlite3
 import unittest
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch
 
+import numpy as np
 from parameterized import parameterized
 
 from bok_drone_onboard_system.survey import SurveyMeasure
-from bok_drone_onboard_system.survey.data import load_data, create_table_if_not_exists, TABLE_NAME
+from bok_drone_onboard_system.survey.data import load_data, load_arrays, create_table_if_not_exists, append_measure, \
+    detect_schema_version, iter_arrays, insert_statement, median_position, TABLE_NAME, SCHEMA_V1, SCHEMA_V2
 from bok_drone_onboard_system.survey.gps import GPSPoint
 
 
@@ -14,7 +16,7 @@ class TestLoadData(unittest.TestCase):
     def setUp(self):
         # Create in-memory database for testing
         self.conn = sqlite3.connect(":memory:")
-        create_table_if_not_exists(self.conn)
+        create_table_if_not_exists(self.conn, schema_version=SCHEMA_V1)
         
         # Sample data for testing
         self.now = datetime.now()
@@ -98,5 +100,139 @@ class TestLoadData(unittest.TestCase):
         self.assertEqual(len(results), 5)
 
 
+class TestLoadDataV2(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        create_table_if_not_exists(self.conn)
+        self.now = datetime(2025, 8, 24, 10, 59, 13, 800000, tzinfo=timezone.utc)
+        for i, hours in enumerate([-2, -1, 0, 1]):
+            gps_point = GPSPoint(self.now + timedelta(hours=hours), 10.1 + i / 10, 20.1 + i / 10, 100.1 + i / 10)
+            append_measure((0.1, 0.2, 0.3, 0.4), gps_point, self.conn)
+        gps_point = GPSPoint(self.now + timedelta(minutes=30), 10.5, 20.5, 100.5)
+        append_measure((None, None, None, None), gps_point, self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_default_schema(self):
+        self.assertEqual(detect_schema_version(self.conn), SCHEMA_V2)
+
+    def test_timestamps_are_integers(self):
+        timestamps = [r[0] for r in self.conn.execute(f"SELECT timestamp_ms FROM {TABLE_NAME} ORDER BY 1")]
+        self.assertEqual(timestamps[0], int((self.now - timedelta(hours=2)).timestamp() * 1000))
+        self.assertTrue(all(isinstance(t, int) for t in timestamps))
+
+    def test_load_all_data(self):
+        results = load_data(self.conn, None, None)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0].gps_Point.timestamp, self.now - timedelta(hours=2))
+        self.assertEqual(results[0].gps_Point.latitude, 10.1)
+        self.assertEqual(results[0].bno_quaternion, (0.1, 0.2, 0.3, 0.4))
+
+    @parameterized.expand([
+        ("start_only", timedelta(hours=-1.5), None, 4),
+        ("end_only", None, timedelta(hours=-0.5), 2),
+        ("start_and_end", timedelta(hours=-1.5), timedelta(hours=0.5), 2),
+        ("inclusive_start_exclusive_end", timedelta(hours=0), timedelta(hours=1), 2),
+    ])
+    def test_load_data_with_time_filters(self, name, start_delta, end_delta, expected_count):
+        start = None if start_delta is None else self.now + start_delta
+        end = None if end_delta is None else self.now + end_delta
+
+        results = load_data(self.conn, start, end)
+        self.assertEqual(len(results), expected_count)
+
+    def test_naive_filters_are_utc(self):
+        start = (self.now - timedelta(hours=1)).replace(tzinfo=None)
+        self.assertEqual(len(load_data(self.conn, start, None)), 4)
+
+    def test_load_data_only_defined(self):
+        results = load_data(self.conn, None, None, only_defined=True)
+        self.assertEqual(len(results), 4)
+
+
+class TestLoadArrays(unittest.TestCase):
+    def load_sample(self, schema_version: int):
+        conn = sqlite3.connect(":memory:")
+        create_table_if_not_exists(conn, schema_version=schema_version)
+        self.t0 = datetime(2025, 8, 24, 10, 59, 13, 800000, tzinfo=timezone.utc)
+        for i in range(10):
+            quat = (None, None, None, None) if i == 3 else (0.1 * i, 0.2, 0.3, 0.4)
+            gps_point = GPSPoint(self.t0 + timedelta(milliseconds=100 * i), 43.7 + i, 5.46, 307.6)
+            append_measure(quat, gps_point, conn, schema_version)
+        return conn
+
+    @parameterized.expand([("v1", SCHEMA_V1), ("v2", SCHEMA_V2)])
+    def test_load_arrays(self, name, schema_version):
+        arrays = load_arrays(self.load_sample(schema_version), chunk_size=4)
+
+        self.assertEqual(len(arrays), 9)
+        self.assertEqual(arrays.timestamps_ns.dtype, np.int64)
+        self.assertEqual(arrays.quaternions.shape, (9, 4))
+        self.assertEqual(arrays.positions.shape, (9, 3))
+        self.assertEqual(arrays.timestamps_ns[0], int(self.t0.timestamp() * 1000) * 1_000_000)
+        np.testing.assert_array_equal(np.diff(arrays.timestamps_ns)[:3], [100_000_000, 100_000_000, 200_000_000])
+        np.testing.assert_array_almost_equal(arrays.quaternions[1], (0.1, 0.2, 0.3, 0.4))
+        np.testing.assert_array_almost_equal(arrays.positions[-1], (52.7, 5.46, 307.6))
+
+    @parameterized.expand([("v1", SCHEMA_V1), ("v2", SCHEMA_V2)])
+    def test_load_arrays_not_only_defined(self, name, schema_version):
+        arrays = load_arrays(self.load_sample(schema_version), only_defined=False)
+
+        self.assertEqual(len(arrays), 10)
+        self.assertTrue(np.all(np.isnan(arrays.quaternions[3])))
+
+    @parameterized.expand([("v1", SCHEMA_V1), ("v2", SCHEMA_V2)])
+    def test_load_arrays_between(self, name, schema_version):
+        conn = self.load_sample(schema_version)
+        arrays = load_arrays(conn, self.t0 + timedelta(milliseconds=200), self.t0 + timedelta(milliseconds=600))
+
+        self.assertEqual(len(arrays), 3)
+        np.testing.assert_array_almost_equal(arrays.positions[:, 0], (45.7, 47.7, 48.7))
+
+    @parameterized.expand([("v1", SCHEMA_V1, True), ("v2", SCHEMA_V2, True), ("v2_not_only_defined", SCHEMA_V2, False)])
+    def test_iter_arrays_matches_load_arrays(self, name, schema_version, only_defined):
+        conn = self.load_sample(schema_version)
+        chunks = list(iter_arrays(conn, only_defined=only_defined, chunk_size=4))
+        arrays = load_arrays(conn, only_defined=only_defined)
+
+        self.assertEqual([len(c) for c in chunks], [4, 4, len(arrays) - 8])
+        np.testing.assert_array_equal(np.concatenate([c.timestamps_ns for c in chunks]), arrays.timestamps_ns)
+        np.testing.assert_array_equal(np.concatenate([c.quaternions for c in chunks]), arrays.quaternions)
+        np.testing.assert_array_equal(np.concatenate([c.positions for c in chunks]), arrays.positions)
+
+    def test_invalid_v1_timestamp_ignored(self):
+        conn = self.load_sample(SCHEMA_V1)
+        conn.execute(insert_statement(SCHEMA_V1), ("garbage", 0.1, 0.2, 0.3, 0.4, 43.7, 5.46, 307.6))
+
+        arrays = load_arrays(conn)
+        chunks = list(iter_arrays(conn))
+
+        self.assertEqual(len(arrays), 9)
+        self.assertEqual(arrays.timestamps_ns[0], int(self.t0.timestamp() * 1000) * 1_000_000)
+        self.assertEqual(sum(len(c) for c in chunks), 9)
+
+    @parameterized.expand([("v1", SCHEMA_V1), ("v2", SCHEMA_V2)])
+    def test_median_position(self, name, schema_version):
+        conn = self.load_sample(schema_version)
+        first = GPSPoint(self.t0 - timedelta(seconds=1), 10., 30., 0.)
+        append_measure((0.1, 0.2, 0.3, 0.4), first, conn, schema_version)
+
+        np.testing.assert_array_almost_equal(median_position(conn), (47.7, 5.46))
+        between = median_position(conn, self.t0 + timedelta(milliseconds=200), self.t0 + timedelta(milliseconds=500))
+        np.testing.assert_array_almost_equal(between, (46.7, 5.46))
+        self.assertIsNone(median_position(conn, self.t0 + timedelta(hours=1)))
+
+    def test_load_arrays_matches_load_data(self):
+        conn = self.load_sample(SCHEMA_V2)
+        arrays = load_arrays(conn)
+        measures = load_data(conn, None, None, only_defined=True)
+
+        self.assertEqual(len(arrays), len(measures))
+        for i, m in enumerate(measures):
+            self.assertEqual(arrays.timestamps_ns[i] // 1_000_000, int(m.gps_Point.timestamp.timestamp() * 1000))
+            self.assertEqual(tuple(arrays.quaternions[i]), m.bno_quaternion)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
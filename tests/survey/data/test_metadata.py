@@ -0,0 +1,24 @@
+import sqlite3
+import unittest
+
+from bok_drone_onboard_system.survey.data.metadata import get_metadata, set_metadata
+
+
+class TestMetadata(unittest.TestCase):
+    def test_missing(self):
+        conn = sqlite3.connect(":memory:")
+        self.assertIsNone(get_metadata(conn, "clock_offset"))
+        self.assertEqual(get_metadata(conn, "clock_offset", {}), {})
+
+    def test_set_and_replace(self):
+        conn = sqlite3.connect(":memory:")
+        set_metadata(conn, "clock_offset", {"offset": 0.1, "confidence": 0.5})
+        set_metadata(conn, "clock_offset", {"offset": 0.2, "confidence": 0.9})
+        set_metadata(conn, "pole_axis", [1., 0., 0.])
+
+        self.assertEqual(get_metadata(conn, "clock_offset"), {"offset": 0.2, "confidence": 0.9})
+        self.assertEqual(get_metadata(conn, "pole_axis"), [1., 0., 0.])
+
+
+if __name__ == '__main__':
+    unittest.main()
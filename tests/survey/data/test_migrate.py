@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from parameterized import parameterized
+
+from bok_drone_onboard_system.survey.data import (
+    load_data, create_table_if_not_exists, detect_schema_version, insert_statement, TABLE_NAME, SCHEMA_V1, SCHEMA_V2
+)
+from bok_drone_onboard_system.survey.data.migrate import migrate_to_v2, upgrade
+from bok_drone_onboard_system.storage.sqlite import user_version
+
+
+class TestMigrate(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.conn = sqlite3.connect(os.path.join(self.test_dir, "survey.db"))
+        create_table_if_not_exists(self.conn, schema_version=SCHEMA_V1)
+        self.t0 = datetime(2025, 8, 24, 10, 59, 13, 800000, tzinfo=timezone.utc)
+        rows = [
+            ((self.t0 + timedelta(milliseconds=100 * i)).isoformat(timespec='milliseconds'),
+             0.1, 0.2, 0.3, 0.4, 43.7 + i / 1000, 5.46, 307.6)
+            for i in range(25)
+        ]
+        rows.append((None, 0.1, 0.2, 0.3, 0.4, 43.7, 5.46, 307.6))
+        self.conn.executemany(insert_statement(SCHEMA_V1), rows)
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+
+    @parameterized.expand([
+        ("single_chunk", 1000),
+        ("several_chunks", 7),
+    ])
+    def test_migrate_to_v2(self, name, chunk_size):
+        before = load_data(self.conn, None, None)
+
+        self.assertEqual(migrate_to_v2(self.conn, chunk_size=chunk_size), 25)
+
+        self.assertEqual(detect_schema_version(self.conn), SCHEMA_V2)
+        after = load_data(self.conn, None, None)
+        self.assertEqual(len(after), 25)
+        for b, a in zip(before, after):
+            self.assertEqual(a.gps_Point.timestamp, b.gps_Point.timestamp)
+            self.assertEqual(a.gps_Point.latitude, b.gps_Point.latitude)
+            self.assertEqual(a.bno_quaternion, b.bno_quaternion)
+
+    def test_migrated_table_replaces_original(self):
+        migrate_to_v2(self.conn)
+        tables = [r[0] for r in self.conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+        self.assertEqual(tables, [TABLE_NAME])
+
+    def test_invalid_timestamps_dropped(self):
+        self.conn.execute(insert_statement(SCHEMA_V1), ("garbage", 0.1, 0.2, 0.3, 0.4, 43.7, 5.46, 307.6))
+        self.conn.commit()
+
+        with self.assertLogs("bok_drone_onboard_system.survey.data.migrate", "WARNING") as logs:
+            self.assertEqual(migrate_to_v2(self.conn, chunk_size=7), 25)
+
+        self.assertIn("Dropped 2 rows without a valid timestamp", logs.output[0])
+        self.assertEqual(len(load_data(self.conn, None, None)), 25)
+
+    def test_migrate_twice(self):
+        migrate_to_v2(self.conn)
+        self.assertEqual(migrate_to_v2(self.conn), 0)
+        self.assertEqual(len(load_data(self.conn, None, None)), 25)
+
+    def test_upgrade(self):
+        self.assertEqual(user_version(self.conn), SCHEMA_V1)
+
+        self.assertEqual(upgrade(self.conn, chunk_size=7), SCHEMA_V2)
+
+        self.assertEqual(detect_schema_version(self.conn), SCHEMA_V2)
+        self.assertEqual(user_version(self.conn), SCHEMA_V2)
+        self.assertEqual(len(load_data(self.conn, None, None)), 25)
+
+    def test_upgrade_unversioned_database(self):
+        """A database created before the user_version was stored is upgraded from its detected schema"""
+        self.conn.execute("PRAGMA user_version=0")
+
+        self.assertEqual(upgrade(self.conn), SCHEMA_V2)
+
+        self.assertEqual(user_version(self.conn), SCHEMA_V2)
+        self.assertEqual(len(load_data(self.conn, None, None)), 25)
+
+    def test_new_table_stores_schema_version(self):
+        conn = sqlite3.connect(":memory:")
+        create_table_if_not_exists(conn)
+        self.assertEqual(user_version(conn), SCHEMA_V2)
+        self.assertEqual(upgrade(conn), SCHEMA_V2)
+
+    def test_migrate_without_table(self):
+        conn = sqlite3.connect(":memory:")
+        with self.assertRaises(ValueError):
+            migrate_to_v2(conn)
+
+
+if __name__ == '__main__':
+    unittest.main()
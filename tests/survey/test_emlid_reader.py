@@ -1,10 +1,15 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import Mock, patch
 from datetime import datetime, date, time
 
+import numpy as np
 import pynmea2
+from parameterized import parameterized
 
-from bok_drone_onboard_system.survey.emlid_reader import read_from_emlid, parse_llh
+from bok_drone_onboard_system.survey.emlid_reader import read_from_emlid, parse_llh, parse_llh_file, \
+    find_emlid_device
 from bok_drone_onboard_system.survey.gps import GPSPoint, EmlidEntry, SolutionQuality
 
 
@@ -143,7 +148,71 @@ class TestEmlidReader(unittest.TestCase):
         llh_line_rtk_dgps = "2025/08/24 10:59:13.800   43.737672206    5.462569945   307.6388   4  11   0.0680   0.1100   0.2400   0.0000   0.0000   0.0000   1.80    0.0"
         result_rtk_dgps = parse_llh(llh_line_rtk_dgps)
         self.assertEqual(result_rtk_dgps.solution_status, SolutionQuality.DGPS)
-        
+
+    def test_parse_llh_all_fields(self):
+        """Test that parse_llh keeps the satellites, covariances, age and ratio."""
+        llh_line = "2025/08/24 10:59:13.800   43.737672206    5.462569945   307.6388   4  11   0.0680   0.1100   0.2400   0.0010  -0.0020   0.0030   1.80    2.5"
+
+        result = parse_llh(llh_line)
+
+        self.assertEqual(result.n_satellites, 11)
+        self.assertEqual(result.covariance, (0.001, -0.002, 0.003))
+        self.assertEqual(result.age, 1.8)
+        self.assertEqual(result.ratio, 2.5)
+
+    @parameterized.expand([
+        ("milliseconds", "10:59:13.800", datetime(2025, 8, 24, 10, 59, 13, 800000)),
+        ("microseconds", "10:59:13.123456", datetime(2025, 8, 24, 10, 59, 13, 123456)),
+        ("no_fraction", "10:59:13", datetime(2025, 8, 24, 10, 59, 13)),
+    ])
+    def test_parse_llh_timestamp(self, name, time_str, expected):
+        llh_line = f"2025/08/24 {time_str}   43.737672206    5.462569945   307.6388   2  11   0.0680   0.1100   0.2400   0.0000   0.0000   0.0000   1.80    0.0"
+        self.assertEqual(parse_llh(llh_line).gps_point.timestamp, expected)
+
+    def test_parse_llh_invalid_line(self):
+        with self.assertRaises(ValueError):
+            parse_llh("2025/08/24 10:59:13.800   43.737672206    5.462569945")
+
+    def test_parse_llh_file(self):
+        """Test that parse_llh_file reads a whole log, consistently with parse_llh."""
+        lines = [
+            f"2025/08/24 10:59:{13 + i:02d}.800   43.73767{i}206    5.462569945   307.6388   {1 + i % 2}  1{i}   0.0680   0.1100   0.2400   0.0000   0.0000   0.0000   1.80    {i}.5"
+            for i in range(5)
+        ]
+        path = os.path.join(tempfile.mkdtemp(), "solution.LLH")
+        with open(path, "w") as f:
+            f.write("% program   : RTKLIB\n")
+            f.write("\n".join(lines) + "\n")
+
+        records = parse_llh_file(path)
+
+        self.assertEqual(len(records), 5)
+        for record, line in zip(records, lines):
+            entry = parse_llh(line)
+            self.assertEqual(record['timestamp'], np.datetime64(entry.gps_point.timestamp, 'ms'))
+            self.assertEqual(record['latitude'], entry.gps_point.latitude)
+            self.assertEqual(record['height'], entry.gps_point.altitude)
+            self.assertEqual(record['q'], entry.solution_status.value)
+            self.assertEqual(record['ns'], entry.n_satellites)
+            self.assertEqual((record['sdn'], record['sde'], record['sdu']), entry.std_dev)
+            self.assertEqual(record['ratio'], entry.ratio)
+
+    @parameterized.expand([
+        ("emlid_description", "linux", [("/dev/ttyS0", "ttyS0", ""), ("/dev/ttyACM1", "ReachM2", "USB VID:PID=EMLID")],
+         "/dev/ttyACM1"),
+        ("first_candidate", "linux", [("/dev/ttyS0", "ttyS0", ""), ("/dev/ttyUSB0", "USB Serial", "")],
+         "/dev/ttyUSB0"),
+        ("macos_usb", "darwin", [("/dev/cu.usbmodem1103", "Reach", "USB")], "/dev/cu.usbmodem1103"),
+        ("macos_bluetooth", "darwin", [("/dev/cu.Bluetooth-Incoming-Port", "n/a", "n/a"),
+                                       ("/dev/cu.tsreachrover", "n/a", "n/a")], "/dev/cu.tsreachrover"),
+        ("none", "linux", [("/dev/ttyS0", "ttyS0", "")], None),
+    ])
+    def test_find_emlid_device(self, _, platform, ports, expected):
+        comports = [Mock(device=device, description=description, hwid=hwid) for device, description, hwid in ports]
+        with patch("bok_drone_onboard_system.survey.emlid_reader.list_ports.comports", return_value=comports), \
+                patch("bok_drone_onboard_system.survey.emlid_reader.sys.platform", platform):
+            self.assertEqual(find_emlid_device(), expected)
+
 
 
 if __name__ == '__main__':
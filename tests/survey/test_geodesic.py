@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pyproj
+from parameterized import parameterized
+
+from bok_drone_onboard_system.survey.gps import GPSPoint
+from bok_drone_onboard_system.survey.gps.geodesic import (
+    wgs84_geod, pairwise_distances, distances_from, segment_distances, track_length
+)
+
+
+class TestGeodesic(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.positions = np.column_stack((
+            43.7 + rng.uniform(-0.01, 0.01, 50),
+            5.46 + rng.uniform(-0.01, 0.01, 50),
+            np.full(50, 307.),
+        ))
+
+    @staticmethod
+    def point(position) -> GPSPoint:
+        return GPSPoint(datetime.now(), *position)
+
+    def test_geod_is_cached(self):
+        self.assertIs(wgs84_geod(), wgs84_geod())
+
+    def test_pairwise_distances_match_distance_to(self):
+        others = self.positions[::-1]
+        distances = pairwise_distances(self.positions, others)
+
+        self.assertEqual(distances.shape, (50,))
+        for a, b, d in zip(self.positions, others, distances):
+            self.assertAlmostEqual(d, self.point(a).distance_to(self.point(b)), places=6)
+
+    def test_pairwise_distances_length_mismatch(self):
+        with self.assertRaises(ValueError):
+            pairwise_distances(self.positions, self.positions[1:])
+
+    def test_distances_from(self):
+        origin = self.point(self.positions[0])
+        distances = distances_from(origin.latitude, origin.longitude, self.positions)
+
+        self.assertAlmostEqual(distances[0], 0., places=6)
+        for p, d in zip(self.positions, distances):
+            self.assertAlmostEqual(d, origin.distance_to(self.point(p)), places=6)
+
+    def test_distances_from_lat_lon_only(self):
+        """Positions may be given without altitude"""
+        distances = distances_from(45.0, 10.0, np.array([(45.009, 10.0)]))
+        self.assertAlmostEqual(distances[0], 1000., delta=10)
+
+    def test_segment_distances(self):
+        segments = segment_distances(self.positions)
+
+        self.assertEqual(segments.shape, (49,))
+        geod = pyproj.Geod(ellps="WGS84")
+        for i in range(49):
+            _, _, expected = geod.inv(self.positions[i, 1], self.positions[i, 0],
+                                      self.positions[i + 1, 1], self.positions[i + 1, 0])
+            self.assertAlmostEqual(segments[i], expected, places=6)
+
+    @parameterized.expand([
+        ("empty", np.empty((0, 3)), 0.),
+        ("single_point", np.array([(45.0, 10.0, 0.)]), 0.),
+        ("there_and_back", np.array([(45.0, 10.0, 0.), (45.009, 10.0, 0.), (45.0, 10.0, 0.)]), 2000.),
+    ])
+    def test_track_length(self, name, positions, expected):
+        self.assertAlmostEqual(track_length(positions), expected, delta=20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,11 @@
 import unittest
-from datetime import datetime
+from datetime import datetime, timedelta
+
+import numpy as np
 import pyproj
-from bok_drone_onboard_system.survey.gps import GPSPoint
+from parameterized import parameterized
+
+from bok_drone_onboard_system.survey.gps import GPSPoint, GPSPointFifo, GPSPointTimeWindow
 
 
 class TestGPSPoint(unittest.TestCase):
@@ -121,5 +125,81 @@ class TestGPSPoint(unittest.TestCase):
         self.assertEqual(distance, direct_distance)
 
 
+class TestGPSPointFifo(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.t0 = datetime(2025, 8, 24, 10, 59, 13)
+        self.values = np.column_stack((
+            43.7 + rng.normal(0, 1e-6, 200),
+            5.46 + rng.normal(0, 1e-6, 200),
+            307.6 + rng.normal(0, 0.02, 200),
+        ))
+        self.points = [
+            GPSPoint(self.t0 + timedelta(milliseconds=200 * i), *v) for i, v in enumerate(self.values.tolist())
+        ]
+
+    def test_empty(self):
+        fifo = GPSPointFifo(5)
+        self.assertEqual(len(fifo), 0)
+        self.assertIsNone(fifo.average())
+        self.assertIsNone(fifo.std_dev())
+        self.assertIsNone(fifo.spread())
+
+    @parameterized.expand([("zero", 0), ("negative", -1)])
+    def test_invalid_size(self, name, n):
+        with self.assertRaises(ValueError):
+            GPSPointFifo(n)
+
+    @parameterized.expand([
+        ("partially_filled", 20, 7),
+        ("filled", 20, 20),
+        ("rolled_over", 20, 200),
+        ("size_one", 1, 10),
+    ])
+    def test_statistics_match_numpy(self, name, n, n_pushed):
+        fifo = GPSPointFifo(n)
+        for p in self.points[:n_pushed]:
+            fifo.push(p)
+
+        expected = self.values[max(0, n_pushed - n):n_pushed]
+        self.assertEqual(len(fifo), len(expected))
+        avg = fifo.average()
+        np.testing.assert_allclose((avg.latitude, avg.longitude, avg.altitude), expected.mean(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(fifo.std_dev(), expected.std(axis=0), rtol=1e-5, atol=1e-12)
+
+    def test_items_in_push_order(self):
+        fifo = GPSPointFifo(5)
+        for p in self.points[:8]:
+            fifo.push(p)
+
+        self.assertIs(fifo[0], self.points[3])
+        self.assertIs(fifo[-1], self.points[7])
+        self.assertEqual(fifo[1:3], self.points[4:6])
+        with self.assertRaises(IndexError):
+            fifo[5]
+
+    def test_spread_in_meters(self):
+        """1e-6 degree of noise on latitude and longitude is a spread of about 0.1 meter"""
+        fifo = GPSPointFifo(200)
+        for p in self.points:
+            fifo.push(p)
+        self.assertAlmostEqual(fifo.spread(), 0.14, delta=0.03)
+
+    def test_time_window(self):
+        """Only the points of the last seconds are kept"""
+        window = GPSPointTimeWindow(1.0)
+        for p in self.points[:20]:
+            window.push(p)
+
+        self.assertEqual(len(window), 6)
+        self.assertIs(window[0], self.points[14])
+        self.assertIs(window[-1], self.points[19])
+        avg = window.average()
+        np.testing.assert_allclose(
+            (avg.latitude, avg.longitude, avg.altitude), self.values[14:20].mean(axis=0), rtol=1e-12
+        )
+        np.testing.assert_allclose(window.std_dev(), self.values[14:20].std(axis=0), rtol=1e-5, atol=1e-12)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,161 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from bok_drone_onboard_system.bno import MockBNO08X
+from bok_drone_onboard_system.bno.data import reports
+from bok_drone_onboard_system.metrics import snapshot
+from bok_drone_onboard_system.storage import gaps
+from bok_drone_onboard_system.supervisor import DEVICE_LOST
+from bok_drone_onboard_system.survey.data import llh, TABLE_NAME
+from bok_drone_onboard_system.survey.ingest import IngestEngine
+from tests.survey.test_nmea import GGA_FIX, ZDA_SENTENCE, GSV_SENTENCE, with_checksum
+
+LLH_LINES = [
+    "2025/08/24 10:59:13.800   43.737672206    5.462569945   307.6388   2  11   0.0680   0.1100   0.2400   0.0000   0.0000   0.0000   1.80    0.0",
+    "2025/08/24 10:59:14.000   43.737672306    5.462569845   307.6390   1  12   0.0700   0.1200   0.2500   0.0000   0.0000   0.0000   2.00    0.0",
+]
+
+GGA_NEXT_FIX = with_checksum("GNGGA,105914.00,4344.2603330,N,00527.7541960,E,4,11,0.6,307.640,M,49.5,M,1.8,0000")
+
+
+class FakeSerial:
+    """
+    Give the lines, then behave as an idle port: readline waits for its timeout and returns nothing
+    """
+    def __init__(self, lines: list[str]):
+        self.lines = [(line + "\r\n").encode('ascii') for line in lines]
+        self.is_open = True
+
+    def readline(self) -> bytes:
+        if self.lines:
+            return self.lines.pop(0)
+        time.sleep(0.01)
+        return b""
+
+    def close(self):
+        self.is_open = False
+
+
+def failing_bno():
+    raise OSError("no BNO08x on the I2C bus")
+
+
+class TestIngestEngine(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.test_dir, "survey.db")
+
+    def query(self, stmt: str) -> list:
+        conn = sqlite3.connect(self.db)
+        try:
+            return conn.execute(stmt).fetchall()
+        finally:
+            conn.close()
+
+    def run_engine(self, duration: float, **kwargs) -> IngestEngine:
+        async def scenario():
+            async def serve_llh(reader, writer):
+                writer.write("".join(line + "\n" for line in LLH_LINES).encode('ascii'))
+                await writer.drain()
+                writer.close()
+
+            server = await asyncio.start_server(serve_llh, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            engine = IngestEngine(
+                self.db,
+                llh_address=("127.0.0.1", port),
+                retry_delay=0.05,
+                writer_options={"flush_interval": 0.05, **kwargs.pop("writer_options", {})},
+                **kwargs,
+            )
+            task = asyncio.create_task(engine.run())
+            await asyncio.sleep(duration)
+            engine.stop()
+            await task
+            server.close()
+            await server.wait_closed()
+            return engine
+
+        return asyncio.run(scenario())
+
+    def test_all_sources_stored(self):
+        """BNO08x reports are sampled at their own rate, GGA get the latest quaternion, LLH solutions are stored"""
+        engine = self.run_engine(
+            0.5,
+            open_bno=MockBNO08X,
+            bno_period=0.005,
+            open_serial=lambda: FakeSerial([GSV_SENTENCE, ZDA_SENTENCE, GGA_FIX]),
+        )
+
+        n_reports = self.query(f"SELECT COUNT(*) FROM {reports.TABLE_NAME}")[0][0]
+        self.assertGreater(n_reports, 20)
+        self.assertEqual(engine.stats["bno"].received, n_reports)
+
+        survey_rows = self.query(f"SELECT * FROM {TABLE_NAME}")
+        self.assertEqual(len(survey_rows), 1)
+        self.assertIsNotNone(survey_rows[0][1])
+        self.assertAlmostEqual(survey_rows[0][5], 43.7376722, places=6)
+
+        # the LLH stream is reopened each time the server closes it, duplicated solutions are ignored
+        llh_rows = self.query(f"SELECT timestamp_ms, quality, n_satellites FROM {llh.TABLE_NAME} ORDER BY timestamp_ms")
+        self.assertEqual(llh_rows, [(1756033153800, 2, 11), (1756033154000, 1, 12)])
+        self.assertGreater(engine.stats["llh"].reconnections, 0)
+        llh_gaps = self.query(f"SELECT source, start_ms <= end_ms, kind FROM {gaps.TABLE_NAME} WHERE source = 'llh'")
+        self.assertGreater(len(llh_gaps), 0)
+        self.assertEqual(llh_gaps[0], ("llh", 1, DEVICE_LOST))
+
+    def test_duplicated_gga_epoch_ignored(self):
+        """A repeated GGA epoch does not drop the other positions of its batch"""
+        engine = self.run_engine(
+            0.3,
+            open_bno=MockBNO08X,
+            bno_period=0.005,
+            open_serial=lambda: FakeSerial([ZDA_SENTENCE, GGA_FIX, GGA_FIX, GGA_NEXT_FIX]),
+        )
+
+        survey_rows = self.query(f"SELECT timestamp_ms, gps_alt FROM {TABLE_NAME} ORDER BY timestamp_ms")
+        self.assertEqual(survey_rows, [(1756033153800, 307.638), (1756033154000, 307.64)])
+        self.assertEqual(engine.stats["gga"].received, 3)
+        self.assertEqual(engine._writers["gga"].stats.failed, 0)
+
+    def test_checkpoints_without_wal(self):
+        """A database written without WAL is not switched to it by the checkpoints"""
+        self.run_engine(
+            0.2,
+            open_bno=MockBNO08X,
+            bno_period=0.005,
+            checkpoint_interval=0.05,
+            writer_options={"wal": False},
+        )
+
+        self.assertEqual(self.query("PRAGMA journal_mode"), [("delete",)])
+        self.assertGreater(self.query(f"SELECT COUNT(*) FROM {reports.TABLE_NAME}")[0][0], 0)
+
+    def test_failing_bno_does_not_stall_gps(self):
+        """GGA positions are still stored, without quaternion, while the BNO08x cannot be opened"""
+        engine = self.run_engine(
+            0.3,
+            open_bno=failing_bno,
+            bno_period=0.005,
+            open_serial=lambda: FakeSerial([ZDA_SENTENCE, GGA_FIX]),
+        )
+
+        survey_rows = self.query(f"SELECT quat_i, quat_real, gps_lat FROM {TABLE_NAME}")
+        self.assertEqual(len(survey_rows), 1)
+        self.assertEqual(survey_rows[0][0:2], (None, None))
+        self.assertGreater(engine.stats["bno"].errors, 1)
+        self.assertEqual(self.query(f"SELECT COUNT(*) FROM {reports.TABLE_NAME}"), [(0,)])
+
+        metrics = snapshot(engine.registry)
+        self.assertEqual(metrics["bok_errors_total{source=bno,type=OSError}"], engine.stats["bno"].errors)
+        self.assertEqual(metrics["bok_samples_total{source=gga}"], 1)
+        self.assertEqual(metrics["bok_stage_seconds{source=bno,stage=read}"]["count"], 0)
+        self.assertGreater(metrics["bok_stage_seconds{source=gga,stage=commit}"]["count"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from datetime import date, datetime, timezone
+from unittest.mock import Mock, patch
+
+import pynmea2
+from parameterized import parameterized
+
+from bok_drone_onboard_system.survey import nmea
+from bok_drone_onboard_system.survey.emlid_reader import read_from_emlid
+from bok_drone_onboard_system.survey.gps import GGAPoint, GGAQuality
+from bok_drone_onboard_system.survey.nmea import parse_sentence, checksum_ok, GGA, RMC, ZDA
+
+
+def with_checksum(body: str) -> str:
+    checksum = 0
+    for c in body.encode('ascii'):
+        checksum ^= c
+    return f"${body}*{checksum:02X}"
+
+
+GGA_FIX = with_checksum("GNGGA,105913.80,4344.2603324,N,00527.7541967,E,4,11,0.6,307.638,M,49.5,M,1.8,0000")
+GGA_SOUTH_WEST = with_checksum("GPGGA,235959.123,3327.0000,S,07040.2000,W,5,08,1.2,545.4,M,46.9,M,,")
+GGA_NO_FIX = with_checksum("GPGGA,123519,,,,,0,00,,,M,,M,,")
+RMC_SENTENCE = "$GPRMC,123520,A,4807.039,N,01131.001,E,022.4,084.4,230394,003.1,W*60"
+ZDA_SENTENCE = with_checksum("GPZDA,105913.80,24,08,2025,00,00")
+GSV_SENTENCE = with_checksum("GPGSV,3,1,11,03,03,111,00,04,15,270,00,06,01,010,00,13,06,292,00")
+
+
+class TestNmea(unittest.TestCase):
+    @parameterized.expand([
+        ("gga", GGA_FIX),
+        ("gga_south_west", GGA_SOUTH_WEST),
+        ("gga_reference", "$GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*47"),
+    ])
+    def test_gga_matches_pynmea2(self, name, line):
+        kind, fix = parse_sentence(line)
+        expected = pynmea2.parse(line)
+
+        self.assertEqual(kind, GGA)
+        self.assertEqual(fix.time, expected.timestamp)
+        self.assertEqual(fix.latitude, expected.latitude)
+        self.assertEqual(fix.longitude, expected.longitude)
+        self.assertEqual(fix.altitude, expected.altitude)
+        self.assertEqual(fix.quality, int(expected.gps_qual))
+        self.assertEqual(fix.n_satellites, int(expected.num_sats))
+        self.assertEqual(fix.hdop, float(expected.horizontal_dil))
+
+    def test_gga_quality(self):
+        _, fix = parse_sentence(GGA_FIX)
+        self.assertEqual(fix.quality, GGAQuality.RTK_FIXED)
+        self.assertEqual(fix.quality.label, "FIX")
+
+    @parameterized.expand([
+        ("no_fix", GGA_NO_FIX),
+        ("truncated", "$GPGGA,1235"),
+    ])
+    def test_gga_without_position(self, name, line):
+        self.assertEqual(parse_sentence(line), (GGA, None))
+
+    @parameterized.expand([
+        ("rmc", RMC_SENTENCE, RMC, date(1994, 3, 23)),
+        ("zda", ZDA_SENTENCE, ZDA, date(2025, 8, 24)),
+    ])
+    def test_date_sentences(self, name, line, expected_kind, expected_date):
+        self.assertEqual(parse_sentence(line), (expected_kind, expected_date))
+
+    @parameterized.expand([
+        ("unwanted_type", GSV_SENTENCE),
+        ("bad_checksum", GGA_FIX[:-2] + "00"),
+        ("not_nmea", "2025/08/24 10:59:13.800   43.737672206    5.462569945"),
+    ])
+    def test_rejected_sentences(self, name, line):
+        self.assertIsNone(parse_sentence(line))
+
+    def test_checksum_is_optional(self):
+        self.assertTrue(checksum_ok("$GPZDA,105913.80,24,08,2025,00,00"))
+        self.assertEqual(parse_sentence("$GPZDA,105913.80,24,08,2025,00,00"), (ZDA, date(2025, 8, 24)))
+
+    def test_pynmea2_fallback(self):
+        """When the fast path fails on a wanted sentence, pynmea2 is used"""
+        failing = Mock(side_effect=ValueError("unexpected"))
+        with patch.dict(nmea._PARSERS, {GGA: failing}):
+            kind, fix = parse_sentence(GGA_FIX)
+
+        failing.assert_called_once()
+        self.assertEqual(kind, GGA)
+        self.assertEqual(fix.latitude, pynmea2.parse(GGA_FIX).latitude)
+        self.assertEqual(fix.quality, GGAQuality.RTK_FIXED)
+
+    def test_read_from_emlid_exposes_quality(self):
+        """read_from_emlid gives GGA points with fix quality, dated by ZDA, ignoring other sentences"""
+        mock_serial = Mock()
+        mock_serial.readline.side_effect = [
+            (line + "\r\n").encode('ascii') for line in (GSV_SENTENCE, ZDA_SENTENCE, GGA_NO_FIX, GGA_FIX)
+        ] + [KeyboardInterrupt]
+        points = []
+
+        with self.assertRaises(KeyboardInterrupt):
+            read_from_emlid(mock_serial, points.append)
+
+        self.assertEqual(len(points), 1)
+        self.assertIsInstance(points[0], GGAPoint)
+        self.assertEqual(points[0].timestamp, datetime(2025, 8, 24, 10, 59, 13, 800000, tzinfo=timezone.utc))
+        self.assertEqual(points[0].quality, GGAQuality.RTK_FIXED)
+        self.assertEqual(points[0].n_satellites, 11)
+        self.assertEqual(points[0].hdop, 0.6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,18 @@
+import io
 import os
 import tempfile
-from datetime import datetime
+from datetime import datetime, timezone
 from unittest import TestCase
 
 import numpy as np
 from parameterized import parameterized
 
-from bok_drone_onboard_system.survey_analyse import plot_projected_measures
+from bok_drone_onboard_system.survey import SurveyMeasure
+from bok_drone_onboard_system.survey.data import SurveyArrays
+from bok_drone_onboard_system.survey.gps import GPSPoint
+from bok_drone_onboard_system.survey_analyse import plot_projected_measures, project_measure, project_arrays, \
+    projected_measures_from_arrays, format_tsv_output, iter_projected, write_projected, plot_projected_arrays, \
+    survey_utm_epsg
 
 
 class TestSurveyAnalyse(TestCase):
@@ -124,4 +130,100 @@ class TestSurveyAnalyse(TestCase):
         self.assertGreater(os.path.getsize(output_file), 0)
         
         # Note: We can't easily check the scale text in the image programmatically
-        # This would require image processing or OCR, which is beyond the scope of this test
\ No newline at end of file
+        # This would require image processing or OCR, which is beyond the scope of this test
+
+    @parameterized.expand([
+        ("dots", 100, 1000),
+        ("pixels", 5000, 10000),
+        ("density", 5000, 1000),
+    ])
+    def test_plot_projected_arrays(self, name, num_points, max_points):
+        """Test plotting arrays, in each of the rendering modes"""
+        output_file = os.path.join(self.test_dir, f"{name}_arrays_plot.png")
+        rng = np.random.default_rng(0)
+        timestamps_ns = 1_755_353_100_000_000_000 + np.arange(num_points, dtype=np.int64) * 100_000_000
+        utm_coords = np.column_stack((500000. + np.cumsum(rng.normal(0, 0.1, num_points)),
+                                      4000000. + np.cumsum(rng.normal(0, 0.1, num_points)),
+                                      np.full(num_points, 100.)))
+
+        plot_projected_arrays(timestamps_ns, utm_coords, utm_coords + (1., 0., -2.), output_file, max_points)
+
+        self.assertTrue(os.path.exists(output_file))
+        self.assertGreater(os.path.getsize(output_file), 0)
+
+    def test_plot_projected_arrays_empty(self):
+        output_file = os.path.join(self.test_dir, "empty_arrays_plot.png")
+
+        plot_projected_arrays(np.empty(0, dtype=np.int64), np.empty((0, 3)), np.empty((0, 3)), output_file)
+
+        self.assertFalse(os.path.exists(output_file))
+
+    def test_project_arrays_matches_project_measure(self):
+        """The batch projection gives the same results as the per measure one"""
+        timestamps = [datetime(2025, 8, 16, 14, 5, i, 100000, tzinfo=timezone.utc) for i in range(5)]
+        positions = np.array([(40.1 + i * 1e-5, 22.3 + i * 1e-5, 30. + i) for i in range(5)])
+        quaternions = np.array([(0.0, 0.3826834, 0.1 * i, 0.9238795) for i in range(5)])
+        measures = [
+            SurveyMeasure(GPSPoint(t, *p), tuple(q)) for t, p, q in zip(timestamps, positions, quaternions)
+        ]
+        timestamps_ns = np.array([int(t.timestamp() * 1000) * 1_000_000 for t in timestamps], dtype=np.int64)
+
+        utm_coords, projections = project_arrays(SurveyArrays(timestamps_ns, quaternions, positions), 2.57)
+        batch = projected_measures_from_arrays(timestamps_ns, utm_coords, projections)
+
+        for (ts_b, utm_b, proj_b), (ts, utm, proj) in zip(batch, project_measure(measures, 2.57)):
+            self.assertEqual(ts_b, ts)
+            np.testing.assert_array_almost_equal(utm_b, utm)
+            np.testing.assert_array_almost_equal(proj_b, proj)
+
+    def survey_chunks(self, n: int = 25, chunk_size: int = 10) -> list[SurveyArrays]:
+        rng = np.random.default_rng(0)
+        timestamps_ns = 1_755_353_100_000_000_000 + np.arange(n, dtype=np.int64) * 100_000_000
+        quaternions = rng.normal(size=(n, 4))
+        quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+        positions = np.column_stack((40.1 + rng.normal(0, 1e-5, n), 22.3 + rng.normal(0, 1e-5, n), np.full(n, 30.)))
+        return [
+            SurveyArrays(timestamps_ns[i:i + chunk_size], quaternions[i:i + chunk_size], positions[i:i + chunk_size])
+            for i in range(0, n, chunk_size)
+        ]
+
+    def test_write_projected_matches_format_tsv_output(self):
+        """The streamed output is the same text as the formatted one"""
+        chunks = self.survey_chunks()
+        out = io.StringIO()
+
+        count = write_projected(iter_projected(chunks, 2.57), out)
+
+        survey_arrays = SurveyArrays(*(np.concatenate(a) for a in zip(
+            *((c.timestamps_ns, c.quaternions, c.positions) for c in chunks))))
+        utm_coords, projections = project_arrays(survey_arrays, 2.57)
+        expected = format_tsv_output(
+            projected_measures_from_arrays(survey_arrays.timestamps_ns, utm_coords, projections))
+        self.assertEqual(count, 25)
+        self.assertEqual(out.getvalue(), expected + "\n")
+
+    def test_write_projected_csv_with_precision(self):
+        out = io.StringIO()
+
+        write_projected(iter_projected(self.survey_chunks(n=3), 2.57), out, delimiter=",", precision=3,
+                        include_header=False)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        fields = lines[0].split(",")
+        self.assertEqual(fields[0], "2025-08-16T14:05:00.000+00:00")
+        self.assertTrue(all(len(f.split(".")[1]) == 3 for f in fields[1:]))
+
+    @parameterized.expand([
+        ("zone_31", (43.7, 5.46), 32631),
+        ("zone_34", (50.1, 21.0), 32634),
+        ("no_position", None, None),
+    ])
+    def test_survey_utm_epsg(self, name, median, expected):
+        self.assertEqual(survey_utm_epsg(median), expected)
+
+    def test_write_projected_empty(self):
+        out = io.StringIO()
+        self.assertEqual(write_projected(iter_projected([SurveyArrays(
+            np.empty(0, dtype=np.int64), np.empty((0, 4)), np.empty((0, 3)))], 2.57), out), 0)
+        self.assertEqual(out.getvalue(), "timestamp\ttutm_x\tutm_y\tutm_z\tproj_x\tproj_y\tproj_z\n")